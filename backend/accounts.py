@@ -0,0 +1,146 @@
+# Sending accounts and their shared rate limits
+# The registry comes from ACCOUNTS_FILE (falling back to GMAIL_USER/GMAIL_PASS);
+# token buckets and daily quotas live in SQLite so every worker process draws
+# from the same per-account budget.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+
+class Account:
+    def __init__(self, email, password, rate_per_minute=20.0, burst=5, daily_quota=500,
+                 transport=None, smtp_password=None):
+        self.email = email
+        self.password = password
+        self.transport = transport          # "browser" / "smtp"; None follows SEND_TRANSPORT
+        self.smtp_password = smtp_password  # app password for SMTP, when it differs from the web login
+        self.rate_per_minute = float(rate_per_minute)
+        self.burst = int(burst)
+        self.daily_quota = int(daily_quota)
+
+    def to_dict(self):
+        return {
+            "email": self.email,
+            "rate_per_minute": self.rate_per_minute,
+            "burst": self.burst,
+            "daily_quota": self.daily_quota,
+            "transport": self.transport,
+        }
+
+
+def load_accounts(path=None):
+    """Accounts from a JSON list ({"email", "password" or "password_env", limits, "transport",
+    "smtp_password" or "smtp_password_env"}) or the GMAIL_* env vars"""
+    path = path or os.getenv("ACCOUNTS_FILE")
+    if not path:
+        email, password = os.getenv("GMAIL_USER"), os.getenv("GMAIL_PASS")
+        return [Account(email, password)] if email else []
+    with open(path) as f:
+        entries = json.load(f)
+    accounts = []
+    for entry in entries:
+        password = entry.get("password") or os.getenv(entry.get("password_env", ""), "")
+        if not (entry.get("email") and password):
+            raise ValueError(f"Account entry needs an email and a password or password_env: {entry.get('email')}")
+        accounts.append(Account(
+            entry["email"],
+            password,
+            rate_per_minute=entry.get("rate_per_minute", 20),
+            burst=entry.get("burst", 5),
+            daily_quota=entry.get("daily_quota", 500),
+            transport=entry.get("transport"),
+            smtp_password=entry.get("smtp_password") or os.getenv(entry.get("smtp_password_env", ""), "") or None,
+        ))
+    return accounts
+
+
+def connect(path):
+    """SQLite connection shared safely across threads and processes (WAL, explicit transactions)"""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class AccountLimiter:
+    """Cross-process token bucket plus daily quota per account"""
+
+    def __init__(self, path, accounts):
+        self.accounts = {account.email: account for account in accounts}
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS account_buckets (
+                    account TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS account_usage (
+                    account TEXT NOT NULL, day TEXT NOT NULL,
+                    attempted INTEGER NOT NULL DEFAULT 0, sent INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (account, day));
+            """)
+
+    @staticmethod
+    def _seconds_until_midnight():
+        now = datetime.now()
+        return (datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) - now).total_seconds()
+
+    def try_acquire(self, email):
+        """Take one send slot; returns 0.0 on success, else seconds to wait before retrying"""
+        account = self.accounts[email]
+        today = date.today().isoformat()
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT attempted FROM account_usage WHERE account=? AND day=?",
+                                   (email, today)).fetchone()
+                if row and row[0] >= account.daily_quota:
+                    conn.execute("COMMIT")
+                    return self._seconds_until_midnight()
+                row = conn.execute("SELECT tokens, updated FROM account_buckets WHERE account=?", (email,)).fetchone()
+                tokens, updated = row if row else (account.burst, now)
+                tokens = min(account.burst, tokens + (now - updated) * account.rate_per_minute / 60)
+                if tokens < 1:
+                    conn.execute("INSERT OR REPLACE INTO account_buckets VALUES (?, ?, ?)", (email, tokens, now))
+                    conn.execute("COMMIT")
+                    return (1 - tokens) * 60 / account.rate_per_minute
+                conn.execute("INSERT OR REPLACE INTO account_buckets VALUES (?, ?, ?)", (email, tokens - 1, now))
+                conn.execute("""INSERT INTO account_usage (account, day, attempted) VALUES (?, ?, 1)
+                                ON CONFLICT (account, day) DO UPDATE SET attempted = attempted + 1""",
+                             (email, today))
+                conn.execute("COMMIT")
+                return 0.0
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def record_result(self, email, ok):
+        column = "sent" if ok else "failed"
+        with self._lock:
+            self._conn.execute(f"""INSERT INTO account_usage (account, day, {column}) VALUES (?, ?, 1)
+                                   ON CONFLICT (account, day) DO UPDATE SET {column} = {column} + 1""",
+                               (email, date.today().isoformat()))
+
+    def usage(self):
+        """Today's per-account usage and remaining quota"""
+        today = date.today().isoformat()
+        with self._lock:
+            rows = self._conn.execute("SELECT account, attempted, sent, failed FROM account_usage WHERE day=?",
+                                      (today,)).fetchall()
+        used = {account: (attempted, sent, failed) for account, attempted, sent, failed in rows}
+        report = {}
+        for email, account in self.accounts.items():
+            attempted, sent, failed = used.get(email, (0, 0, 0))
+            report[email] = {
+                **account.to_dict(),
+                "attempted_today": attempted,
+                "sent_today": sent,
+                "failed_today": failed,
+                "quota_remaining": max(0, account.daily_quota - attempted),
+            }
+        return report
@@ -0,0 +1,260 @@
+# Batch / mail-merge sending over logged-in sessions
+# Streams a CSV or JSONL list of recipients + template variables through one or
+# more already-logged-in BrowserAgents, checkpointing after every message so a
+# crashed batch resumes where it stopped. Every submission gets a new batch id;
+# passing an earlier id resumes that batch instead of starting over.
+#
+# CLI usage (from backend/):
+#   python batch.py recipients.csv --subject "Hello {name}" --body-file body.txt --sessions 2
+#   python batch.py recipients.csv --subject "Hello {name}" --body-file body.txt --resume 3f9c0a1b2d4e
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+BATCH_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+RECIPIENT_FORMATS = ("csv", "jsonl")
+
+
+def render(template, variables):
+    """Fill {placeholders} from the row; any other braces (and unknown names) are left as written"""
+    return PLACEHOLDER_RE.sub(
+        lambda m: str(variables[m.group(1)]) if m.group(1) in variables else m.group(0), template)
+
+
+def parse_recipients(text, fmt="csv"):
+    """Parse CSV (with a header row) or JSONL into a list of dicts that each have a 'to'"""
+    if fmt == "jsonl":
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    elif fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(text)))
+    else:
+        raise ValueError(f"Unsupported recipients format: {fmt}")
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict) or "@" not in str(row.get("to", "")):
+            raise ValueError(f"Row {i + 1} has no valid 'to' address")
+    return rows
+
+
+def load_recipients(path):
+    fmt = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+    with open(path, newline="", encoding="utf-8") as f:
+        return parse_recipients(f.read(), fmt)
+
+
+def new_batch_id():
+    """Unique id per submission, so an identical batch sent again is a new batch"""
+    return uuid.uuid4().hex[:12]
+
+
+def valid_batch_id(batch_id):
+    """Whether `batch_id` is safe to use as a checkpoint file name"""
+    return isinstance(batch_id, str) and bool(BATCH_ID_RE.fullmatch(batch_id))
+
+
+class BatchCheckpoint:
+    """Per-message results persisted after every send"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.results = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.results = {int(k): v for k, v in json.load(f).get("results", {}).items()}
+
+    def done(self, index):
+        result = self.results.get(index)
+        return bool(result and result.get("ok"))
+
+    def record(self, result):
+        with self._lock:
+            self.results[result["index"]] = result
+            if not self.path:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"results": self.results}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+class MessageSender:
+    """A batch session without a browser: each message goes to `send(message)` (a shard worker,
+    an SMTP transport), which returns True once it was sent"""
+
+    def __init__(self, send, strategy):
+        self.send = send
+        self.last_compose = {"strategy": strategy}
+
+    def reset_compose(self):
+        pass
+
+    def compose_and_send_email(self, to, subject, body, cc=None, bcc=None, idempotency_key=None):
+        return self.send({"to": to, "cc": cc, "bcc": bcc, "subject": subject, "body": body,
+                          "idempotency_key": idempotency_key})
+
+
+class BatchRunner:
+    def __init__(self, rows, subject_template, body_template, checkpoint=None,
+                 progress=None, should_stop=None, batch_id=None, log=None):
+        self.rows = rows
+        self.subject_template = subject_template
+        self.body_template = body_template
+        self.checkpoint = checkpoint or BatchCheckpoint(None)
+        self.progress = progress
+        self.should_stop = should_stop or (lambda: False)
+        self.batch_id = batch_id or new_batch_id()
+        self.log = log or print
+        self._lock = threading.Lock()
+        self._pending = iter([i for i in range(len(rows)) if not self.checkpoint.done(i)])
+        self._sent = 0
+        self._failed = 0
+        self._started = None
+        self._sessions_started = 0
+        self._session_errors = []
+
+    def _next_index(self):
+        with self._lock:
+            if self.should_stop():
+                return None
+            return next(self._pending, None)
+
+    def _send_one(self, agent, index):
+        row = self.rows[index]
+        start = time.perf_counter()
+        error = None
+        try:
+            agent.reset_compose()
+            ok = agent.compose_and_send_email(
+                row["to"],
+                render(self.subject_template, row),
+                render(self.body_template, row),
+                cc=row.get("cc"),
+                bcc=row.get("bcc"),
+                idempotency_key=f"batch:{self.batch_id}:{index}",
+            )
+        except Exception as e:
+            ok, error = False, str(e)
+        result = {
+            "index": index,
+            "to": row["to"],
+            "ok": bool(ok),
+            "seconds": round(time.perf_counter() - start, 3),
+            "compose": (agent.last_compose or {}).get("strategy"),
+            "error": error if error or ok else "compose_and_send_email returned False",
+        }
+        self.checkpoint.record(result)
+        with self._lock:
+            if ok:
+                self._sent += 1
+            else:
+                self._failed += 1
+        if self.progress:
+            self.progress(result, self.summary())
+        return result
+
+    def _session_worker(self, session):
+        started = False
+        try:
+            with session() as agent:
+                started = True
+                with self._lock:
+                    self._sessions_started += 1
+                while True:
+                    index = self._next_index()
+                    if index is None:
+                        return
+                    self._send_one(agent, index)
+        except Exception as e:
+            with self._lock:
+                self._session_errors.append(str(e))
+            self.log(f"❌ Batch session {'stopped' if started else 'could not start'}: {e}")
+
+    def run(self, sessions):
+        """Drain the batch using one thread per session factory (each yields a logged-in agent);
+        raises if none of them could start"""
+        self._started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._session_worker, args=(session,), name=f"batch-session-{i}", daemon=True)
+            for i, session in enumerate(sessions)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if threads and not self._sessions_started:
+            raise RuntimeError(f"No batch session could start: {self._session_errors[0]}")
+        return self.summary()
+
+    def run_with_agent(self, agent):
+        return self.run([lambda: nullcontext(agent)])
+
+    def summary(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        with self._lock:
+            sent, failed = self._sent, self._failed
+        return {
+            "total": len(self.rows),
+            "sent": sent,
+            "failed": failed,
+            "skipped": sum(1 for i in range(len(self.rows)) if self.checkpoint.done(i)) - sent,
+            "elapsed_seconds": round(elapsed, 2),
+            "messages_per_minute": round(sent / elapsed * 60, 2) if elapsed else 0.0,
+        }
+
+
+def main():
+    from dotenv import load_dotenv
+    from session_pool import SessionPool
+
+    parser = argparse.ArgumentParser(description="Send a templated batch of emails through Gmail")
+    parser.add_argument("recipients", help="CSV (with a 'to' column) or JSONL file")
+    parser.add_argument("--subject", required=True, help="Subject template, e.g. 'Hello {name}'")
+    parser.add_argument("--body", help="Body template")
+    parser.add_argument("--body-file", help="Read the body template from a file")
+    parser.add_argument("--sessions", type=int, default=1, help="Logged-in browser sessions to use")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: batches/<batch id>.json)")
+    parser.add_argument("--resume", metavar="BATCH_ID", help="Resume an earlier batch instead of starting a new one")
+    args = parser.parse_args()
+
+    if not (args.body or args.body_file):
+        parser.error("one of --body or --body-file is required")
+    if args.resume and not valid_batch_id(args.resume):
+        parser.error("--resume takes a batch id (letters, digits, '-' and '_')")
+    body = args.body
+    if args.body_file:
+        with open(args.body_file, encoding="utf-8") as f:
+            body = f.read()
+
+    load_dotenv()
+    rows = load_recipients(args.recipients)
+    batch_id = args.resume or new_batch_id()
+    checkpoint = BatchCheckpoint(args.checkpoint or os.path.join("batches", f"{batch_id}.json"))
+
+    def progress(result, summary):
+        status = "✅" if result["ok"] else f"❌ {result['error']}"
+        print(f"[{summary['sent'] + summary['failed']}/{summary['total']}] {result['to']} "
+              f"{status} ({result['seconds']}s, {summary['messages_per_minute']}/min)")
+
+    pool = SessionPool(os.getenv("GMAIL_USER"), os.getenv("GMAIL_PASS"), size=args.sessions)
+    pool.start()
+    try:
+        runner = BatchRunner(rows, args.subject, body, checkpoint=checkpoint, progress=progress, batch_id=batch_id)
+        print(f"Batch {batch_id}: {len(rows)} recipients over {args.sessions} session(s)")
+        summary = runner.run([pool.lease for _ in range(args.sessions)])
+    finally:
+        pool.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Driver backend benchmark: the same compose + send flow over classic WebDriver
+# commands and over a persistent CDP websocket, on the Flask fixture server.
+#
+# Usage (from backend/):
+#   python benchmarks/backend_benchmark.py --backends webdriver cdp --emails 10
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_agent import BrowserAgent  # noqa: E402
+from fixture_server import create_app, serve_in_thread  # noqa: E402
+from pacing_benchmark import print_table  # noqa: E402
+
+SAMPLE_BODY = "Hi,\n\nThis message compares driver backends.\n\nThanks,\nBenchmark"
+
+
+def run_backend(base_url, backend, emails, text_entry):
+    agent = BrowserAgent(
+        "bench@example.com",
+        "fixture-password",
+        screenshot_dir=tempfile.mkdtemp(prefix=f"bench_{backend}_"),
+        emit_callback=lambda text, image_path=None: None,
+        pacing="fast",
+        login_url=f"{base_url}/signin.html",
+        mail_url=f"{base_url}/mail.html",
+        text_entry=text_entry,
+        backend=backend,
+    )
+    try:
+        if agent.backend.name != backend:
+            raise RuntimeError(f"Backend {backend} could not attach (got {agent.backend.name})")
+        if not agent.login_to_gmail(restore=False):
+            raise RuntimeError("Fixture login failed")
+        steps, totals = {}, []
+        for i in range(emails):
+            if not agent.compose_and_send_email(f"user{i}@example.com", f"Backend {i}", SAMPLE_BODY):
+                raise RuntimeError(f"Send {i} failed on {backend}")
+            for step, seconds in agent.step_timings:
+                steps.setdefault(step, []).append(seconds)
+            totals.append(sum(seconds for _, seconds in agent.step_timings))
+        medians = [(step, statistics.median(values)) for step, values in steps.items()]
+        return medians, totals
+    finally:
+        agent.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare WebDriver and CDP driver backends on the fixture")
+    parser.add_argument("--backends", nargs="+", default=["webdriver", "cdp"])
+    parser.add_argument("--emails", type=int, default=10)
+    parser.add_argument("--latency", type=int, default=50, help="Fixture ms per simulated round trip")
+    parser.add_argument("--text-entry", default="insert_text")
+    args = parser.parse_args()
+
+    app = create_app(latency=args.latency)
+    server, base_url = serve_in_thread(app)
+    results, totals = {}, {}
+    try:
+        for backend in args.backends:
+            results[backend], totals[backend] = run_backend(base_url, backend, args.emails, args.text_entry)
+    finally:
+        server.shutdown()
+
+    print("median seconds per step")
+    print_table(results)
+    print()
+    for backend, values in totals.items():
+        print(f"{backend:<10} p50 {statistics.median(values):.2f}s  max {max(values):.2f}s per email")
+    print(f"fixture delivered {app.config['STATS']['sent']} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Fault-injection benchmark: the send flow restarting from the inbox on any failure
+# (SEND_FLOW_RESUME=0, the original behaviour) against step-level retries that resume
+# a lost compose window from Drafts. The fixture reloads the page after some draft
+# autosaves, ignores some Compose/Send clicks and drops some sends without a
+# confirmation; each mode reports mean and p95 time to completion, step executions
+# and seconds that were wasted (failed or redone), and what the mailbox ended up
+# with: duplicate sends and messages reported sent that never went out.
+#
+# Usage (from backend/):
+#   python benchmarks/fault_benchmark.py --emails 20 --crash-rate 0.1 --click-fail-rate 0.1 --drop-rate 0.05
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_agent import BrowserAgent  # noqa: E402
+from fixture_server import create_app, serve_in_thread  # noqa: E402
+from recipients import RecipientCache  # noqa: E402
+from send_flow import SendCheckpoints  # noqa: E402
+from throughput_benchmark import SAMPLE_BODY, percentile  # noqa: E402
+
+MODES = {"restart": "0", "resumable": "1"}
+
+
+def run_mode(mode, args):
+    os.environ["SEND_FLOW_RESUME"] = MODES[mode]
+    app = create_app(latency=args.latency, crash_rate=args.crash_rate, click_fail_rate=args.click_fail_rate,
+                     drop_rate=args.drop_rate)
+    server, base_url = serve_in_thread(app)
+    checkpoints = SendCheckpoints(os.path.join(tempfile.mkdtemp(prefix="bench_faults_"), "checkpoints.db"))
+    agent = BrowserAgent(
+        "bench@example.com",
+        "fixture-password",
+        screenshot_dir=tempfile.mkdtemp(prefix="bench_faults_"),
+        emit_callback=lambda text, image_path=None: None,
+        pacing="fast",
+        login_url=f"{base_url}/signin.html",
+        mail_url=f"{base_url}/mail.html",
+        recipient_cache=RecipientCache(),
+        backend=args.backend,
+        send_checkpoints=checkpoints,
+    )
+    seconds, reported = [], {}
+    try:
+        if not agent.login_to_gmail(restore=False):
+            raise RuntimeError("Fixture login failed")
+        for index in range(args.emails):
+            subject = f"Fault benchmark {mode} {index}"
+            agent.reset_compose()
+            start = time.perf_counter()
+            ok = agent.compose_and_send_email(f"user{index}@example.com", subject, SAMPLE_BODY,
+                                              idempotency_key=f"bench:{mode}:{index}")
+            seconds.append(time.perf_counter() - start)
+            reported[subject] = bool(ok)
+        # Let in-flight sends land before reading the mailbox
+        time.sleep(args.latency * 3 / 1000)
+        delivered = Counter(message.get("subject") for message in app.config["SENT"])
+    finally:
+        agent.quit()
+        server.shutdown()
+    stats = checkpoints.stats()
+    return {
+        "mode": mode,
+        "mean": statistics.mean(seconds),
+        "p95": percentile(sorted(seconds), 0.95),
+        "executions": stats["send_flow_step_executions"],
+        "retries": stats["send_flow_step_retries"],
+        "wasted": stats["send_flow_wasted_seconds"],
+        "drafts": stats["send_flow_drafts_reopened"],
+        "failed": sum(not ok for ok in reported.values()),
+        "duplicates": sum(count - 1 for subject, count in delivered.items() if subject in reported and count > 1),
+        "lost": sum(ok and not delivered[subject] for subject, ok in reported.items()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to completion and wasted work under injected faults")
+    parser.add_argument("--emails", type=int, default=20)
+    parser.add_argument("--latency", type=int, default=100, help="Fixture ms per simulated round trip")
+    parser.add_argument("--crash-rate", type=float, default=0.1, help="Draft autosaves followed by a page reload")
+    parser.add_argument("--click-fail-rate", type=float, default=0.1, help="Compose/Send clicks that are ignored")
+    parser.add_argument("--drop-rate", type=float, default=0.05, help="Sends that close without a confirmation")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--backend", default=None, help="webdriver or cdp (default: DRIVER_BACKEND)")
+    args = parser.parse_args()
+
+    rows = [run_mode(mode, args) for mode in args.modes]
+    print(f"{'mode':<11}{'mean s':>8}{'p95 s':>8}{'steps':>7}{'retries':>9}{'wasted s':>10}{'drafts':>8}"
+          f"{'failed':>8}{'dupes':>7}{'lost':>6}")
+    for row in rows:
+        print(f"{row['mode']:<11}{row['mean']:>8.2f}{row['p95'] or 0:>8.2f}{row['executions']:>7}{row['retries']:>9}"
+              f"{row['wasted']:>10.2f}{row['drafts']:>8}{row['failed']:>8}{row['duplicates']:>7}{row['lost']:>6}")
+
+
+if __name__ == "__main__":
+    main()
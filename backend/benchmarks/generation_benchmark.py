@@ -0,0 +1,64 @@
+# Generation service benchmark against the local stub inference server.
+# Fires a mix of repeated and unique intents at a given concurrency and reports
+# latency percentiles, cache hit ratio and how many upstream calls were made.
+#
+# Usage (from backend/):
+#   python benchmarks/generation_benchmark.py --requests 200 --unique 20 --concurrency 16
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from stub_inference_server import create_app  # noqa: E402
+
+
+def start_stub(latency):
+    server = make_server("127.0.0.1", 0, create_app(latency=latency), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and cache behaviour of the generation service")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--unique", type=int, default=20, help="Distinct intents in the request mix")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub model latency in seconds")
+    args = parser.parse_args()
+
+    server, endpoint = start_stub(args.latency)
+    os.environ["INFERENCE_ENDPOINT"] = endpoint
+    os.environ.setdefault("GITHUB_TOKEN", "stub")
+
+    from generation_service import GenerationService
+
+    service = GenerationService()
+    intents = [f"send a leave email for reason {i}" for i in range(args.unique)]
+    workload = [random.choice(intents) for _ in range(args.requests)]
+    try:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            list(pool.map(service.generate, workload))
+    finally:
+        server.shutdown()
+
+    metrics = service.metrics()
+    print(json.dumps({
+        "requests": metrics["llm_requests_total"],
+        "upstream_calls": metrics["llm_upstream_calls_total"],
+        "cache_hit_ratio": round(metrics["llm_cache_hit_ratio"], 3),
+        "p50_seconds": metrics["llm_latency_p50_seconds"],
+        "p95_seconds": metrics["llm_latency_p95_seconds"],
+        "latency_histogram": metrics["llm_latency_seconds"]["buckets"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
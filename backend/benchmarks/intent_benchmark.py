@@ -0,0 +1,104 @@
+# Intent index benchmark against the local stub inference server.
+# Sends a mix of paraphrased intents ("sick leave tomorrow", "request leave on
+# Friday to Sarah", ...) with varying dates and names through the generation
+# service, without the intent index (exact-match cache only), with an empty index
+# that learns from model drafts, and with the curated template library. Reports
+# p50/p95 latency, upstream calls and index hits for each.
+#
+# Usage (from backend/):
+#   python benchmarks/intent_benchmark.py --requests 300 --latency 0.5
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generation_benchmark import start_stub  # noqa: E402
+from throughput_benchmark import percentile  # noqa: E402
+
+PHRASINGS = [
+    "send a leave email",
+    "request leave {date}",
+    "please request leave {date}",
+    "ask for leave {date} to {name}",
+    "sick leave {date}",
+    "I am sick, sick leave {date}",
+    "sick leave {date} to {name}",
+    "work from home {date}",
+    "schedule a meeting {date} with {name}",
+    "thank {name} for their help",
+    "follow up on my previous email to {name}",
+    "remind {name} about the report due {date}",
+    "ask {name} for the invoice",
+]
+DATES = ["today", "tomorrow", "on Friday", "next Monday", "on March 3rd", "the day after tomorrow", "on 12/05"]
+NAMES = ["John", "Sarah", "Priya", "Ahmed", "Maria Lopez", "Wei"]
+MODES = ["off", "learned", "curated"]
+
+
+def workload(requests, seed):
+    rng = random.Random(seed)
+    return [rng.choice(PHRASINGS).format(date=rng.choice(DATES), name=rng.choice(NAMES)) for _ in range(requests)]
+
+
+def run_mode(mode, intents, concurrency):
+    from generation_service import GenerationService
+    from intent_index import IntentIndex
+
+    index = None
+    if mode != "off":
+        templates = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "intent_templates.json")
+        index = IntentIndex(os.path.join(tempfile.mkdtemp(prefix="bench_intents_"), "intent_index.db"),
+                            templates_path=templates if mode == "curated" else None)
+    service = GenerationService(intent_index=index)
+
+    def timed(intent):
+        start = time.perf_counter()
+        service.generate(intent)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        seconds = sorted(pool.map(timed, intents))
+    metrics = service.metrics()
+    return {
+        "mode": mode,
+        "p50": percentile(seconds, 0.5),
+        "p95": percentile(seconds, 0.95),
+        "upstream": metrics["llm_upstream_calls_total"],
+        "cache_hits": metrics["llm_cache_hits_total"],
+        "index_hits": metrics["llm_index_hits_total"],
+        "lookup_p50": metrics.get("intent_index_lookup_p50_seconds", 0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and model calls with and without the intent index")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub model latency in seconds")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server, endpoint = start_stub(args.latency)
+    os.environ["INFERENCE_ENDPOINT"] = endpoint
+    os.environ.setdefault("GITHUB_TOKEN", "stub")
+    intents = workload(args.requests, args.seed)
+    try:
+        rows = [run_mode(mode, intents, args.concurrency) for mode in args.modes]
+    finally:
+        server.shutdown()
+
+    print(f"{'index':<9}{'p50 s':>8}{'p95 s':>8}{'upstream':>10}{'cache hits':>12}{'index hits':>12}{'lookup p50':>12}")
+    for row in rows:
+        print(f"{row['mode']:<9}{row['p50']:>8.3f}{row['p95']:>8.3f}{row['upstream']:>10}{row['cache_hits']:>12}"
+              f"{row['index_hits']:>12}{row['lookup_p50'] * 1000:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Offline pacing benchmark: runs the full login + compose + send flow against
+# the local Gmail-lookalike fixture and reports per-step wall time per profile.
+#
+# Usage (from backend/):
+#   python benchmarks/pacing_benchmark.py --profiles human standard fast
+
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_agent import BrowserAgent  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+
+SAMPLE_BODY = (
+    "Hi team,\n\nI would like to request leave on Friday for a family event. "
+    "I will make sure my tasks are handed over before then.\n\nThanks,\nBenchmark"
+)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures():
+    """Serve backend/fixtures on a free local port; returns (server, base_url)"""
+    handler = functools.partial(QuietHandler, directory=FIXTURES_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_profile(base_url, profile, latency, text_entry=None, body=SAMPLE_BODY):
+    agent = BrowserAgent(
+        "bench@example.com",
+        "fixture-password",
+        screenshot_dir=tempfile.mkdtemp(prefix=f"bench_{profile}_"),
+        emit_callback=lambda text, image_path=None: None,
+        pacing=profile,
+        login_url=f"{base_url}/signin.html?latency={latency}",
+        mail_url=f"{base_url}/mail.html",
+        text_entry=text_entry,
+    )
+    try:
+        if not agent.login_to_gmail():
+            raise RuntimeError(f"Fixture login failed for profile {profile}")
+        timings = list(agent.step_timings)
+        if not agent.compose_and_send_email("someone@example.com", "Leave request", body):
+            raise RuntimeError(f"Fixture send failed for profile {profile}")
+        timings += agent.step_timings
+        return timings, dict(agent.typing_times)
+    finally:
+        agent.quit()
+
+
+def print_table(results):
+    profiles = list(results)
+    steps = []
+    for timings in results.values():
+        for step, _ in timings:
+            if step not in steps:
+                steps.append(step)
+    print(f"{'step':<16}" + "".join(f"{p:>12}" for p in profiles))
+    for step in steps + ["total"]:
+        row = f"{step:<16}"
+        for profile in profiles:
+            values = dict(results[profile])
+            seconds = sum(values.values()) if step == "total" else values.get(step)
+            row += f"{seconds:>11.2f}s" if seconds is not None else f"{'-':>12}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-step pacing benchmark on the local fixture")
+    parser.add_argument("--profiles", nargs="+", default=["human", "standard", "fast"])
+    parser.add_argument("--latency", type=int, default=300, help="Simulated fixture latency in ms")
+    parser.add_argument("--text-entry", help="Override text entry, e.g. 'default=bulk,body=fill'")
+    parser.add_argument("--body-chars", type=int, default=0, help="Repeat the sample body to this length")
+    parser.add_argument("--json", help="Write raw per-step timings to this file")
+    args = parser.parse_args()
+
+    body = SAMPLE_BODY
+    if args.body_chars:
+        body = (SAMPLE_BODY * (args.body_chars // len(SAMPLE_BODY) + 1))[:args.body_chars]
+
+    server, base_url = serve_fixtures()
+    results, typing = {}, {}
+    try:
+        for profile in args.profiles:
+            results[profile], typing[profile] = run_profile(base_url, profile, args.latency, args.text_entry, body)
+    finally:
+        server.shutdown()
+
+    print_table(results)
+    print()
+    print("typing time per field")
+    print_table({profile: list(times.items()) for profile, times in typing.items()})
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"steps": results, "typing": typing}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Selector probing micro-benchmark: compares WebDriver round-trips and wall time
+# for the old one-WebDriverWait-per-candidate loop against BrowserAgent.probe,
+# which resolves a whole candidate list in a single execute_async_script call.
+#
+# Usage (from backend/):
+#   python benchmarks/probe_benchmark.py --timeout 1
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from selenium.webdriver.common.by import By  # noqa: E402
+from selenium.webdriver.support import expected_conditions as EC  # noqa: E402
+from selenium.webdriver.support.ui import WebDriverWait  # noqa: E402
+
+from browser_agent import BrowserAgent  # noqa: E402
+from pacing_benchmark import serve_fixtures  # noqa: E402
+
+
+class RoundTripCounter:
+    """Counts WebDriver HTTP commands issued through a driver"""
+
+    def __init__(self, driver):
+        self.count = 0
+        executor = driver.command_executor
+        original = executor.execute
+
+        def counting_execute(command, params):
+            self.count += 1
+            return original(command, params)
+
+        executor.execute = counting_execute
+
+    def measure(self, fn):
+        start_count, start = self.count, time.perf_counter()
+        found = fn()
+        return found, self.count - start_count, time.perf_counter() - start
+
+
+def legacy_find(driver, selectors, timeout):
+    for selector in selectors:
+        try:
+            return WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.XPATH, selector)))
+        except Exception:
+            continue
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-trips per step: sequential waits vs one probe")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Per-candidate timeout for the legacy loop")
+    args = parser.parse_args()
+
+    server, base_url = serve_fixtures()
+    agent = BrowserAgent(
+        "bench@example.com",
+        "fixture-password",
+        screenshot_dir=tempfile.mkdtemp(prefix="bench_probe_"),
+        emit_callback=lambda text, image_path=None: None,
+        mail_url=f"{base_url}/mail.html",
+    )
+    try:
+        agent.driver.get(f"{base_url}/mail.html?latency=0")
+        agent.probe(BrowserAgent.COMPOSE_SELECTORS)[0].click()
+        agent.probe(["//div[contains(@class, 'AD')]"], interactable=False)
+        counter = RoundTripCounter(agent.driver)
+
+        steps = {
+            "to": BrowserAgent.TO_SELECTORS,
+            "subject": BrowserAgent.SUBJECT_SELECTORS,
+            "body": BrowserAgent.BODY_SELECTORS,
+            "send": BrowserAgent.SEND_SELECTORS,
+        }
+        print(f"{'step':<10}{'order':<10}{'legacy trips':>14}{'legacy s':>10}{'probe trips':>13}{'probe s':>9}")
+        for step, selectors in steps.items():
+            # "stale" puts the winning candidates last, as when Gmail's markup drifts
+            for order, candidates in (("listed", selectors), ("stale", list(reversed(selectors)))):
+                found_legacy, legacy_trips, legacy_s = counter.measure(
+                    lambda: legacy_find(agent.driver, candidates, args.timeout)
+                )
+                found_probe, probe_trips, probe_s = counter.measure(
+                    lambda: agent.probe(candidates, timeout=args.timeout)[0]
+                )
+                assert found_legacy is not None and found_probe is not None, step
+                print(f"{step:<10}{order:<10}{legacy_trips:>14}{legacy_s:>10.2f}{probe_trips:>13}{probe_s:>9.2f}")
+    finally:
+        agent.quit()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
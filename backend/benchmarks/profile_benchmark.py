@@ -0,0 +1,97 @@
+# Browser profile benchmark: launches agents with each profile, logs them into
+# the local fixture (or opens --url) and reports page-load time and Chrome RSS,
+# plus how many such sessions fit in a memory budget.
+#
+# Usage (from backend/):
+#   python benchmarks/profile_benchmark.py --profiles full light minimal --sessions 2 --budget-mb 4096
+#   python benchmarks/profile_benchmark.py --url https://example.com --profiles full minimal
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_agent import BrowserAgent  # noqa: E402
+from pacing_benchmark import serve_fixtures  # noqa: E402
+
+
+def run_profile(base_url, profile, sessions, url=None):
+    agents, rows = [], []
+    try:
+        for _ in range(sessions):
+            start = time.perf_counter()
+            agent = BrowserAgent(
+                "bench@example.com",
+                "fixture-password",
+                screenshot_dir=tempfile.mkdtemp(prefix=f"bench_{profile}_"),
+                emit_callback=lambda text, image_path=None: None,
+                pacing="fast",
+                login_url=f"{base_url}/signin.html?latency=0",
+                mail_url=f"{base_url}/mail.html",
+                profile=profile,
+            )
+            agents.append(agent)
+            launch = time.perf_counter() - start
+            if url:
+                agent.driver.get(url)
+                stats = agent.record_page_load(url)
+            elif agent.login_to_gmail(restore=False):
+                stats = agent.page_loads[-1]
+            else:
+                raise RuntimeError(f"Fixture login failed for profile {profile}")
+            rows.append({"launch_seconds": round(launch, 2), **stats})
+        # Measure after every session is up, once renderers have settled
+        for row, agent in zip(rows, agents):
+            row["rss_mb"] = agent.memory_usage()
+        return rows
+    finally:
+        for agent in agents:
+            agent.quit()
+
+
+def summarize(rows, budget_mb):
+    rss = [r["rss_mb"] for r in rows if r.get("rss_mb")]
+    loads = [r["page_load_ms"] for r in rows if r.get("page_load_ms") is not None]
+    avg_rss = sum(rss) / len(rss) if rss else None
+    return {
+        "launch_seconds": round(sum(r["launch_seconds"] for r in rows) / len(rows), 2),
+        "page_load_ms": round(sum(loads) / len(loads)) if loads else None,
+        "transfer_kb": round(sum(r.get("transfer_kb") or 0 for r in rows) / len(rows)),
+        "rss_mb": round(avg_rss, 1) if avg_rss else None,
+        "sessions_in_budget": int(budget_mb // avg_rss) if avg_rss else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page-load time and memory per browser profile")
+    parser.add_argument("--profiles", nargs="+", default=["full", "light", "minimal"])
+    parser.add_argument("--sessions", type=int, default=2, help="Concurrent sessions per profile")
+    parser.add_argument("--budget-mb", type=float, default=4096, help="Memory budget to size the pool against")
+    parser.add_argument("--url", help="Open this page instead of logging into the fixture")
+    parser.add_argument("--json", help="Write per-session results to this file")
+    args = parser.parse_args()
+
+    server, base_url = serve_fixtures()
+    results = {}
+    try:
+        for profile in args.profiles:
+            results[profile] = run_profile(base_url, profile, args.sessions, args.url)
+    finally:
+        server.shutdown()
+
+    print(f"{'profile':<10}{'launch':>10}{'load':>10}{'transfer':>12}{'rss/session':>14}{'fit in budget':>15}")
+    for profile, rows in results.items():
+        s = summarize(rows, args.budget_mb)
+        print(f"{profile:<10}{s['launch_seconds']:>9.2f}s{str(s['page_load_ms']) + ' ms':>10}"
+              f"{str(s['transfer_kb']) + ' KB':>12}{str(s['rss_mb']) + ' MB':>14}{str(s['sessions_in_budget']):>15}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Recipient entry benchmark: time to commit and confirm 1, 10 and 50 recipient
+# chips on the Flask fixture server, split over To/Cc/Bcc, with the recipient
+# cache cold (first send) and warm (same recipients again).
+#
+# Usage (from backend/):
+#   python benchmarks/recipient_benchmark.py --counts 1 10 50 --repeats 3
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_agent import BrowserAgent  # noqa: E402
+from fixture_server import create_app, serve_in_thread  # noqa: E402
+from recipients import RecipientCache  # noqa: E402
+
+
+def split_fields(addresses, fields):
+    """Deal addresses round-robin over To (always first), Cc and Bcc"""
+    names = ["to", "cc", "bcc"][:fields]
+    return {name: addresses[i::len(names)] for i, name in enumerate(names)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recipient chip entry time vs. number of recipients")
+    parser.add_argument("--counts", nargs="+", type=int, default=[1, 10, 50])
+    parser.add_argument("--repeats", type=int, default=3, help="Warm-cache sends per count")
+    parser.add_argument("--fields", type=int, default=3, choices=[1, 2, 3], help="Spread over To, Cc, Bcc")
+    parser.add_argument("--latency", type=int, default=50, help="Fixture ms per simulated round trip")
+    args = parser.parse_args()
+
+    app = create_app(latency=args.latency)
+    server, base_url = serve_in_thread(app)
+    agent = BrowserAgent(
+        "bench@example.com",
+        "fixture-password",
+        screenshot_dir=tempfile.mkdtemp(prefix="bench_recipients_"),
+        emit_callback=lambda text, image_path=None: None,
+        pacing="fast",
+        login_url=f"{base_url}/signin.html",
+        mail_url=f"{base_url}/mail.html",
+        recipient_cache=RecipientCache(),
+    )
+    rows = []
+    try:
+        if not agent.login_to_gmail(restore=False):
+            raise RuntimeError("Fixture login failed")
+        for count in args.counts:
+            addresses = [f"user{count}-{i}@example.com" for i in range(count)]
+            fields = split_fields(addresses, args.fields)
+            timings = []
+            for attempt in range(1 + args.repeats):
+                agent.reset_compose()
+                if not agent.compose_and_send_email(fields["to"], f"{count} recipients", "Hi all",
+                                                    cc=fields.get("cc"), bcc=fields.get("bcc")):
+                    raise RuntimeError(f"Send to {count} recipients failed")
+                timings.append(dict(agent.step_timings)["fill_recipient"])
+            cold, warm = timings[0], statistics.median(timings[1:]) if args.repeats else timings[0]
+            rows.append((count, cold, warm))
+    finally:
+        agent.quit()
+        server.shutdown()
+
+    print(f"{'recipients':>10}{'cold s':>9}{'warm s':>9}{'ms/recipient':>14}")
+    for count, cold, warm in rows:
+        print(f"{count:>10}{cold:>9.2f}{warm:>9.2f}{warm * 1000 / count:>14.1f}")
+    delivered = app.config["SENT"]
+    ok = all(len(m["to"]) + len(m["cc"]) + len(m["bcc"]) == int(m["subject"].split()[0]) for m in delivered)
+    print(f"fixture delivered {len(delivered)} messages, every recipient present: {ok}")
+
+
+if __name__ == "__main__":
+    main()
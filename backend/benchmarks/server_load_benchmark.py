@@ -0,0 +1,166 @@
+# Server mode load test: the real app (main.py) in dev mode (Werkzeug threads,
+# long-polling clients) against production mode (gevent/eventlet, WebSocket).
+# For each mode it starts the server, fetches the static assets the page loads
+# (first request, gzip/br sizes and a 304 revalidation), then opens N Socket.IO
+# clients at once and has each one do a run of round trips: `cancel_job` for an
+# unknown job, answered with a "text" event. Reports connections that succeeded,
+# connect time, event round-trip p50/p95/p99, events/s and server CPU/RSS.
+#
+# Usage (from backend/):
+#   python benchmarks/server_load_benchmark.py --clients 10 100 500 --events 20
+#   python benchmarks/server_load_benchmark.py --modes production --clients 1000
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from throughput_benchmark import percentile  # noqa: E402
+
+try:
+    import psutil
+except ImportError:  # Optional; without it server CPU and RSS are not reported
+    psutil = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    "dev": {"SERVER_MODE": "dev"},
+    "production": {"SERVER_MODE": "production"},
+}
+ASSETS = ["/", "/socket.js", "/style.css", "/socket.io.js"]
+
+
+def start_server(mode, port):
+    env = dict(os.environ, **MODES[mode], PORT=str(port), FAST_STARTUP="1", SESSION_POOL_SIZE="0",
+               JOB_WORKERS="1", SERVER_MAX_CONNECTIONS="10000")
+    server = subprocess.Popen([sys.executable, "main.py"], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def fetch(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            return response.status, response.headers, len(body), time.perf_counter() - start
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, 0, time.perf_counter() - start
+
+
+def measure_assets(base_url):
+    """Bytes and ms per asset: uncompressed, with gzip/br, and revalidated with its ETag"""
+    rows = []
+    for path in ASSETS:
+        _, headers, identity, _ = fetch(base_url + path)
+        _, compressed_headers, compressed, ms = fetch(base_url + path, {"Accept-Encoding": "br, gzip"})
+        status, _, _, revalidate = fetch(base_url + path, {"If-None-Match": headers.get("ETag") or ""})
+        rows.append({"path": path, "identity": identity, "compressed": compressed,
+                     "encoding": compressed_headers.get("Content-Encoding", "identity"),
+                     "ms": ms * 1000, "revalidate": status, "revalidate_ms": revalidate * 1000})
+    return rows
+
+
+def run_clients(base_url, clients, events, transports):
+    import socketio
+
+    lock = threading.Lock()
+    connected, connect_seconds, latencies, errors = [], [], [], [0]
+
+    def client():
+        sio = socketio.Client(reconnection=False)
+        reply = threading.Event()
+        sio.on("text", lambda data: reply.set())
+        start = time.perf_counter()
+        try:
+            sio.connect(base_url, transports=transports, wait_timeout=30)
+        except Exception:
+            with lock:
+                errors[0] += 1
+            return
+        with lock:
+            connected.append(sio)
+            connect_seconds.append(time.perf_counter() - start)
+        for i in range(events):
+            reply.clear()
+            start = time.perf_counter()
+            sio.emit("cancel_job", {"job_id": f"load-test-{i}"})
+            if not reply.wait(30):
+                with lock:
+                    errors[0] += 1
+                break
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, name=f"load-client-{i}") for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for sio in connected:
+        sio.disconnect()
+    return {"connected": len(connected), "connect": sorted(connect_seconds), "latency": sorted(latencies),
+            "events_per_second": len(latencies) / elapsed if elapsed else 0.0, "errors": errors[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent connections and event latency, dev vs production server")
+    parser.add_argument("--clients", nargs="+", type=int, default=[10, 100, 500])
+    parser.add_argument("--events", type=int, default=20, help="Round trips per client")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--port", type=int, default=5098)
+    args = parser.parse_args()
+
+    rows = []
+    for mode in args.modes:
+        server = start_server(mode, args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+        process = psutil.Process(server.pid) if psutil else None
+        try:
+            print(f"{mode}: {'asset':<14}{'bytes':>9}{'encoded':>9}{'enc':>9}{'ms':>7}{'304':>6}{'304 ms':>8}")
+            for row in measure_assets(base_url):
+                print(f"{'':<{len(mode) + 2}}{row['path']:<14}{row['identity']:>9}{row['compressed']:>9}"
+                      f"{row['encoding']:>9}{row['ms']:>7.1f}{row['revalidate']:>6}{row['revalidate_ms']:>8.1f}")
+            transports = ["websocket"] if mode == "production" else ["polling"]
+            for clients in args.clients:
+                cpu_before = sum(process.cpu_times()[:2]) if process else 0.0
+                result = run_clients(base_url, clients, args.events, transports)
+                rows.append({
+                    "mode": mode,
+                    "clients": clients,
+                    **result,
+                    "cpu": sum(process.cpu_times()[:2]) - cpu_before if process else None,
+                    "rss_mb": process.memory_info().rss / 2 ** 20 if process else None,
+                })
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"\n{'mode':<12}{'clients':>8}{'ok':>6}{'connect p95':>13}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}"
+          f"{'events/s':>10}{'errors':>8}{'cpu s':>7}{'RSS MB':>8}")
+    for row in rows:
+        ms = [(percentile(row["latency"], q) or 0) * 1000 for q in (0.5, 0.95, 0.99)]
+        print(f"{row['mode']:<12}{row['clients']:>8}{row['connected']:>6}{percentile(row['connect'], 0.95) or 0:>12.2f}s"
+              f"{ms[0]:>8.1f}{ms[1]:>8.1f}{ms[2]:>8.1f}{row['events_per_second']:>10.0f}{row['errors']:>8}"
+              f"{row['cpu'] if row['cpu'] is not None else 0:>7.1f}{row['rss_mb'] or 0:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# Socket.IO fan-out load test
+# Starts a Flask-SocketIO server in a child process that plays back synthetic
+# job progress (the status lines and screenshot frames of a real send), then
+# connects N clients that each run jobs, and reports how many Socket.IO messages
+# and how much server CPU that costs, with the event bus vs. one emit per event.
+#
+# Usage (from backend/):
+#   python benchmarks/socket_load_benchmark.py --clients 1 10 50 --jobs 3
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEXT_PER_JOB = 45
+FRAMES_PER_JOB = 12
+FRAME_BYTES = 12 * 1024
+
+
+def serve(port, mode):
+    from flask import Flask, jsonify, request
+    from flask_socketio import SocketIO
+
+    from event_bus import EventBus
+
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading")
+    bus = EventBus(socketio) if mode == "bus" else None
+    counts = {"emits": 0}
+    lock = threading.Lock()
+    frame = {"job_id": None, "name": "step", "mime": "image/webp", "data": os.urandom(FRAME_BYTES)}
+
+    def send(event, data, room):
+        with lock:
+            counts["emits"] += 1
+        socketio.emit(event, data, to=room)
+
+    def play_job(room, job_id):
+        frames_every = TEXT_PER_JOB // FRAMES_PER_JOB
+        for i in range(TEXT_PER_JOB):
+            text = f"[🔄] Job {job_id} step {i}"
+            if bus:
+                bus.text(room, text, job_id)
+            else:
+                send("text", text, room)
+            if i % frames_every == 0:
+                if bus:
+                    bus.image(room, dict(frame, job_id=job_id))
+                else:
+                    send("image_frame", dict(frame, job_id=job_id), room)
+            time.sleep(0.01)
+        if bus:
+            bus.emit("job_status", {"job_id": job_id, "status": "done"}, room)
+        else:
+            send("job_status", {"job_id": job_id, "status": "done"}, room)
+
+    @socketio.on("start_job")
+    def start_job(data):
+        socketio.start_background_task(play_job, request.sid, data["job_id"])
+
+    @app.route("/stats")
+    def stats():
+        return jsonify({"cpu_seconds": time.process_time(), "emits": counts["emits"],
+                        **(bus.stats() if bus else {})})
+
+    socketio.run(app, host="127.0.0.1", port=port, allow_unsafe_werkzeug=True)
+
+
+def run_clients(base_url, clients, jobs):
+    import socketio
+
+    received = {"messages": 0, "text_lines": 0, "frames": 0, "done": 0}
+    lock = threading.Lock()
+    finished = threading.Event()
+    expected = clients * jobs
+
+    def make_client(index):
+        sio = socketio.Client()
+
+        @sio.on("text")
+        def on_text(data):
+            with lock:
+                received["messages"] += 1
+                received["text_lines"] += 1
+
+        @sio.on("text_batch")
+        def on_batch(items):
+            with lock:
+                received["messages"] += 1
+                received["text_lines"] += len(items)
+
+        @sio.on("image_frame")
+        def on_frame(frame):
+            with lock:
+                received["messages"] += 1
+                received["frames"] += 1
+
+        @sio.on("job_status")
+        def on_status(job):
+            with lock:
+                received["messages"] += 1
+                received["done"] += 1
+                if received["done"] >= expected:
+                    finished.set()
+
+        sio.connect(base_url, transports=["websocket"])
+        return sio
+
+    connections = [make_client(i) for i in range(clients)]
+    start = time.perf_counter()
+    for i, sio in enumerate(connections):
+        for j in range(jobs):
+            sio.emit("start_job", {"job_id": f"c{i}j{j}"})
+    finished.wait(120)
+    time.sleep(1.0)  # let trailing throttled frames arrive
+    elapsed = time.perf_counter() - start
+    for sio in connections:
+        sio.disconnect()
+    return received, elapsed
+
+
+def fetch_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/stats") as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO message volume and server CPU vs. number of clients")
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 10, 50])
+    parser.add_argument("--jobs", type=int, default=3, help="Jobs per client")
+    parser.add_argument("--modes", nargs="+", default=["direct", "bus"])
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--serve", choices=["direct", "bus"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.serve)
+        return
+
+    print(f"{'mode':<8}{'clients':>8}{'messages':>10}{'msg/client':>12}{'lines':>8}{'frames':>8}{'server cpu':>12}{'wall':>8}")
+    for mode in args.modes:
+        for clients in args.clients:
+            server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", mode, "--port", str(args.port)],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                for _ in range(50):
+                    try:
+                        before = fetch_stats(base_url)
+                        break
+                    except OSError:
+                        time.sleep(0.2)
+                else:
+                    raise RuntimeError("Load test server did not start")
+                received, elapsed = run_clients(base_url, clients, args.jobs)
+                after = fetch_stats(base_url)
+            finally:
+                server.terminate()
+                server.wait()
+            cpu = after["cpu_seconds"] - before["cpu_seconds"]
+            print(f"{mode:<8}{clients:>8}{received['messages']:>10}{received['messages'] / clients:>12.1f}"
+                  f"{received['text_lines']:>8}{received['frames']:>8}{cpu:>11.2f}s{elapsed:>7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Startup benchmark: import cost of the server module and how fast a fresh
+# `python main.py` answers its first request. Reports the slowest imports
+# (from `python -X importtime`), time until the first response and the
+# server's own /metrics/startup report.
+#
+# Usage (from backend/):
+#   python benchmarks/startup_benchmark.py
+#   python benchmarks/startup_benchmark.py --runs 5 --keep-pool   # also time the warm browser pool
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(env, top=10):
+    """Total import time of main and its slowest direct imports, from -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    total, direct = None, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:]  # nested imports are indented two spaces per level below their importer
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0 and name == "main":
+            total = int(cumulative) / 1e6
+            break
+        if depth == 0:
+            direct = []  # entries are listed children-first; only keep the ones under main
+        elif depth == 1:
+            direct.append((int(cumulative) / 1e6, name.strip()))
+    return total, sorted(direct, reverse=True)[:top]
+
+
+def time_first_response(env, port, timeout=60):
+    server = subprocess.Popen([sys.executable, "main.py"], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5) as response:
+                    response.read()
+                first_response = time.perf_counter() - start
+                break
+            except OSError:
+                time.sleep(0.02)
+        else:
+            raise RuntimeError("Server did not answer in time")
+        time.sleep(1.0)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics/startup") as response:
+            report = json.load(response)
+        return first_response, report
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server import time and first-request latency")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=5098)
+    parser.add_argument("--keep-pool", action="store_true", help="Keep SESSION_POOL_SIZE (launches real browsers)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, FAST_STARTUP="1", PORT=str(args.port))
+    if not args.keep_pool:
+        env["SESSION_POOL_SIZE"] = "0"
+
+    total, slowest = import_times(env)
+    print(f"import main: {total:.3f}s" if total is not None else "import main: (not reported)")
+    for seconds, name in slowest:
+        print(f"  {name:<28}{seconds:>8.3f}s")
+
+    firsts, report = [], {}
+    for _ in range(args.runs):
+        first_response, report = time_first_response(env, args.port)
+        firsts.append(first_response)
+    print(f"\nprocess start -> first response: p50 {statistics.median(firsts):.2f}s, max {max(firsts):.2f}s "
+          f"over {args.runs} runs")
+    print("server startup report (last run):")
+    for key, value in report.items():
+        print(f"  {key:<48}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Streaming draft benchmark against the local stub inference server.
+# Compares time-to-first-content of streamed drafts with the time the user
+# waits for a complete non-streamed draft.
+#
+# Usage (from backend/):
+#   python benchmarks/streaming_benchmark.py --drafts 10 --latency 0.3 --token-latency 0.02
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from stub_inference_server import create_app  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first content: streamed vs non-streamed drafts")
+    parser.add_argument("--drafts", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub time to first token")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Stub seconds between tokens")
+    args = parser.parse_args()
+
+    server = make_server("127.0.0.1", 0, create_app(args.latency, 0.0, 0.0, args.token_latency), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["INFERENCE_ENDPOINT"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault("GITHUB_TOKEN", "stub")
+
+    from generation_service import GenerationService
+
+    service = GenerationService(cache_size=1)
+    full, first = [], []
+    try:
+        for i in range(args.drafts):
+            start = time.perf_counter()
+            service.generate(f"non-streamed leave request {i}")
+            full.append(time.perf_counter() - start)
+
+            seen = []
+            start = time.perf_counter()
+            service.submit(
+                f"streamed leave request {i}",
+                on_partial=lambda draft: seen or seen.append(time.perf_counter() - start),
+            ).result()
+            first.append(seen[0] if seen else time.perf_counter() - start)
+    finally:
+        server.shutdown()
+
+    print(json.dumps({
+        "non_streamed_full_draft_p50_seconds": round(statistics.median(full), 3),
+        "streamed_first_content_p50_seconds": round(statistics.median(first), 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# Multi-tab benchmark: emails per minute per GB of RAM with 1..8 compose tabs
+# in a single Chrome (TabScheduler) on the Flask fixture server, against the
+# same number of separate browsers. Each tab count runs with adaptation off
+# (min = max = that count); a last run starts at one tab and lets the scheduler
+# pick the count itself.
+#
+# Usage (from backend/):
+#   python benchmarks/tab_benchmark.py --tabs 1 2 4 8 --emails 24
+#   python benchmarks/tab_benchmark.py --tabs 1 2 4 --browsers   # also N separate browsers for comparison
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_agent import BrowserAgent  # noqa: E402
+from fixture_server import create_app, serve_in_thread  # noqa: E402
+from recipients import RecipientCache  # noqa: E402
+from session_pool import SessionPool  # noqa: E402
+from tab_scheduler import TabScheduler  # noqa: E402
+from throughput_benchmark import SAMPLE_BODY, MemorySampler, percentile  # noqa: E402
+
+
+def agent_factory(base_url, backend):
+    def factory():
+        return BrowserAgent(
+            "bench@example.com",
+            "fixture-password",
+            screenshot_dir=tempfile.mkdtemp(prefix="bench_tabs_"),
+            emit_callback=lambda text, image_path=None: None,
+            pacing="fast",
+            login_url=f"{base_url}/signin.html",
+            mail_url=f"{base_url}/mail.html",
+            recipient_cache=RecipientCache(),
+            backend=backend,
+        )
+    return factory
+
+
+def drain(pool, emails, threads):
+    """Send `emails` messages from `threads` threads that each lease from `pool`; returns per-send seconds"""
+    lock = threading.Lock()
+    remaining = [emails]
+    seconds, failures = [], [0]
+
+    def worker():
+        while True:
+            with lock:
+                if not remaining[0]:
+                    return
+                remaining[0] -= 1
+                index = remaining[0]
+            with pool.lease() as agent:
+                start = time.perf_counter()
+                agent.reset_compose()
+                ok = agent.compose_and_send_email(f"user{index}@example.com", f"Tab benchmark {index}", SAMPLE_BODY)
+            with lock:
+                seconds.append(time.perf_counter() - start)
+                failures[0] += not ok
+
+    workers = [threading.Thread(target=worker, name=f"tab-bench-{i}") for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return seconds, failures[0]
+
+
+def run(label, pool, emails, threads, ready):
+    pool.start()
+    ready(pool)
+    with MemorySampler() as memory:
+        start = time.perf_counter()
+        seconds, failures = drain(pool, emails, threads)
+        elapsed = time.perf_counter() - start
+    metrics = pool.metrics()
+    pool.close()
+    per_minute = (len(seconds) - failures) * 60 / elapsed
+    return {
+        "label": label,
+        "tabs": metrics.get("tabs_target", metrics["pool_size"]),
+        "p50": percentile(sorted(seconds), 0.5),
+        "emails_per_minute": per_minute,
+        "peak_mb": memory.peak_mb,
+        "per_gb": per_minute / (memory.peak_mb / 1024) if memory.peak_mb else 0.0,
+        "failures": failures,
+    }
+
+
+def wait_ready(pool, timeout=120):
+    deadline = time.monotonic() + timeout
+    while not pool.metrics()["pool_idle"] and time.monotonic() < deadline:
+        time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emails/minute per GB: tabs in one browser vs separate browsers")
+    parser.add_argument("--tabs", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--emails", type=int, default=24, help="Sends per run")
+    parser.add_argument("--latency", type=int, default=300, help="Fixture ms per simulated round trip")
+    parser.add_argument("--backend", default=None, help="webdriver or cdp (default: DRIVER_BACKEND)")
+    parser.add_argument("--browsers", action="store_true", help="Also run N separate browsers per tab count")
+    parser.add_argument("--adaptive-max", type=int, default=8, help="Max tabs for the adaptive run (0 to skip)")
+    args = parser.parse_args()
+
+    app = create_app(latency=args.latency)
+    server, base_url = serve_in_thread(app)
+    factory = agent_factory(base_url, args.backend)
+    rows = []
+    try:
+        for tabs in args.tabs:
+            scheduler = TabScheduler("bench@example.com", "fixture-password", max_tabs=tabs, min_tabs=tabs,
+                                     initial_tabs=tabs, agent_factory=factory)
+            rows.append(run(f"{tabs} tab(s)", scheduler, args.emails, tabs, wait_ready))
+            if args.browsers:
+                pool = SessionPool("bench@example.com", "fixture-password", size=tabs, agent_factory=factory)
+                rows.append(run(f"{tabs} browser(s)", pool, args.emails, tabs, wait_ready))
+        if args.adaptive_max:
+            scheduler = TabScheduler("bench@example.com", "fixture-password", max_tabs=args.adaptive_max,
+                                     agent_factory=factory)
+            rows.append(run("adaptive", scheduler, args.emails * 2, args.adaptive_max, wait_ready))
+            for decision in scheduler.decisions():
+                print(f"adaptive: {decision['from']} -> {decision['to']} tabs ({decision['reason']}, "
+                      f"{decision['emails_per_minute']} emails/min)")
+    finally:
+        server.shutdown()
+
+    print(f"{'run':<16}{'tabs':>5}{'p50 s':>8}{'emails/min':>12}{'peak MB':>10}{'per GB':>9}{'failed':>8}")
+    for row in rows:
+        print(f"{row['label']:<16}{row['tabs']:>5}{row['p50'] or 0:>8.2f}{row['emails_per_minute']:>12.1f}"
+              f"{row['peak_mb']:>10.0f}{row['per_gb']:>9.1f}{row['failures']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# End-to-end throughput benchmark against the Flask fixture server
+# Logs N agents in, drains a fixed number of sends across them and reports
+# p50/p95 seconds per email, emails/minute and peak memory for each
+# concurrency level. Results are saved as JSON and compared with the previous
+# run so regressions stand out.
+#
+# Usage (from backend/):
+#   python benchmarks/throughput_benchmark.py --concurrency 1 2 4 --emails 20
+#   python benchmarks/throughput_benchmark.py --variant alt --fail-rate 0.05 --drop-rate 0.05
+#   python benchmarks/throughput_benchmark.py --compare benchmarks/results/20260101-120000.json
+
+import argparse
+import glob
+import json
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_agent import BrowserAgent  # noqa: E402
+from browser_profile import process_tree_rss_mb  # noqa: E402
+from fixture_server import VARIANTS, create_app, serve_in_thread  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SAMPLE_BODY = "Hi,\n\nThis is a throughput benchmark message.\n\nThanks,\nBenchmark"
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[round(q * 100) - 1]
+
+
+class MemorySampler:
+    """Tracks peak RSS of this process and every browser it spawned"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, process_tree_rss_mb(os.getpid()) or 0.0)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def make_agent(base_url, args):
+    return BrowserAgent(
+        "bench@example.com",
+        "fixture-password",
+        screenshot_dir=tempfile.mkdtemp(prefix="bench_throughput_"),
+        emit_callback=lambda text, image_path=None: None,
+        pacing=args.pacing,
+        login_url=f"{base_url}/signin.html",
+        mail_url=f"{base_url}/mail.html",
+        profile=args.profile,
+    )
+
+
+def run_level(base_url, concurrency, args):
+    """Send args.emails messages over `concurrency` logged-in agents"""
+    work = queue.Queue()
+    for i in range(args.emails):
+        work.put(i)
+    durations, failures = [], []
+    lock = threading.Lock()
+    agents = []
+
+    def worker(agent):
+        while True:
+            try:
+                i = work.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            ok = agent.compose_and_send_email(f"user{i}@example.com", f"Benchmark {i}", SAMPLE_BODY)
+            elapsed = time.perf_counter() - start
+            with lock:
+                (durations if ok else failures).append(elapsed)
+
+    with MemorySampler() as memory:
+        login_start = time.perf_counter()
+        launchers = []
+        for _ in range(concurrency):
+            def launch():
+                agent = make_agent(base_url, args)
+                if agent.login_to_gmail(restore=False):
+                    with lock:
+                        agents.append(agent)
+                else:
+                    agent.quit()
+            launchers.append(threading.Thread(target=launch))
+        for thread in launchers:
+            thread.start()
+        for thread in launchers:
+            thread.join()
+        login_seconds = time.perf_counter() - login_start
+        if not agents:
+            raise RuntimeError("No agent could log into the fixture")
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(agent,)) for agent in agents]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        for agent in agents:
+            agent.quit()
+
+    return {
+        "concurrency": concurrency,
+        "sessions": len(agents),
+        "emails": args.emails,
+        "sent": len(durations),
+        "failed": len(failures),
+        "login_seconds": round(login_seconds, 2),
+        "p50_seconds": round(percentile(durations, 0.5) or 0.0, 3),
+        "p95_seconds": round(percentile(durations, 0.95) or 0.0, 3),
+        "emails_per_minute": round(len(durations) / wall * 60, 2) if wall else 0.0,
+        "peak_memory_mb": memory.peak_mb,
+    }
+
+
+def latest_result(exclude=None):
+    paths = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != exclude)
+    return paths[-1] if paths else None
+
+
+def compare(current, previous, threshold):
+    """Print per-level deltas; returns True if any metric regressed beyond `threshold`"""
+    before = {row["concurrency"]: row for row in previous["levels"]}
+    regressed = False
+    print(f"\ncompared with {previous['timestamp']} ({previous['label']})")
+    # (metric, True if higher is better)
+    for metric, higher_is_better in (("p50_seconds", False), ("p95_seconds", False),
+                                     ("emails_per_minute", True), ("peak_memory_mb", False)):
+        for row in current["levels"]:
+            old = before.get(row["concurrency"], {}).get(metric)
+            if not old:
+                continue
+            change = (row[metric] - old) / old
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            regressed |= bool(flag)
+            print(f"  c={row['concurrency']:<3}{metric:<20}{old:>10} -> {row[metric]:<10}{change:+.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emails/minute and latency per concurrency level on the fixture")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--emails", type=int, default=20, help="Emails sent at each concurrency level")
+    parser.add_argument("--pacing", default="fast")
+    parser.add_argument("--profile", default="light", help="Browser profile (full, light, minimal)")
+    parser.add_argument("--latency", type=int, default=100, help="Fixture ms per simulated round trip")
+    parser.add_argument("--page-latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--variant", default="default", choices=sorted(VARIANTS))
+    parser.add_argument("--label", default="", help="Free-form note stored with the results")
+    parser.add_argument("--compare", help="Results file to compare against (default: the previous run)")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change reported as a regression")
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.page_latency, args.fail_rate, args.drop_rate, args.variant)
+    server, base_url = serve_in_thread(app)
+    levels = []
+    try:
+        for concurrency in args.concurrency:
+            app.config["STATS"].update(sent=0, dropped=0)
+            row = run_level(base_url, concurrency, args)
+            row["delivered"] = app.config["STATS"]["sent"]
+            levels.append(row)
+    finally:
+        server.shutdown()
+
+    print(f"{'conc':>5}{'sent':>7}{'failed':>8}{'p50':>9}{'p95':>9}{'emails/min':>12}{'peak MB':>10}")
+    for row in levels:
+        print(f"{row['concurrency']:>5}{row['sent']:>7}{row['failed']:>8}{row['p50_seconds']:>8.2f}s"
+              f"{row['p95_seconds']:>8.2f}s{row['emails_per_minute']:>12}{row['peak_memory_mb']:>10}")
+
+    result = {
+        "timestamp": time.strftime("%Y%m%d-%H%M%S"),
+        "label": args.label,
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "label")},
+        "levels": levels,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{result['timestamp']}.json")
+    previous_path = args.compare or latest_result()
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nresults saved to {path}")
+
+    if previous_path:
+        with open(previous_path) as f:
+            previous = json.load(f)
+        if compare(result, previous, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
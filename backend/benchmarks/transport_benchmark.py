@@ -0,0 +1,106 @@
+# Transport benchmark: messages per second through each send transport.
+# SMTP runs against the local sink (smtp_sink.py) with a simulated network round
+# trip, one-at-a-time and pipelined, over 1..N pooled connections; the browser
+# transport runs a few sends through a warm BrowserAgent on the Flask fixture.
+#
+# Usage (from backend/):
+#   python benchmarks/transport_benchmark.py --messages 200 --rtt 0.02
+#   python benchmarks/transport_benchmark.py --browser 5    # also time the browser path
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smtp_sink  # noqa: E402
+from transports import SmtpTransport  # noqa: E402
+
+SENDER = "bench@example.com"
+
+
+def messages(count, recipients):
+    return [{
+        "sender": SENDER,
+        "to": [f"user{i}-{j}@example.com" for j in range(recipients)],
+        "subject": f"Benchmark {i}",
+        "body": f"Hello,\n\nThis is benchmark message {i}.\n",
+    } for i in range(count)]
+
+
+def time_smtp(sink, batch, pool_size, pipelining):
+    transport = SmtpTransport(SENDER, "bench", host="127.0.0.1", port=sink.server_address[1], security="none",
+                              pool_size=pool_size, pipelining=pipelining)
+    try:
+        start = time.perf_counter()
+        results = transport.send_many(batch)
+        elapsed = time.perf_counter() - start
+    finally:
+        transport.close()
+    return elapsed, sum(r["ok"] for r in results)
+
+
+def time_browser(count, recipients, latency):
+    from browser_agent import BrowserAgent
+    from fixture_server import create_app, serve_in_thread
+
+    app = create_app(latency=latency)
+    server, base_url = serve_in_thread(app)
+    agent = BrowserAgent(
+        SENDER,
+        "fixture-password",
+        screenshot_dir=tempfile.mkdtemp(prefix="bench_transport_"),
+        emit_callback=lambda text, image_path=None: None,
+        pacing="fast",
+        login_url=f"{base_url}/signin.html",
+        mail_url=f"{base_url}/mail.html",
+    )
+    try:
+        if not agent.login_to_gmail(restore=False):
+            raise RuntimeError("Fixture login failed")
+        sent = 0
+        start = time.perf_counter()
+        for message in messages(count, recipients):
+            agent.reset_compose()
+            sent += bool(agent.compose_and_send_email(message["to"], message["subject"], message["body"]))
+        return time.perf_counter() - start, sent
+    finally:
+        agent.quit()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send throughput per transport")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--recipients", type=int, default=3, help="Recipients per message")
+    parser.add_argument("--rtt", type=float, default=0.02, help="Simulated SMTP round trip in seconds")
+    parser.add_argument("--pools", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--browser", type=int, default=0, help="Also send this many through the browser")
+    parser.add_argument("--latency", type=int, default=50, help="Fixture ms per simulated round trip")
+    args = parser.parse_args()
+
+    sink = smtp_sink.serve_in_thread(latency=args.rtt)
+    batch = messages(args.messages, args.recipients)
+    rows = []
+    try:
+        for pool_size in args.pools:
+            for label, pipelining in (("smtp", "0"), ("smtp pipelined", "1")):
+                elapsed, sent = time_smtp(sink, batch, pool_size, pipelining)
+                rows.append((f"{label} x{pool_size}", sent, elapsed))
+    finally:
+        sink.shutdown()
+    if args.browser:
+        elapsed, sent = time_browser(args.browser, args.recipients, args.latency)
+        rows.append(("browser (fixture)", sent, elapsed))
+
+    print(f"{'transport':<22}{'sent':>6}{'seconds':>10}{'msg/s':>10}{'ms/msg':>10}")
+    for label, sent, elapsed in rows:
+        print(f"{label:<22}{sent:>6}{elapsed:>10.2f}{sent / elapsed:>10.1f}{elapsed * 1000 / max(sent, 1):>10.1f}")
+    stats = sink.stats()
+    print(f"sink: {stats['messages']} messages over {stats['connections']} connections, {stats['commands']} commands")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,98 +1,432 @@
 # Improved Gmail Browser Agent with better element selectors and error handling
 # Install first: pip install undetected-chromedriver
 
+import copy
 import os
 import time
-import random
-import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.common.keys import Keys
 import base64
+import json
+from urllib.parse import quote, urlparse
+from pacing import get_pacing, wait_for_dom_settled, wait_for_page_ready
+from selector_cache import SelectorCache, default_selector_cache
+from text_entry import build_text_entry, get_text_entry
+from screenshots import ScreenshotPipeline
+from session_store import default_session_store
+from browser_profile import get_browser_profile, page_load_stats, process_tree_rss_mb
+from tracing import default_tracer
+from driver_backends import WebDriverBackend, get_driver_backend
+from compose_url import build_compose_url, get_compose_strategy
+from recipients import ACCEPTED_JS, CHIPS_JS, RECIPIENT_FIELDS, default_recipient_cache, normalize_recipients
+from chromedriver import launch_chrome
+from send_flow import SendFlow, default_send_checkpoints
+
+# Evaluates every candidate XPath in the page and resolves with [index, element]
+# for the first usable match, watching DOM mutations until the deadline.
+_PROBE_JS = """
+const xpaths = arguments[0], timeoutMs = arguments[1], opts = arguments[2];
+const done = arguments[arguments.length - 1];
+function usable(el) {
+  if (opts.text && !(el.textContent || '').includes(opts.text)) return false;
+  if (!opts.interactable) return true;
+  const style = window.getComputedStyle(el);
+  if (style.visibility === 'hidden' || style.display === 'none' || el.getClientRects().length === 0) return false;
+  return !el.disabled && el.getAttribute('aria-disabled') !== 'true';
+}
+function find() {
+  for (let i = 0; i < xpaths.length; i++) {
+    let result;
+    try {
+      result = document.evaluate(xpaths[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    } catch (e) {
+      continue;
+    }
+    for (let j = 0; j < result.snapshotLength; j++) {
+      const el = result.snapshotItem(j);
+      if (el.nodeType === 1 && usable(el)) return [i, el];
+    }
+  }
+  return null;
+}
+const match = find();
+if (match || timeoutMs <= 0) {
+  done(match);
+} else {
+  let finished = false;
+  const finish = (m) => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(limit);
+    done(m);
+  };
+  const observer = new MutationObserver(() => { const m = find(); if (m) finish(m); });
+  const limit = setTimeout(() => finish(find()), timeoutMs);
+  observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+"""
+
+# Seeds localStorage for a restored origin before the page's own scripts run
+_SEED_STORAGE_JS = """
+(function () {
+  const saved = %s;
+  const items = saved[location.origin];
+  if (!items) return;
+  for (const key in items) {
+    if (localStorage.getItem(key) === null) localStorage.setItem(key, items[key]);
+  }
+})();
+"""
+
+# Checks a prefilled compose window carries what the URL asked for; whitespace is
+# compared loosely because the editor rewrites line breaks (and may add a signature).
+# Recipients must be chips in their own field of the compose dialog (see CHIPS_JS).
+_PREFILL_JS = CHIPS_JS + """
+const [subjectBox, bodyBox, recipients, subject, body] = arguments;
+const norm = (s) => (s || '').replace(/\\s+/g, ' ').trim();
+const chips = composeChips();
+return {
+  recipients: Object.entries(recipients).every(([field, list]) => list.every((r) => chips[field].has(r.toLowerCase()))),
+  subject: norm(subjectBox.value) === norm(subject),
+  body: norm(bodyBox.innerText).startsWith(norm(body)),
+};
+"""
 
 class BrowserAgent:
-    def __init__(self, email, password, screenshot_dir="screenshots", emit_callback=None):
+    LOGIN_URL = "https://accounts.google.com/signin"
+    MAIL_URL = "https://mail.google.com"
+
+    # Steps recorded by _mark for each traced operation, in flow order
+    LOGIN_STEPS = ("open_login", "enter_email", "enter_password", "confirm_login")
+    SEND_STEPS = ("open_gmail", "open_compose", "fill_recipient", "fill_subject", "fill_body", "send", "confirm_sent")
+    URL_SEND_STEPS = ("open_compose_url", "verify_prefill", "send", "confirm_sent")
+
+    # Candidate XPaths for each step, in order of preference
+    SHOW_PASSWORD_SELECTORS = [
+        "//input[@type='checkbox'][@aria-label='Show password']",
+        "//button[@aria-label='Show password']",
+        "//span[contains(text(), 'Show password')]",
+        "//div[contains(text(), 'Show password')]",
+        "//input[@type='checkbox'][contains(@aria-describedby, 'password')]",
+        "//button[contains(@class, 'show-password')]"
+    ]
+    PASSWORD_SELECTORS = [
+        "//input[@name='password']",
+        "//input[@type='password']",
+        "//input[@aria-label='Enter your password']",
+        "//input[contains(@aria-describedby, 'password')]",
+        "//div[@id='password']//input",
+        "//input[@autocomplete='current-password']",
+        "//input[@name='Passwd']",  # Add this if you see it in the HTML
+    ]
+    COMPOSE_SELECTORS = [
+        "//div[contains(@class, 'T-I') and contains(@class, 'T-I-KE') and contains(@class, 'L3')]",
+        "//div[@role='button' and contains(text(), 'Compose')]",
+        "//div[contains(@class, 'z0') and contains(text(), 'Compose')]",
+        "//div[contains(@class, 'aic') and contains(text(), 'Compose')]",
+        "//div[text()='Compose']",
+        "//button[contains(@aria-label, 'Compose')]"
+    ]
+    TO_SELECTORS = [
+        "//textarea[@name='to']",
+        "//input[@name='to']",
+        "//textarea[contains(@aria-label, 'To')]",
+        "//input[contains(@aria-label, 'To')]",
+        "//div[@aria-label='To']//textarea",
+        "//div[@aria-label='To']//input"
+    ]
+    CC_SELECTORS = [
+        "//textarea[@name='cc']",
+        "//input[@name='cc']",
+        "//input[starts-with(@aria-label, 'CC') or starts-with(@aria-label, 'Cc')]",
+        "//textarea[starts-with(@aria-label, 'CC') or starts-with(@aria-label, 'Cc')]"
+    ]
+    BCC_SELECTORS = [
+        "//textarea[@name='bcc']",
+        "//input[@name='bcc']",
+        "//input[starts-with(@aria-label, 'BCC') or starts-with(@aria-label, 'Bcc')]",
+        "//textarea[starts-with(@aria-label, 'BCC') or starts-with(@aria-label, 'Bcc')]"
+    ]
+    CC_TOGGLE_SELECTORS = [
+        "//span[@role='link' and starts-with(@aria-label, 'Add Cc')]",
+        "//span[starts-with(@data-tooltip, 'Add Cc')]",
+        "//span[text()='Cc']"
+    ]
+    BCC_TOGGLE_SELECTORS = [
+        "//span[@role='link' and starts-with(@aria-label, 'Add Bcc')]",
+        "//span[starts-with(@data-tooltip, 'Add Bcc')]",
+        "//span[text()='Bcc']"
+    ]
+    SUBJECT_SELECTORS = [
+        "//input[@name='subjectbox']",
+        "//input[contains(@aria-label, 'Subject')]",
+        "//input[@placeholder='Subject']",
+        "//div[contains(@aria-label, 'Subject')]//input"
+    ]
+    BODY_SELECTORS = [
+        "//div[@aria-label='Message Body']",
+        "//div[contains(@aria-label, 'Message body')]",
+        "//div[@role='textbox']",
+        "//div[contains(@class, 'Am') and @role='textbox']",
+        "//div[contains(@class, 'editable')]"
+    ]
+    COMPOSE_DIALOG_SELECTOR = "//div[contains(@class, 'AD')]"
+    # Message rows in a mailbox view or search results (Sent, Drafts)
+    MESSAGE_ROW_SELECTORS = [
+        "//tr[contains(@class, 'zA')]",
+        "//div[@role='row' and contains(@class, 'zA')]",
+    ]
+    DISCARD_SELECTORS = [
+        "//div[contains(@class, 'AD')]//div[@role='button' and contains(@aria-label, 'Discard')]",
+        "//div[contains(@class, 'AD')]//div[contains(@data-tooltip, 'Discard')]",
+        "//div[contains(@class, 'AD')]//img[contains(@aria-label, 'Close')]",
+    ]
+    SEND_SELECTORS = [
+        "//div[@role='button' and contains(@class, 'T-I-atl')]",  # Most common Gmail send button
+        "//div[contains(@class, 'T-I') and contains(@class, 'J-J5-Ji') and contains(@class, 'aoO')]",
+        "//div[contains(@class, 'T-I') and contains(@class, 'J-J5-Ji') and contains(@class, 'T-I-atl')]",
+        "//div[@role='button' and contains(@data-tooltip, 'Send')]",
+        "//div[@role='button' and contains(@aria-label, 'Send')]",
+        "//div[@role='button' and contains(text(), 'Send')]",
+        "//div[contains(@class, 'dC') and @role='button']",
+        "//div[contains(@class, 'T-I') and contains(@class, 'J-J5-Ji')]",
+        "//button[contains(text(), 'Send')]",
+        "//input[@type='submit' and @value='Send']"
+    ]
+
+    def __init__(self, email, password, screenshot_dir="screenshots", emit_callback=None,
+                 pacing=None, login_url=None, mail_url=None, selector_cache=None, text_entry=None,
+                 screenshots=None, session_store=None, profile=None, tracer=None, backend=None,
+                 compose_strategy=None, recipient_cache=None, send_checkpoints=None):
         self.email = email
         self.password = password
         self.screenshot_dir = screenshot_dir
         os.makedirs(screenshot_dir, exist_ok=True)
         self.emit = emit_callback
+        # Frames taken between jobs (health checks, re-login) all go to this agent's one folder
+        self._idle_screenshots = ScreenshotPipeline(root=screenshot_dir)
+        self.screenshots = screenshots or self._idle_screenshots
+        self.pacing = get_pacing(pacing)
+        self.login_url = login_url or self.LOGIN_URL
+        self.mail_url = mail_url or self.MAIL_URL
+        self.selector_cache = selector_cache or default_selector_cache()
+        self.text_entry = build_text_entry(text_entry, self.pacing)
+        self.session_store = session_store or default_session_store()
+        self.profile = get_browser_profile(profile)
+        self.page_loads = []
+        self.typing_times = {}
+        self.tracer = tracer or default_tracer()
+        self.compose_strategy = get_compose_strategy(compose_strategy)
+        self.recipient_cache = recipient_cache or default_recipient_cache()
+        self.send_checkpoints = send_checkpoints or default_send_checkpoints()
+        self.last_compose = None
+        self.last_rejected = []
+        self.on_compose = None   # called with last_compose after every send (TabScheduler adapts on it)
+        self.wait_slice = None   # seconds per in-page wait when tabs share the driver (see window_view)
+        self._start_timing()
 
-        # Create undetected Chrome instance
-        options = uc.ChromeOptions()
-        options.add_argument("--start-maximized")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-popup-blocking")
-        options.add_argument("--disable-plugins-discovery")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--headless=new")
-        # Use undetected chromedriver
-        self.driver = uc.Chrome(options=options)
+        # Create undetected Chrome instance (imported here: it's the slowest import in the app)
+        import undetected_chromedriver as uc
+        options = self.profile.chrome_options(uc.ChromeOptions())
+        # Use undetected chromedriver, pinned to the shared patched binary
+        self.driver = launch_chrome(options)
+        self.driver.set_script_timeout(60)
+        self.profile.apply(self.driver)
+        self.backend = get_driver_backend(backend, self.driver, log=self._emit)
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         self.driver.delete_all_cookies()
 
-    def _emit(self, text=None, image_path=None):
+    def _emit(self, text=None):
         if self.emit:
-            self.emit(text, image_path)
+            self.emit(text)
         elif text:
             print(text)
 
+    def _start_timing(self, operation="session"):
+        self.step_timings = []
+        self.trace = self.tracer.start(operation, profile=self.profile.name, pacing=self.pacing.name)
+
+    def _mark(self, step, outcome="ok"):
+        """Record wall time spent since the previous mark under `step`"""
+        self.step_timings.append((step, self.trace.step(step, outcome)))
+
+    def _note(self, **attrs):
+        """Attach attributes (selector, method...) to the step in progress"""
+        self.trace.note(**attrs)
+
+    def attach(self, emit_callback=None, screenshots=None):
+        """Point status messages and screenshot frames at a new job"""
+        self.emit = emit_callback
+        self.screenshots = screenshots or self._idle_screenshots
+
     def wait_and_screenshot(self, name, timeout=20):
-        """Wait and take screenshot"""
+        """Wait for the page to settle and capture a screenshot frame"""
         if not self.driver:
             self._emit(f"[!] Cannot take screenshot, driver is None")
             return None
-        time.sleep(random.uniform(1, 2))
-        path = os.path.join(self.screenshot_dir, f"{name}.png")
+        wait_for_dom_settled(self.driver, timeout=self.pacing.settle_timeout)
+        self.pacing.pause("screenshot")
         try:
-            self.driver.save_screenshot(path)
-            self._emit(f"[✓] Screenshot saved: {path}", path)
+            self.screenshots.capture(self.driver, name, force=name.startswith("error"))
+            self._emit(f"[✓] Screenshot captured: {name}")
         except Exception as e:
             self._emit(f"[!] Screenshot failed: {e}")
-        return path
+        return name
 
-    def check_if_recipient_accepted(self):
-        """Check if the recipient email has been accepted/selected"""
-        if not self.driver:
-            return False
+    def probe(self, selectors, timeout=10, interactable=True, text=None):
+        """Resolve a whole candidate list in one round-trip.
+
+        Returns (element, selector) for the first visible and enabled match, waiting
+        on DOM mutations until one appears or `timeout` seconds pass overall.
+        """
+        if not self.driver or not selectors:
+            return None, None
         try:
-            # Look for signs that the email has been accepted
-            accepted_selectors = [
-                "//span[contains(@class, 'aZo') and contains(@email, '@')]",
-                "//span[contains(@class, 'go') and contains(@email, '@')]",
-                "//div[contains(@class, 'vR')]//span[contains(@email, '@')]",
-                "//span[contains(@title, '@')]"
-            ]
-            
-            for selector in accepted_selectors:
-                try:
-                    element = self.driver.find_element(By.XPATH, selector)
-                    text = element.get_attribute('textContent')
-                    if element and text and '@' in text:
-                        return True
-                except:
-                    continue
-            return False
-        except:
+            match = self._wait_in_slices(timeout, lambda seconds: self.driver.execute_async_script(
+                _PROBE_JS, list(selectors), int(seconds * 1000),
+                {"interactable": interactable, "text": text}
+            ))
+        except Exception as e:
+            self._emit(f"[!] Selector probe failed: {e}")
+            return None, None
+        if not match:
+            return None, None
+        index, element = match
+        return element, selectors[int(index)]
+
+    def _wait_in_slices(self, timeout, attempt, done=bool):
+        """Run attempt(seconds) for the whole timeout, or in wait_slice pieces so other tabs get the driver in between"""
+        if not self.wait_slice:
+            return attempt(timeout)
+        deadline = time.monotonic() + timeout
+        while True:
+            result = attempt(min(self.wait_slice, max(0.0, deadline - time.monotonic())))
+            if done(result) or time.monotonic() >= deadline:
+                return result
+
+    def _find_clickable(self, step, selectors, timeout=10, log_failures=False):
+        """Return (element, selector) for the first clickable candidate, trying cached winners first"""
+        fingerprint = SelectorCache.fingerprint(self.driver.current_url)
+        ordered = self.selector_cache.order(step, fingerprint, selectors)
+        element, selector = self.probe(ordered, timeout=timeout)
+        if not element:
+            for candidate in ordered:
+                self.selector_cache.record_failure(step, fingerprint, candidate)
+            if log_failures:
+                self._emit(f"[!] No {step} selector matched within {timeout}s")
+            self.selector_cache.record_not_found(step)
+            self._note(selector=None)
+            return None, None
+        index = ordered.index(selector)
+        for candidate in ordered[:index]:
+            self.selector_cache.record_failure(step, fingerprint, candidate)
+        self.selector_cache.record_success(step, fingerprint, selector, first_try=index == 0)
+        self._note(selector=selector, selector_index=index)
+        return element, selector
+
+    def accepted_recipients(self, recipients, timeout=0):
+        """(field, lowercased address) pairs already shown as chips in their own field of the open
+        compose dialog, in one query (waiting up to `timeout` for all of them)"""
+        expected = {field: list(recipients.get(field, [])) for field in RECIPIENT_FIELDS}
+        total = sum(len(addresses) for addresses in expected.values())
+        if not self.driver or not total:
+            return set()
+        try:
+            return {tuple(pair) for pair in self._wait_in_slices(
+                timeout,
+                lambda seconds: self.driver.execute_async_script(ACCEPTED_JS, expected, int(seconds * 1000)),
+                done=lambda accepted: len(accepted) == total,
+            )}
+        except Exception as e:
+            self._emit(f"[!] Recipient check failed: {e}")
+            return set()
+
+    def _recipient_input(self, field):
+        """The To/Cc/Bcc input, revealing Cc and Bcc first if Gmail has them collapsed"""
+        selectors = {"to": self.TO_SELECTORS, "cc": self.CC_SELECTORS, "bcc": self.BCC_SELECTORS}[field]
+        if field != "to" and not self.probe(selectors, timeout=0)[0]:
+            toggles = self.CC_TOGGLE_SELECTORS if field == "cc" else self.BCC_TOGGLE_SELECTORS
+            toggle, _ = self._find_clickable(f"{field}_toggle", toggles, timeout=3)
+            if toggle:
+                toggle.click()
+        return self._find_clickable(field, selectors)
+
+    def _commit_recipients(self, element, addresses, selector):
+        """Type the addresses comma-terminated so each one becomes a chip as typed"""
+        strategy = self.text_entry.get("to") or self.text_entry["default"]
+        if not strategy.key_events:
+            strategy = get_text_entry("bulk")
+        element.click()
+        self.backend.type_text(element, ",".join(addresses) + ",", strategy, selector)
+
+    def fill_recipients(self, recipients, lookup_timeout=5):
+        """Commit every To/Cc/Bcc address as a chip and confirm them all with one DOM query.
+
+        Addresses already showing as chips in their own field (a reopened draft, a retried step) are
+        not typed again.
+        """
+        start = time.perf_counter()
+        self.last_rejected = []
+        addresses = [address for field in RECIPIENT_FIELDS for address in recipients.get(field, [])]
+        present = self.accepted_recipients(recipients)
+        inputs = {}
+        for field in RECIPIENT_FIELDS:
+            missing = [a for a in recipients.get(field, []) if (field, a.lower()) not in present]
+            if not missing:
+                continue
+            element, selector = self._recipient_input(field)
+            if not element:
+                self._emit(f"[❌] {field.capitalize()} field not found")
+                return False
+            inputs[field] = (element, selector)
+            self._commit_recipients(element, missing, selector)
+        known = {a.lower() for a in addresses if self.recipient_cache.known(a)}
+        # Returns as soon as every chip is there; the timeout only runs out when something is wrong
+        accepted = self.accepted_recipients(recipients, lookup_timeout)
+        # A known-good address that didn't take lost its keystrokes (or the field re-rendered): commit
+        # it once more. A new address that didn't resolve is most likely invalid, so don't retry it.
+        retry = {field: [a for a in recipients[field] if (field, a.lower()) not in accepted and a.lower() in known]
+                 for field in inputs}
+        if any(retry.values()):
+            self.trace.retry()
+            for field, addresses_left in retry.items():
+                if addresses_left:
+                    element, selector = inputs[field]
+                    self._commit_recipients(element, addresses_left, selector)
+            accepted = self.accepted_recipients(recipients, lookup_timeout)
+        placed = [(field, a) for field in RECIPIENT_FIELDS for a in recipients.get(field, [])]
+        rejected = [a for field, a in placed if (field, a.lower()) not in accepted]
+        self.recipient_cache.record([a for field, a in placed if (field, a.lower()) in accepted], rejected)
+        elapsed = time.perf_counter() - start
+        self._note(recipients=len(addresses), known_recipients=len(known), rejected=len(rejected))
+        if rejected:
+            self.last_rejected = rejected
+            self._emit(f"[❌] Recipients not accepted: {', '.join(rejected)}")
             return False
+        self._emit(f"[✓] {len(addresses)} recipient(s) accepted in {elapsed * 1000:.0f} ms")
+        return True
 
-    def human_type(self, element, text):
-        """Type like a human"""
+    def human_type(self, element, text, field="text", selector=None):
+        """Type into a field using the text entry strategy configured for it"""
         if not element:
             self._emit("[!] Cannot type, element is None")
             return
+        strategy = self.text_entry.get(field) or self.text_entry["default"]
+        start = time.perf_counter()
         try:
             element.clear()
-            time.sleep(0.2)
-            for char in text:
-                element.send_keys(char)
-                time.sleep(random.uniform(0.05, 0.15))
+            self.backend.type_text(element, text, strategy, selector)
         except Exception as e:
             self._emit(f"[!] Typing failed: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        self.typing_times[field] = elapsed
+        self._note(text_entry=strategy.name, chars=len(text), backend=self.backend.name)
+        self._emit(f"[⏱] Typed {len(text)} chars into {field} in {elapsed * 1000:.0f} ms ({strategy.name})")
 
     def click_show_password(self):
         """Try to click show password button/checkbox"""
@@ -100,26 +434,15 @@ class BrowserAgent:
             self._emit("[!] Cannot click show password, driver is None")
             return False
         try:
-            show_password_selectors = [
-                "//input[@type='checkbox'][@aria-label='Show password']",
-                "//button[@aria-label='Show password']",
-                "//span[contains(text(), 'Show password')]",
-                "//div[contains(text(), 'Show password')]",
-                "//input[@type='checkbox'][contains(@aria-describedby, 'password')]",
-                "//button[contains(@class, 'show-password')]"
-            ]
-
-            for selector in show_password_selectors:
+            show_element, _ = self._find_clickable("show_password", self.SHOW_PASSWORD_SELECTORS, timeout=3)
+            if show_element:
                 try:
-                    show_element = WebDriverWait(self.driver, 3).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
                     show_element.click()
                     self._emit("[✓] Show password button clicked!")
-                    time.sleep(random.uniform(0.5, 1))
+                    self.pacing.pause("short")
                     return True
-                except:
-                    continue
+                except Exception:
+                    pass
 
             self._emit("[ℹ] Show password button not found, continuing...")
             return False
@@ -127,14 +450,109 @@ class BrowserAgent:
             self._emit(f"[ℹ] Show password not available: {str(e)}")
             return False
 
-    def login_to_gmail(self):
-        """Login to Gmail using undetected chromedriver"""
+    @staticmethod
+    def _origin(url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def save_session(self):
+        """Store cookies and the mail origin's localStorage for the next driver"""
+        if not (self.session_store and self.driver):
+            return
+        try:
+            cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+            local_storage = {}
+            if self.driver.current_url.startswith(self._origin(self.mail_url)):
+                local_storage[self._origin(self.mail_url)] = self.driver.execute_script(
+                    "return Object.assign({}, window.localStorage);"
+                )
+            self.session_store.save(self.email, cookies, local_storage)
+            self._emit(f"[✓] Saved session state ({len(cookies)} cookies)")
+        except Exception as e:
+            self._emit(f"[!] Could not save session state: {e}")
+
+    def restore_session(self, timeout=10):
+        """Load saved cookies/localStorage and check the inbox opens without signing in"""
+        if not (self.session_store and self.driver):
+            return False
+        state = self.session_store.load(self.email)
+        if not state or not state["cookies"]:
+            return False
+        start = time.perf_counter()
+        ok = False
+        signed_out = False
+        seed_id = None
+        try:
+            self._emit("[🔄] Restoring saved Gmail session...")
+            cookies = [
+                {k: v for k, v in cookie.items() if k in (
+                    "name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")}
+                for cookie in state["cookies"]
+            ]
+            self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+            if state["local_storage"]:
+                seed_id = self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                    "source": _SEED_STORAGE_JS % json.dumps(state["local_storage"]),
+                })["identifier"]
+            self.driver.get(self.mail_url)
+            # Cheap validity check: whichever shows up first, the inbox or a sign-in form
+            element, selector = self.probe(
+                ["//div[@role='main']", "//input[@id='identifierId']", "//input[@type='password']"],
+                timeout=timeout,
+            )
+            ok = selector == "//div[@role='main']"
+            signed_out = selector is not None and not ok
+        except Exception as e:
+            self._emit(f"[!] Session restore failed: {e}")
+        finally:
+            if seed_id:
+                try:
+                    self.driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": seed_id})
+                except Exception:
+                    pass
+        elapsed = time.perf_counter() - start
+        self.session_store.record_restore(ok, elapsed)
+        if ok:
+            self._emit(f"[✅] Restored saved session in {elapsed:.2f}s, skipping login")
+            self.record_page_load("inbox")
+            self.wait_and_screenshot("08_login_success")
+        elif signed_out:
+            self._emit("[!] Saved session expired, falling back to full login")
+            self.session_store.delete(self.email)
+            self.driver.delete_all_cookies()
+        else:
+            # A slow page or a DevTools hiccup says nothing about the session: keep it for next time
+            self._emit("[!] Couldn't confirm the saved session, falling back to full login")
+            self.driver.delete_all_cookies()
+        return ok
+
+    def login_to_gmail(self, restore=True):
+        """Reuse a saved session when it is still valid, otherwise sign in from scratch"""
         if not self.driver:
             self._emit("[!] Cannot login, driver is None")
             return False
+        self._start_timing("login")
+        if restore and self.session_store:
+            restored = self.restore_session()
+            self._mark("restore_session", "ok" if restored else "expired")
+            if restored:
+                self.trace.finish(True, method="restore")
+                return True
+        start = time.perf_counter()
+        ok = self._full_login()
+        self.trace.finish(ok, self.LOGIN_STEPS, method="full")
+        if self.session_store:
+            self.session_store.record_login(ok, time.perf_counter() - start)
+            if ok:
+                self.save_session()
+        return ok
+
+    def _full_login(self):
+        """Login to Gmail using undetected chromedriver"""
         try:
             self._emit("[🔄] Opening Gmail...")
-            self.driver.get("https://accounts.google.com/signin")
+            self.driver.get(self.login_url)
+            self._mark("open_login")
             self.wait_and_screenshot("01_gmail_page")
 
             # Enter email
@@ -144,7 +562,8 @@ class BrowserAgent:
             )
             email_input.clear()
             email_input.click()
-            self.human_type(email_input, self.email)
+            self.human_type(email_input, self.email, field="email", selector="//input[@id='identifierId']")
+            self._mark("enter_email")
             self.wait_and_screenshot("02_email_entered")
 
             # Click Next
@@ -153,34 +572,16 @@ class BrowserAgent:
             self.wait_and_screenshot("03_next_clicked")
 
             # Wait for password page
-            time.sleep(random.uniform(2, 4))
+            self.pacing.pause("think")
             self._emit("[🔄] Waiting for password field to appear...")
             self.wait_and_screenshot("04_password_page_loaded")
 
             # Find password input
             self._emit("[🔄] Looking for password input field...")
-            password_selectors = [
-                "//input[@name='password']",
-                "//input[@type='password']",
-                "//input[@aria-label='Enter your password']",
-                "//input[contains(@aria-describedby, 'password')]",
-                "//div[@id='password']//input",
-                "//input[@autocomplete='current-password']",
-                "//input[@name='Passwd']",  # Add this if you see it in the HTML
-            ]
-
-            password_input = None
-            for selector in password_selectors:
-                try:
-                    password_input = WebDriverWait(self.driver, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    self._emit(f"[✓] Password field found with selector: {selector}")
-                    break
-                except:
-                    continue
-
-            if not password_input:
+            password_input, selector = self._find_clickable("password", self.PASSWORD_SELECTORS)
+            if password_input:
+                self._emit(f"[✓] Password field found with selector: {selector}")
+            else:
                 self._emit("[❌] Password field not found with any selector")
                 self.wait_and_screenshot("error_password_field_not_found")
                 return False
@@ -188,9 +589,10 @@ class BrowserAgent:
             # Enter password
             self._emit("[🔄] Clicking on password input box...")
             password_input.click()
-            time.sleep(0.5)
+            self.pacing.pause("short")
             password_input.clear()
-            self.human_type(password_input, self.password)
+            self.human_type(password_input, self.password, field="password", selector=selector)
+            self._mark("enter_password")
             self.wait_and_screenshot("05_password_field_filled")
 
             # Click Next
@@ -204,10 +606,12 @@ class BrowserAgent:
                 WebDriverWait(self.driver, 30).until(
                     EC.any_of(
                         EC.presence_of_element_located((By.XPATH, "//div[text()='Compose']")),
-                        EC.url_contains("mail.google.com"),
+                        EC.url_contains(self.mail_url),
                         EC.presence_of_element_located((By.XPATH, "//div[@role='main']"))
                     )
                 )
+                self._mark("confirm_login")
+                self.record_page_load("inbox")
                 self.wait_and_screenshot("08_login_success")
                 self._emit("[✅] Login successful!")
                 return True
@@ -222,334 +626,393 @@ class BrowserAgent:
             self.wait_and_screenshot("error_login_exception")
             return False
 
-    def compose_and_send_email(self, to, subject, body):
-        """Compose and send email with improved selectors"""
+    def compose_and_send_email(self, to, subject, body, cc=None, bcc=None, idempotency_key=None):
+        """Compose and send email, tracing each step and which compose strategy ran.
+
+        `to`, `cc` and `bcc` each take one address, a comma/semicolon-separated string or a list.
+        With an `idempotency_key` the flow is checkpointed, so a retry of the same key resumes
+        where it stopped and never sends the message twice.
+        """
         if not self.driver:
             self._emit("[!] Cannot send email, driver is None")
             return False
+        recipients = normalize_recipients(to, cc, bcc)
+        if not recipients.get("to"):
+            self._emit("[!] Cannot send email without a recipient")
+            return False
+        self._start_timing("send_email")
+        strategy, steps, fallback_reason = "interactive", self.SEND_STEPS, None
+        flow = SendFlow(self, recipients, subject, body, key=idempotency_key, checkpoints=self.send_checkpoints,
+                        log=self._emit)
+        ok = None
+        if flow.already_sent():
+            ok, strategy, steps = True, "checkpoint", ()
+        elif self.compose_strategy == "url":
+            url, fallback_reason = build_compose_url(self.mail_url, to, subject, body, cc=cc, bcc=bcc)
+            if url:
+                ok = self._compose_via_url(url, recipients, subject, body)
+                if ok is None:
+                    fallback_reason = "prefill_mismatch"
+                else:
+                    strategy, steps = "url", self.URL_SEND_STEPS
+                    if ok:
+                        flow.record_sent()
+            if fallback_reason:
+                self._emit(f"[ℹ] Compose URL not used ({fallback_reason}), using the interactive flow")
+        if ok is None:
+            ok = self._compose_and_send(flow)
+        elapsed = self.trace.finish(ok, steps, compose_strategy=strategy, fallback_reason=fallback_reason)
+        self.last_compose = {"strategy": strategy, "seconds": round(elapsed, 3), "fallback_reason": fallback_reason,
+                             "ok": bool(ok)}
+        self._emit(f"[⏱] {strategy.capitalize()} compose took {elapsed:.2f}s")
+        if self.on_compose:
+            self.on_compose(self.last_compose)
+        return ok
+
+    def _compose_via_url(self, url, recipients, subject, body):
+        """Send through a prefilled compose view; None means nothing was sent and the caller should fall back"""
         try:
-            # Make sure we're on Gmail
-            if "mail.google.com" not in self.driver.current_url:
-                self._emit("[🔄] Navigating to Gmail...")
-                self.driver.get("https://mail.google.com")
-                time.sleep(5)
+            self._emit("[🔄] Opening prefilled compose window...")
+            self.driver.get(url)
+            wait_for_page_ready(self.driver)
+            subject_box, _ = self.probe(self.SUBJECT_SELECTORS, timeout=20, interactable=False)
+            body_area, _ = self.probe(self.BODY_SELECTORS, timeout=5)
+            self._mark("open_compose_url", "ok" if subject_box and body_area else "failed")
+            if not (subject_box and body_area):
+                self._emit("[!] Prefilled compose window did not open")
+                self.wait_and_screenshot("error_compose_url_not_opened")
+                self.driver.get(self.mail_url)
+                return None
+            self.wait_and_screenshot("09_compose_opened")
+            checks = self.driver.execute_script(_PREFILL_JS, subject_box, body_area, recipients, subject, body)
+            mismatched = [field for field, matched in checks.items() if not matched]
+            self._note(mismatched=mismatched or None)
+            self._mark("verify_prefill", "mismatch" if mismatched else "ok")
+            if mismatched:
+                self._emit(f"[!] Prefilled compose doesn't match the message ({', '.join(mismatched)})")
+                self.reset_compose()
+                self.driver.get(self.mail_url)
+                return None
+            self._emit("[✓] Compose window prefilled from URL")
+        except Exception as e:
+            self._emit(f"[!] Compose URL failed: {e}")
+            return None
+        try:
+            return self._send_and_confirm(body_area)
+        except Exception as e:
+            self._emit(f"[❌] Email sending failed: {str(e)}")
+            self.wait_and_screenshot("error_email_failed_detailed")
+            return False
 
-            self.wait_and_screenshot("08_gmail_loaded")
+    def _compose_and_send(self, flow):
+        """Run the interactive flow step by step, retrying and resuming failed steps (see send_flow)"""
+        try:
+            return flow.run()
+        except Exception as e:
+            self._emit(f"[❌] Email sending failed: {str(e)}")
+            self.wait_and_screenshot("error_email_failed_detailed")
+            return False
 
-            # Wait for Gmail to fully load
+    def open_inbox(self):
+        """Make sure the Gmail inbox is showing (a prefilled compose view left over from a URL send doesn't count)"""
+        if self.mail_url not in self.driver.current_url or "view=cm" in self.driver.current_url \
+                or "#search/" in self.driver.current_url:
+            self._emit("[🔄] Navigating to Gmail...")
+            self.driver.get(self.mail_url)
+            wait_for_page_ready(self.driver)
+        try:
             WebDriverWait(self.driver, 30).until(
                 EC.presence_of_element_located((By.XPATH, "//div[@role='main']"))
             )
+        except TimeoutException:
+            self._emit("[❌] Gmail inbox did not load")
+            return False
+        self._mark("open_gmail")
+        if not self.page_loads:
+            self.record_page_load("inbox")
+        self.wait_and_screenshot("08_gmail_loaded")
+        return True
 
-            # Find and click Compose button - improved selectors
-            self._emit("[🔄] Looking for Compose button...")
-            compose_selectors = [
-                "//div[contains(@class, 'T-I') and contains(@class, 'T-I-KE') and contains(@class, 'L3')]",
-                "//div[@role='button' and contains(text(), 'Compose')]",
-                "//div[contains(@class, 'z0') and contains(text(), 'Compose')]",
-                "//div[contains(@class, 'aic') and contains(text(), 'Compose')]",
-                "//div[text()='Compose']",
-                "//button[contains(@aria-label, 'Compose')]"
-            ]
+    def relogin(self):
+        """Sign back in mid-send (the session expired under us) without losing the send's trace"""
+        trace, step_timings = self.trace, self.step_timings
+        try:
+            return self.login_to_gmail()
+        finally:
+            self.trace, self.step_timings = trace, step_timings
 
-            compose_button = None
-            for selector in compose_selectors:
-                try:
-                    compose_button = WebDriverWait(self.driver, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    self._emit(f"[✓] Compose button found with selector: {selector}")
-                    break
-                except Exception:
-                    continue
+    def compose_open(self):
+        """Whether a compose dialog is showing right now"""
+        dialog, _ = self.probe([self.COMPOSE_DIALOG_SELECTOR], timeout=0, interactable=False)
+        return dialog is not None
 
-            if not compose_button:
-                self._emit("[❌] Compose button not found")
-                self.wait_and_screenshot("error_compose_not_found")
-                return False
+    def open_compose(self, timeout=10):
+        """Click Compose once and wait for the dialog; the caller retries"""
+        self._emit("[🔄] Looking for Compose button...")
+        compose_button, selector = self._find_clickable("compose", self.COMPOSE_SELECTORS)
+        if not compose_button:
+            self._emit("[❌] Compose button not found")
+            self.wait_and_screenshot("error_compose_not_found")
+            return False
+        self._emit(f"[✓] Compose button found with selector: {selector}")
+        try:
+            compose_button.click()
+        except Exception as e:
+            self._emit(f"[!] Compose click failed: {e}")
+            self._wait_clickable(compose_button)
+            return False
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                EC.presence_of_element_located((By.XPATH, self.COMPOSE_DIALOG_SELECTOR))
+            )
+        except TimeoutException:
+            self._emit(f"[!] Compose window did not open within {timeout}s")
+            return False
+        self._mark("open_compose")
+        self.wait_and_screenshot("09_compose_opened")
+        return True
 
-            # Click compose with retry
-            for attempt in range(3):
-                try:
-                    compose_button.click()
-                    self._emit(f"[✓] Compose button clicked (attempt {attempt + 1})")
-                    time.sleep(2)
-                    break
-                except Exception as e:
-                    self._emit(f"[!] Compose click attempt {attempt + 1} failed: {e}")
-                    if attempt == 2:
-                        return False
-                    time.sleep(1)
+    def enter_recipients(self, recipients):
+        self._emit("[🔄] Filling recipients...")
+        if not self.fill_recipients(recipients):
+            self.wait_and_screenshot("error_recipients_not_accepted")
+            return False
+        self._mark("fill_recipient")
+        self.wait_and_screenshot("10_recipient_typed")
+        return True
 
-            self.wait_and_screenshot("09_compose_opened")
+    def fill_subject(self, subject):
+        self._emit("[🔄] Filling subject...")
+        subject_input, selector = self._find_clickable("subject", self.SUBJECT_SELECTORS)
+        if not subject_input:
+            self._emit("[❌] Subject field not found")
+            self.wait_and_screenshot("error_subject_field_not_found")
+            return False
+        self._emit(f"[✓] Subject field found with selector: {selector}")
+        subject_input.click()
+        self.pacing.pause("short")
+        subject_input.clear()
+        self.human_type(subject_input, subject, field="subject", selector=selector)
+        self._mark("fill_subject")
+        self.pacing.pause("step")
+        self.wait_and_screenshot("11_subject_filled")
+        return True
 
-            # Wait for compose window to open
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'AD')]"))
-            )
+    def fill_body(self, body):
+        self._emit("[🔄] Filling body...")
+        body_area, selector = self._find_clickable("body", self.BODY_SELECTORS)
+        if not body_area:
+            self._emit("[❌] Body area not found")
+            self.wait_and_screenshot("error_body_area_not_found")
+            return False
+        self._emit(f"[✓] Body area found with selector: {selector}")
+        body_area.click()
+        self.pacing.pause("short")
+        body_area.clear()
+        self.human_type(body_area, body, field="body", selector=selector)
+        self._mark("fill_body")
+        self.pacing.pause("step")
+        self.wait_and_screenshot("12_body_filled")
+        return True
 
-            # Fill recipient with multiple selector attempts
-            self._emit("[🔄] Filling recipient...")
-            to_selectors = [
-                "//textarea[@name='to']",
-                "//input[@name='to']",
-                "//textarea[contains(@aria-label, 'To')]",
-                "//input[contains(@aria-label, 'To')]",
-                "//div[@aria-label='To']//textarea",
-                "//div[@aria-label='To']//input"
-            ]
+    def click_send(self):
+        """Click Send in the open compose dialog; True once a click (or the keyboard shortcut) went through"""
+        body_area, _ = self.probe(self.BODY_SELECTORS, timeout=5)
+        if not body_area:
+            self._emit("[❌] Body area not found")
+            return False
+        if not self._click_send(body_area):
+            return False
+        self._mark("send")
+        return True
 
-            to_input = None
-            for selector in to_selectors:
-                try:
-                    to_input = WebDriverWait(self.driver, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    self._emit(f"[✓] To field found with selector: {selector}")
-                    break
-                except Exception:
-                    continue
+    def confirm_sent(self, close_timeout=5):
+        """After a send click: True when Gmail confirmed it, False when it's unconfirmed, None when the
+        compose dialog never closed (the click didn't take, so nothing was sent and it's safe to click again)"""
+        try:
+            WebDriverWait(self.driver, close_timeout).until(
+                EC.invisibility_of_element_located((By.XPATH, self.COMPOSE_DIALOG_SELECTOR))
+            )
+        except TimeoutException:
+            self._emit("[!] Compose window still open after clicking Send")
+            return None
+        confirmed = self._wait_sent_confirmation()
+        self._mark("confirm_sent", "ok" if confirmed else "unconfirmed")
+        if confirmed:
+            self.wait_and_screenshot("13_email_sent_success")
+            self._emit("[✅] Email sent successfully!")
+        else:
+            self.wait_and_screenshot("13_email_sent_no_confirmation")
+        return confirmed
 
-            if not to_input:
-                self._emit("[❌] To field not found")
-                self.wait_and_screenshot("error_to_field_not_found")
-                return False
+    def find_message(self, folder, recipients, subject, timeout=5):
+        """Search `folder` ("sent" or "drafts") for this message; returns its row element or None"""
+        query = f'in:{folder} to:{recipients["to"][0]} subject:"{subject}"'
+        self.driver.get(f"{self.mail_url}#search/{quote(query, safe='')}")
+        row, _ = self.probe(self.MESSAGE_ROW_SELECTORS, timeout=timeout, text=subject)
+        return row
+
+    def open_draft(self, recipients, subject, body, timeout=5):
+        """Reopen this message from Drafts; returns which of recipients/subject/body the draft already
+        carries, or None when there is no such draft"""
+        self.reset_compose()
+        row = self.find_message("drafts", recipients, subject, timeout)
+        if not row:
+            return None
+        row.click()
+        subject_box, _ = self.probe(self.SUBJECT_SELECTORS, timeout=10, interactable=False)
+        body_area, _ = self.probe(self.BODY_SELECTORS, timeout=5)
+        if not (subject_box and body_area):
+            self._emit("[!] Draft did not open")
+            return None
+        checks = self.driver.execute_script(_PREFILL_JS, subject_box, body_area, recipients, subject, body)
+        self.wait_and_screenshot("09_draft_reopened")
+        return checks
 
-            to_input.click()
-            time.sleep(0.5)
-            to_input.clear()
-            self.human_type(to_input, to)
-            time.sleep(1)
-            self.wait_and_screenshot("10_recipient_typed")
+    def _send_and_confirm(self, body_area):
+        """Click Send and wait for the confirmation toast"""
+        if not self._click_send(body_area):
+            return False
+        self._mark("send")
+        confirmed = self._wait_sent_confirmation()
+        self._mark("confirm_sent", "ok" if confirmed else "unconfirmed")
+        if confirmed:
+            self.wait_and_screenshot("13_email_sent_success")
+            self._emit("[✅] Email sent successfully!")
+        else:
+            self.wait_and_screenshot("13_email_sent_no_confirmation")
+            self._emit("[✅] Email likely sent (no confirmation toast found)")
+        return True
 
-            # Handle email suggestion dropdown - click the suggested email or press Enter/Tab
-            self._emit("[🔄] Handling email suggestion...")
+    def _click_send(self, body_area):
+        """Click Send (keyboard shortcut as the fallback); arms the sent watch first"""
+        self._emit("[🔄] Looking for Send button...")
+        send_button, selector = self._find_clickable("send", self.SEND_SELECTORS, timeout=5, log_failures=True)
+        self.backend.watch_sent()
+        if send_button:
+            self._emit(f"[✓] Send button found with selector: {selector}")
+        else:
+            self._emit("[❌] Send button not found with any selector")
+            self.wait_and_screenshot("error_send_button_not_found")
+            # Try keyboard shortcut as primary fallback
+            self._emit("[🔄] Trying keyboard shortcut Ctrl+Enter...")
             try:
-                # Method 1: Look for and click the email suggestion
-                suggestion_selectors = [
-                    f"//div[contains(@class, 'Sa') and contains(text(), '{to}')]",
-                    f"//div[contains(@class, 'Jd') and contains(text(), '{to}')]",
-                    f"//div[contains(@role, 'option') and contains(text(), '{to}')]",
-                    f"//span[contains(text(), '{to}')]",
-                    "//div[contains(@class, 'Sa')]",
-                    "//div[contains(@class, 'Jd')]",
-                    "//div[@role='option']"
-                ]
-                suggestion_clicked = False
-                for selector in suggestion_selectors:
-                    try:
-                        suggestion = WebDriverWait(self.driver, 3).until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                        suggestion.click()
-                        self._emit(f"[✓] Email suggestion clicked with selector: {selector}")
-                        suggestion_clicked = True
-                        time.sleep(1)
-                        break
-                    except Exception:
-                        continue
-                # Method 2: If no suggestion found, try pressing Enter or Tab
-                if not suggestion_clicked:
-                    self._emit("[🔄] No suggestion found, trying Enter key...")
-                    to_input.send_keys(Keys.RETURN)
-                    time.sleep(0.5)
-                    # If Enter doesn't work, try Tab
-                    if not self.check_if_recipient_accepted():
-                        self._emit("[🔄] Enter didn't work, trying Tab key...")
-                        to_input.send_keys(Keys.TAB)
-                        time.sleep(0.5)
-                # Method 3: If still not accepted, try clicking outside and back
-                if not self.check_if_recipient_accepted():
-                    self._emit("[🔄] Still not accepted, trying to click outside and back...")
-                    try:
-                        subject_input = self.driver.find_element(By.XPATH, "//input[@name='subjectbox']")
-                        subject_input.click()
-                        time.sleep(0.5)
-                        to_input.click()
-                        time.sleep(0.5)
-                        to_input.send_keys(Keys.RETURN)
-                        time.sleep(0.5)
-                    except Exception:
-                        pass
+                body_area.click()
+                body_area.send_keys(Keys.CONTROL + Keys.RETURN)
+                self._note(click_method="keyboard")
+                self._emit("[✓] Send triggered via keyboard shortcut")
+                return True
             except Exception as e:
-                self._emit(f"[!] Error handling email suggestion: {e}")
-                # Fallback: just press Enter
-                try:
-                    to_input.send_keys(Keys.RETURN)
-                    time.sleep(0.5)
-                except Exception:
-                    pass
-
-            # Fill subject
-            self._emit("[🔄] Filling subject...")
-            subject_selectors = [
-                "//input[@name='subjectbox']",
-                "//input[contains(@aria-label, 'Subject')]",
-                "//input[@placeholder='Subject']",
-                "//div[contains(@aria-label, 'Subject')]//input"
-            ]
-            subject_input = None
-            for selector in subject_selectors:
-                try:
-                    subject_input = WebDriverWait(self.driver, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    self._emit(f"[✓] Subject field found with selector: {selector}")
-                    break
-                except Exception:
-                    continue
-            if not subject_input:
-                self._emit("[❌] Subject field not found")
-                self.wait_and_screenshot("error_subject_field_not_found")
+                self._emit(f"[❌] Keyboard shortcut failed: {e}")
                 return False
-            subject_input.click()
-            time.sleep(0.5)
-            subject_input.clear()
-            self.human_type(subject_input, subject)
-            time.sleep(1)
-            self.wait_and_screenshot("11_subject_filled")
-
-            # Fill body
-            self._emit("[🔄] Filling body...")
-            body_selectors = [
-                "//div[@aria-label='Message Body']",
-                "//div[contains(@aria-label, 'Message body')]",
-                "//div[@role='textbox']",
-                "//div[contains(@class, 'Am') and @role='textbox']",
-                "//div[contains(@class, 'editable')]"
-            ]
-            body_area = None
-            for selector in body_selectors:
-                try:
-                    body_area = WebDriverWait(self.driver, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    self._emit(f"[✓] Body area found with selector: {selector}")
-                    break
-                except Exception:
-                    continue
-            if not body_area:
-                self._emit("[❌] Body area not found")
-                self.wait_and_screenshot("error_body_area_not_found")
+        self._emit("[🔄] Attempting to click Send button...")
+        method = None
+        try:
+            method = self.backend.click(send_button, selector)
+        except Exception as e:
+            self._emit(f"[!] {self.backend.name} click failed: {e}")
+        clicked = method is not None
+        if clicked:
+            self._emit(f"[✓] Send button clicked via {method}")
+            self._note(click_method=method)
+        elif self.backend.name != "webdriver":
+            # Fall back to the WebDriver click chain before reaching for the keyboard
+            method = WebDriverBackend(self.driver, self._emit).click(send_button)
+            clicked = method is not None
+            if clicked:
+                self._note(click_method=method)
+        if not clicked:
+            self._emit("[🔄] All click methods failed, trying keyboard shortcut...")
+            try:
+                body_area.click()
+                body_area.send_keys(Keys.CONTROL + Keys.RETURN)
+                clicked = True
+                self._emit("[✅] Email sent via keyboard shortcut fallback!")
+                self._note(click_method="keyboard")
+            except Exception as e:
+                self._emit(f"[❌] Final keyboard shortcut failed: {e}")
                 return False
-            body_area.click()
-            time.sleep(1)
-            body_area.clear()
-            self.human_type(body_area, body)
-            time.sleep(1)
-            self.wait_and_screenshot("12_body_filled")
-
-            # Send email
-            self._emit("[🔄] Looking for Send button...")
-            time.sleep(2)  # Give time for the compose window to be ready
-            send_selectors = [
-                "//div[@role='button' and contains(@class, 'T-I-atl')]",  # Most common Gmail send button
-                "//div[contains(@class, 'T-I') and contains(@class, 'J-J5-Ji') and contains(@class, 'aoO')]",
-                "//div[contains(@class, 'T-I') and contains(@class, 'J-J5-Ji') and contains(@class, 'T-I-atl')]",
-                "//div[@role='button' and contains(@data-tooltip, 'Send')]",
-                "//div[@role='button' and contains(@aria-label, 'Send')]",
-                "//div[@role='button' and contains(text(), 'Send')]",
-                "//div[contains(@class, 'dC') and @role='button']",
-                "//div[contains(@class, 'T-I') and contains(@class, 'J-J5-Ji')]",
-                "//button[contains(text(), 'Send')]",
-                "//input[@type='submit' and @value='Send']"
-            ]
-            send_button = None
-            for i, selector in enumerate(send_selectors):
-                try:
-                    send_button = WebDriverWait(self.driver, 5).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    self._emit(f"[✓] Send button found with selector {i+1}: {selector}")
-                    break
-                except Exception:
-                    self._emit(f"[!] Send selector {i+1} failed: {selector}")
-                    continue
-            if not send_button:
-                self._emit("[❌] Send button not found with any selector")
-                self.wait_and_screenshot("error_send_button_not_found")
-                # Try keyboard shortcut as primary fallback
-                self._emit("[🔄] Trying keyboard shortcut Ctrl+Enter...")
-                try:
-                    body_area.click()
-                    time.sleep(0.5)
-                    body_area.send_keys(Keys.CONTROL + Keys.RETURN)
-                    time.sleep(3)
-                    self.wait_and_screenshot("13_email_sent_via_keyboard")
-                    self._emit("[✅] Email sent via keyboard shortcut!")
+        return clicked
+
+    def _wait_clickable(self, element, timeout=5):
+        """Wait for an element to become clickable again before retrying"""
+        try:
+            WebDriverWait(self.driver, timeout).until(EC.element_to_be_clickable(element))
+            return True
+        except Exception:
+            return False
+
+    def _wait_sent_confirmation(self, timeout=15):
+        """Wait for Gmail's "Message sent" toast (an event with the CDP backend, a poll otherwise)"""
+        return self.backend.wait_sent(timeout)
+
+    def reset_compose(self):
+        """Close any leftover compose dialog so the next message starts clean"""
+        if not self.driver:
+            return False
+        try:
+            for _ in range(3):
+                dialog, _ = self.probe([self.COMPOSE_DIALOG_SELECTOR], timeout=0, interactable=False)
+                if not dialog:
                     return True
-                except Exception as e:
-                    self._emit(f"[❌] Keyboard shortcut failed: {e}")
-                    return False
-            self._emit("[🔄] Attempting to click Send button...")
-            clicked = False
-            for attempt in range(3):
-                try:
-                    self.driver.execute_script("arguments[0].scrollIntoView(true);", send_button)
-                    time.sleep(0.5)
-                    send_button.click()
-                    self._emit(f"[✓] Send button clicked successfully (attempt {attempt + 1})")
-                    clicked = True
-                    break
-                except Exception as e:
-                    self._emit(f"[!] Send click attempt {attempt + 1} failed: {e}")
-                    time.sleep(1)
-            if not clicked:
-                try:
-                    self._emit("[🔄] Trying JavaScript click...")
-                    self.driver.execute_script("arguments[0].click();", send_button)
-                    self._emit("[✓] Send button clicked via JavaScript!")
-                    clicked = True
-                except Exception as e:
-                    self._emit(f"[!] JavaScript click failed: {e}")
-            if not clicked:
-                try:
-                    self._emit("[🔄] Trying ActionChains click...")
-                    from selenium.webdriver.common.action_chains import ActionChains
-                    actions = ActionChains(self.driver)
-                    actions.move_to_element(send_button).click().perform()
-                    self._emit("[✓] Send button clicked via ActionChains!")
-                    clicked = True
-                except Exception as e:
-                    self._emit(f"[!] ActionChains click failed: {e}")
-            if not clicked:
-                self._emit("[🔄] All click methods failed, trying keyboard shortcut...")
-                try:
-                    body_area.click()
-                    time.sleep(0.5)
-                    body_area.send_keys(Keys.CONTROL + Keys.RETURN)
-                    time.sleep(3)
-                    clicked = True
-                    self._emit("[✅] Email sent via keyboard shortcut fallback!")
-                except Exception as e:
-                    self._emit(f"[❌] Final keyboard shortcut failed: {e}")
-                    return False
-            if not clicked:
-                self._emit("[❌] All send methods failed")
-                return False
-            time.sleep(3)
-            try:
-                WebDriverWait(self.driver, 15).until(
-                    EC.any_of(
-                        EC.presence_of_element_located((By.XPATH, "//span[contains(text(), 'Message sent')]")),
-                        EC.presence_of_element_located((By.XPATH, "//div[contains(text(), 'sent')]"))
-                    )
-                )
-                self.wait_and_screenshot("13_email_sent_success")
-                self._emit("[✅] Email sent successfully!")
-                return True
-            except TimeoutException:
-                self.wait_and_screenshot("13_email_sent_no_confirmation")
-                self._emit("[✅] Email likely sent (no confirmation toast found)")
-                return True
+                discard, _ = self.probe(self.DISCARD_SELECTORS, timeout=1)
+                if discard:
+                    discard.click()
+                else:
+                    dialog.send_keys(Keys.ESCAPE)
+                wait_for_dom_settled(self.driver, timeout=self.pacing.settle_timeout)
+            self._emit("[!] Compose window could not be closed")
+            return False
         except Exception as e:
-            self._emit(f"[❌] Email sending failed: {str(e)}")
-            self.wait_and_screenshot("error_email_failed_detailed")
+            self._emit(f"[!] Failed to reset compose window: {e}")
+            return False
+
+    def window_view(self, wait_slice=0.25):
+        """This agent's settings and driver for another window of the same browser.
+
+        Call it from the thread that will drive that window, once the window is current, so a
+        CDP backend attaches to it. Never quit() a view: it shares the browser with this agent.
+        """
+        view = copy.copy(self)
+        view.emit = None
+        view._idle_screenshots = view.screenshots = ScreenshotPipeline(root=self.screenshot_dir)
+        view.page_loads = []
+        view.typing_times = {}
+        view.last_compose = None
+        view.last_rejected = []
+        view.on_compose = None
+        view.wait_slice = wait_slice
+        view._start_timing()
+        view.backend = get_driver_backend(self.backend.name, self.driver, log=view._emit)
+        return view
+
+    def record_page_load(self, label):
+        """Log navigation timing for the current page alongside browser memory"""
+        stats = {"page": label, **page_load_stats(self.driver), "rss_mb": self.memory_usage()}
+        self.page_loads.append(stats)
+        self._emit(f"[⏱] {label} loaded in {stats.get('page_load_ms')} ms, "
+                   f"{stats.get('resources')} resources, {stats.get('transfer_kb')} KB, "
+                   f"browser RSS {stats['rss_mb']} MB ({self.profile.name} profile)")
+        return stats
+
+    def memory_usage(self):
+        """Resident memory of this agent's Chrome process tree in MB (None if unknown)"""
+        return process_tree_rss_mb(getattr(self.driver, "browser_pid", None))
+
+    def is_healthy(self):
+        """Check the driver is alive and still showing the Gmail inbox"""
+        if not self.driver:
+            return False
+        try:
+            return bool(self.driver.find_elements(By.XPATH, "//div[@role='main']"))
+        except Exception:
             return False
 
     def quit(self):
         """Properly close the browser to avoid handle errors"""
         try:
+            if getattr(self, 'backend', None):
+                self.backend.close()
             if hasattr(self, 'driver') and self.driver:
                 try:
                     self.driver.close()
@@ -0,0 +1,185 @@
+# Browser launch profiles: which Chrome flags, viewport and resource blocking an agent uses
+# "full" is the historical maximized, load-everything setup; "light" and "minimal"
+# drop heavy resources and cap caches so more sessions fit in the same memory.
+
+import os
+
+try:
+    import psutil
+except ImportError:  # Optional; falls back to /proc on Linux
+    psutil = None
+
+
+BASE_ARGS = [
+    "--disable-extensions",
+    "--disable-popup-blocking",
+    "--disable-plugins-discovery",
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--headless=new",
+    # Keep tabs that aren't in front running at full speed (TabScheduler composes in several at once)
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+]
+
+HEAVY_RESOURCE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg",
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+]
+
+THIRD_PARTY_PATTERNS = [
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*play.google.com/log*", "*apis.google.com/js/plusone*", "*ogs.google.com*",
+]
+
+_PAGE_LOAD_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return {
+  page_load_ms: nav ? Math.round(nav.loadEventEnd || nav.duration) : null,
+  dom_content_loaded_ms: nav ? Math.round(nav.domContentLoadedEventEnd) : null,
+  resources: resources.length,
+  transfer_kb: Math.round(resources.reduce((sum, r) => sum + (r.transferSize || 0), (nav && nav.transferSize) || 0) / 1024),
+};
+"""
+
+
+class BrowserProfile:
+    name = "full"
+    window_size = None          # None = --start-maximized
+    blocked_urls = []
+    block_images = False
+    extra_args = []
+
+    def chrome_options(self, options):
+        """Add this profile's flags and preferences to a ChromeOptions instance"""
+        if self.window_size:
+            options.add_argument(f"--window-size={self.window_size[0]},{self.window_size[1]}")
+        else:
+            options.add_argument("--start-maximized")
+        for arg in BASE_ARGS + self.extra_args:
+            options.add_argument(arg)
+        if self.block_images:
+            # Renderer-side block, so images are never decoded even if a pattern misses them
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        return options
+
+    def apply(self, driver):
+        """Install request blocking on a freshly started driver"""
+        if not self.blocked_urls:
+            return
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(self.blocked_urls)})
+
+
+class LightProfile(BrowserProfile):
+    name = "light"
+    window_size = (1280, 800)
+    blocked_urls = HEAVY_RESOURCE_PATTERNS
+    block_images = True
+    extra_args = [
+        "--disable-gpu",
+        "--mute-audio",
+        "--disk-cache-size=33554432",
+        "--disable-background-networking",
+        "--disable-component-update",
+        "--disable-default-apps",
+        "--disable-sync",
+        "--disable-features=Translate,MediaRouter,OptimizationHints",
+    ]
+
+
+class MinimalProfile(LightProfile):
+    name = "minimal"
+    window_size = (1024, 700)
+    blocked_urls = HEAVY_RESOURCE_PATTERNS + THIRD_PARTY_PATTERNS
+    extra_args = LightProfile.extra_args + [
+        "--renderer-process-limit=1",
+        "--js-flags=--max-old-space-size=256",
+        "--disk-cache-size=1",
+        "--media-cache-size=1",
+    ]
+
+
+BROWSER_PROFILES = {
+    "full": BrowserProfile,
+    "light": LightProfile,
+    "minimal": MinimalProfile,
+}
+
+
+def get_browser_profile(profile=None):
+    """Build a browser profile from a profile name or the BROWSER_PROFILE env var"""
+    if isinstance(profile, BrowserProfile):
+        return profile
+    name = (profile or os.getenv("BROWSER_PROFILE") or "full").lower()
+    if name not in BROWSER_PROFILES:
+        raise ValueError(f"Unknown browser profile '{name}', expected one of {sorted(BROWSER_PROFILES)}")
+    return BROWSER_PROFILES[name]()
+
+
+def _proc_children():
+    """Map of parent pid -> child pids for every process in /proc"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent pid; the command name may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _proc_rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a browser process plus all its renderer/GPU children, in MB"""
+    if not pid:
+        return None
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            procs = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for proc in procs:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        return round(total / (1024 * 1024), 1)
+    if not os.path.isdir("/proc"):
+        return None
+    children = _proc_children()
+    total_kb, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        total_kb += _proc_rss_kb(current)
+        pending.extend(children.get(current, []))
+    return round(total_kb / 1024, 1)
+
+
+def page_load_stats(driver):
+    """Navigation timing and transferred bytes for the current page"""
+    try:
+        return driver.execute_script(_PAGE_LOAD_JS)
+    except Exception:
+        return {}
@@ -0,0 +1,122 @@
+# Patched chromedriver, resolved once per Chrome version
+# undetected_chromedriver downloads and patches a fresh chromedriver copy for
+# every driver it starts, serialised on a lock file, so parallel workers queue
+# up behind each other. Here the patched binary is kept per major version in
+# CHROMEDRIVER_CACHE, built under an exclusive file lock by whichever process
+# gets there first, and every later driver just points at it.
+
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mail-agent", "chromedriver")
+
+_lock = threading.Lock()
+_resolved = {}  # version_main -> patched binary path
+_detected_version = []  # memoised installed Chrome major version
+_stats = {"resolve_seconds": 0.0, "patched": 0, "cache_hits": 0}
+
+
+def chrome_version_main():
+    """Pinned major version from CHROME_VERSION_MAIN, else the installed Chrome's (None if unknown)"""
+    pinned = os.getenv("CHROME_VERSION_MAIN")
+    if pinned:
+        return int(pinned)
+    if not _detected_version:
+        try:
+            import undetected_chromedriver as uc
+
+            binary = uc.find_chrome_executable()
+            output = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+            _detected_version.append(int(re.search(r"(\d+)\.\d+\.\d+", output).group(1)))
+        except Exception:
+            _detected_version.append(None)
+    return _detected_version[0]
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _is_patched(path):
+    from undetected_chromedriver.patcher import Patcher
+
+    return os.path.exists(path) and Patcher(executable_path=path).is_binary_patched(path)
+
+
+def resolve_chromedriver(version_main=None, cache_dir=None):
+    """Path of a patched chromedriver for `version_main`, building it on first use; None if it can't"""
+    version_main = version_main or chrome_version_main()
+    if not version_main:
+        return None
+    with _lock:
+        if version_main in _resolved:
+            _stats["cache_hits"] += 1
+            return _resolved[version_main]
+        start = time.perf_counter()
+        cache_dir = cache_dir or os.getenv("CHROMEDRIVER_CACHE") or CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+        name = f"chromedriver-{version_main}" + (".exe" if os.name == "nt" else "")
+        target = os.path.join(cache_dir, name)
+        with _FileLock(os.path.join(cache_dir, f"{name}.lock")):
+            if not _is_patched(target):
+                from undetected_chromedriver.patcher import Patcher
+
+                patcher = Patcher(version_main=version_main)
+                patcher.auto()
+                tmp = f"{target}.{os.getpid()}.tmp"
+                shutil.copy2(patcher.executable_path, tmp)
+                os.replace(tmp, target)
+                try:
+                    os.remove(patcher.executable_path)
+                except OSError:
+                    pass
+                _stats["patched"] += 1
+        _resolved[version_main] = target
+        _stats["resolve_seconds"] += time.perf_counter() - start
+        return target
+
+
+def launch_chrome(options):
+    """uc.Chrome pinned to the cached patched binary (uc's own per-process patching if that fails)"""
+    import undetected_chromedriver as uc
+
+    version_main = chrome_version_main()
+    try:
+        path = resolve_chromedriver(version_main)
+    except Exception as e:
+        print(f"[!] Could not prepare cached chromedriver, letting undetected_chromedriver patch its own: {e}")
+        path = None
+    if path:
+        return uc.Chrome(options=options, driver_executable_path=path, version_main=version_main)
+    return uc.Chrome(options=options, version_main=version_main)
+
+
+def stats():
+    with _lock:
+        return {
+            "chromedriver_resolve_seconds": round(_stats["resolve_seconds"], 3),
+            "chromedriver_patched_total": _stats["patched"],
+            "chromedriver_cache_hits_total": _stats["cache_hits"],
+        }
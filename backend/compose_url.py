@@ -0,0 +1,53 @@
+# Prefilled compose URLs for BrowserAgent
+# Gmail opens a compose window with recipients, subject and body already filled
+# from mail/?view=cm&to=..&su=..&body=.., which replaces the Compose click, the
+# dialog wait and three field fills with a single navigation. Bodies that are
+# too long for a URL or need rich text go through the interactive flow instead.
+
+import os
+import re
+from urllib.parse import quote, urlencode, urlparse
+
+from recipients import normalize_recipients
+
+COMPOSE_STRATEGIES = ("interactive", "url")
+
+# Gmail starts rejecting compose URLs well before browsers do; stay conservative
+MAX_URL_LENGTH = 2000
+
+_RICH_TEXT_RE = re.compile(r"<\s*/?\s*[a-zA-Z][^>]*>")
+
+
+def get_compose_strategy(name=None):
+    """Resolve `name` or the COMPOSE_STRATEGY env var (default "interactive")"""
+    name = (name or os.getenv("COMPOSE_STRATEGY") or "interactive").lower()
+    if name not in COMPOSE_STRATEGIES:
+        raise ValueError(f"Unknown compose strategy '{name}', expected one of {list(COMPOSE_STRATEGIES)}")
+    return name
+
+
+def compose_base(mail_url):
+    """The page that understands view=cm: /mail/ on Gmail, the page itself on a fixture"""
+    parsed = urlparse(mail_url)
+    if parsed.path in ("", "/"):
+        return f"{parsed.scheme}://{parsed.netloc}/mail/"
+    return mail_url.split("?", 1)[0]
+
+
+def build_compose_url(mail_url, to, subject, body, max_length=None, cc=None, bcc=None):
+    """Return (url, None) for a prefilled compose view, or (None, reason) when it can't carry the message"""
+    if max_length is None:
+        max_length = int(os.getenv("COMPOSE_URL_MAX_LENGTH", MAX_URL_LENGTH))
+    recipients = normalize_recipients(to, cc, bcc)
+    if not recipients.get("to"):
+        return None, "no_recipient"
+    if _RICH_TEXT_RE.search(body or ""):
+        return None, "rich_text"
+    body = (body or "").replace("\r\n", "\n")
+    params = {"view": "cm", **{field: ",".join(addresses) for field, addresses in recipients.items()}}
+    params.update(su=subject or "", body=body)
+    query = urlencode(params, quote_via=quote)
+    url = f"{compose_base(mail_url)}?{query}"
+    if len(url) > max_length:
+        return None, "too_long"
+    return url, None
@@ -0,0 +1,86 @@
+# Incremental parser for streamed {"subject": "...", "body": "..."} replies
+# Feeds on raw model tokens and exposes the partial string values as soon as
+# they arrive, without waiting for the JSON document to be complete.
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class DraftStreamParser:
+    def __init__(self, fields=("subject", "body")):
+        self.fields = fields
+        self.values = {}
+        self.text = ""
+        self._state = "key"      # key -> in_key -> colon -> value -> in_value -> key ...
+        self._key = ""
+        self._escape = None      # None, "" (after backslash) or partial \u digits
+        self._high_surrogate = None
+
+    def feed(self, chunk):
+        """Consume a chunk of model output; returns True if any tracked field changed"""
+        self.text += chunk
+        changed = False
+        for char in chunk:
+            state = self._state
+            if state == "key":
+                if char == '"':
+                    self._key = ""
+                    self._state = "in_key"
+            elif state == "in_key":
+                if char == '"':
+                    self._state = "colon"
+                else:
+                    self._key += char
+            elif state == "colon":
+                if char == ":":
+                    self._state = "value"
+                elif not char.isspace():
+                    # The quoted string was a value, not a key; keep scanning
+                    self._state = "key"
+            elif state == "value":
+                if char == '"':
+                    self._state = "in_value"
+                    if self._key in self.fields:
+                        self.values.setdefault(self._key, "")
+                elif not char.isspace():
+                    # Non-string value (number, object...): skip to the next key
+                    self._state = "key"
+            elif state == "in_value":
+                changed |= self._consume_value_char(char)
+        return changed
+
+    def _append(self, text):
+        if self._key in self.fields:
+            self.values[self._key] += text
+            return True
+        return False
+
+    def _consume_value_char(self, char):
+        if self._escape is not None:
+            if self._escape == "" and char != "u":
+                self._escape = None
+                return self._append(_ESCAPES.get(char, char))
+            self._escape += char
+            if len(self._escape) == 5:  # "u" + 4 hex digits
+                code, self._escape = self._escape[1:], None
+                try:
+                    point = int(code, 16)
+                except ValueError:
+                    return False
+                if 0xD800 <= point <= 0xDBFF:
+                    self._high_surrogate = point
+                    return False
+                if 0xDC00 <= point <= 0xDFFF and self._high_surrogate is not None:
+                    point = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (point - 0xDC00)
+                self._high_surrogate = None
+                return self._append(chr(point))
+            return False
+        if char == "\\":
+            self._escape = ""
+            return False
+        if char == '"':
+            self._state = "key"
+            return False
+        return self._append(char)
+
+    def snapshot(self):
+        return {field: self.values.get(field, "") for field in self.fields}
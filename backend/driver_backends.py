@@ -0,0 +1,330 @@
+# Driver backends for the compose/send hot path
+# "webdriver" drives the page with classic WebDriver HTTP commands (one
+# chromedriver round trip each); "cdp" keeps a persistent DevTools websocket to
+# the page and uses Input.insertText (with real key events where the page needs
+# them), Runtime.evaluate and a Runtime binding that fires the moment the
+# "Message sent" toast appears.
+
+import itertools
+import json
+import os
+import threading
+import urllib.request
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+SENT_BINDING = "__mailAgentSent"
+
+# Installed on every document; reports each newly shown "Message sent" toast through the binding
+_SENT_WATCH_JS = """
+(function () {
+  if (window.__mailAgentSentWatch) return;
+  window.__mailAgentSentWatch = true;
+  const check = (node) => node.nodeType === 1 && /Message sent/.test(node.textContent || '');
+  new MutationObserver((mutations) => {
+    for (const m of mutations) {
+      for (const node of m.addedNodes) {
+        if (check(node) && window.%(binding)s) { window.%(binding)s(String(Date.now())); return; }
+      }
+    }
+  }).observe(document.documentElement, {childList: true, subtree: true});
+})();
+""" % {"binding": SENT_BINDING}
+
+# Resolves an XPath to its first visible match, like BrowserAgent.probe does
+_RESOLVE_JS = """
+(function (xpath) {
+  const result = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  for (let i = 0; i < result.snapshotLength; i++) {
+    const el = result.snapshotItem(i);
+    if (el.nodeType === 1 && el.getClientRects().length) return el;
+  }
+  return null;
+})(%s)
+"""
+
+
+class DriverBackend:
+    name = "base"
+
+    def __init__(self, driver, log=None):
+        self.driver = driver
+        self.log = log or print
+
+    def start(self):
+        return self
+
+    def close(self):
+        pass
+
+    def evaluate(self, expression):
+        raise NotImplementedError
+
+    def type_text(self, element, text, strategy, selector=None):
+        strategy.enter(self.driver, element, text)
+
+    def click(self, element, selector=None):
+        """Click `element`; returns the method that worked, or None"""
+        raise NotImplementedError
+
+    def watch_sent(self):
+        """Arm the sent-confirmation watch; call before triggering the send"""
+
+    def wait_sent(self, timeout=15):
+        raise NotImplementedError
+
+
+class WebDriverBackend(DriverBackend):
+    """Classic WebDriver commands with the click fallback chain"""
+    name = "webdriver"
+
+    def evaluate(self, expression):
+        return self.driver.execute_script(f"return {expression};")
+
+    def _wait_clickable(self, element, timeout=5):
+        try:
+            WebDriverWait(self.driver, timeout).until(EC.element_to_be_clickable(element))
+            return True
+        except Exception:
+            return False
+
+    def click(self, element, selector=None):
+        for attempt in range(3):
+            try:
+                self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
+                element.click()
+                self.log(f"[✓] Clicked (attempt {attempt + 1})")
+                return "click"
+            except Exception as e:
+                self.log(f"[!] Click attempt {attempt + 1} failed: {e}")
+                self._wait_clickable(element)
+        try:
+            self.log("[🔄] Trying JavaScript click...")
+            self.driver.execute_script("arguments[0].click();", element)
+            return "javascript"
+        except Exception as e:
+            self.log(f"[!] JavaScript click failed: {e}")
+        try:
+            self.log("[🔄] Trying ActionChains click...")
+            from selenium.webdriver.common.action_chains import ActionChains
+            ActionChains(self.driver).move_to_element(element).click().perform()
+            return "action_chains"
+        except Exception as e:
+            self.log(f"[!] ActionChains click failed: {e}")
+        return None
+
+    def wait_sent(self, timeout=15):
+        """Wait for Gmail's "Message sent" toast"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                EC.any_of(
+                    EC.presence_of_element_located((By.XPATH, "//span[contains(text(), 'Message sent')]")),
+                    EC.presence_of_element_located((By.XPATH, "//div[contains(text(), 'sent')]"))
+                )
+            )
+            return True
+        except TimeoutException:
+            return False
+
+
+class CdpConnection:
+    """Minimal DevTools protocol client over one websocket"""
+
+    def __init__(self, ws_url, timeout=30):
+        import websocket  # websocket-client, installed with selenium
+
+        self.timeout = timeout
+        self._ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="cdp-reader", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        while not self._closed:
+            try:
+                message = json.loads(self._ws.recv())
+            except Exception:
+                break
+            if "id" in message:
+                with self._lock:
+                    waiter = self._pending.pop(message["id"], None)
+                if waiter:
+                    waiter[1] = message
+                    waiter[0].set()
+            else:
+                for handler in self._handlers.get(message.get("method"), []):
+                    try:
+                        handler(message.get("params", {}))
+                    except Exception as e:
+                        print(f"[CDP] Handler for {message.get('method')} failed: {e}")
+        self._closed = True
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for waiter in pending:
+            waiter[0].set()
+
+    def send(self, method, params=None, timeout=None):
+        if self._closed:
+            raise ConnectionError("DevTools connection is closed")
+        message_id = next(self._ids)
+        waiter = [threading.Event(), None]
+        with self._lock:
+            self._pending[message_id] = waiter
+        self._ws.send(json.dumps({"id": message_id, "method": method, "params": params or {}}))
+        if not waiter[0].wait(timeout or self.timeout):
+            with self._lock:
+                self._pending.pop(message_id, None)
+            raise TimeoutError(f"No DevTools reply to {method}")
+        reply = waiter[1]
+        if reply is None:
+            raise ConnectionError("DevTools connection closed while waiting for a reply")
+        if "error" in reply:
+            raise RuntimeError(f"{method} failed: {reply['error'].get('message')}")
+        return reply.get("result", {})
+
+    def on(self, event, handler):
+        self._handlers.setdefault(event, []).append(handler)
+
+    def close(self):
+        self._closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+
+class CdpBackend(DriverBackend):
+    """Persistent DevTools websocket: insertText, evaluate and an event-driven sent watch"""
+    name = "cdp"
+
+    # Strategies that already amount to "put this text in the field"; the
+    # keystroke-paced ones are left to WebDriver so human pacing still applies
+    FAST_STRATEGIES = ("bulk", "insert_text", "fill")
+
+    def __init__(self, driver, log=None):
+        super().__init__(driver, log)
+        self.connection = None
+        self._sent = threading.Event()
+
+    def _page_websocket_url(self):
+        address = self.driver.capabilities.get("goog:chromeOptions", {}).get("debuggerAddress")
+        if not address:
+            raise RuntimeError("Driver does not expose a DevTools debugger address")
+        with urllib.request.urlopen(f"http://{address}/json/list", timeout=5) as response:
+            targets = json.load(response)
+        handle = self.driver.current_window_handle
+        pages = [t for t in targets if t.get("type") == "page"]
+        # WebDriver window handles are the DevTools target ids
+        for target in pages:
+            if target.get("id") == handle:
+                return target["webSocketDebuggerUrl"]
+        if not pages:
+            raise RuntimeError("No page target to attach to")
+        return pages[0]["webSocketDebuggerUrl"]
+
+    def start(self):
+        self.connection = CdpConnection(self._page_websocket_url())
+        self.connection.on("Runtime.bindingCalled", self._on_binding)
+        self.connection.send("Runtime.enable")
+        self.connection.send("Runtime.addBinding", {"name": SENT_BINDING})
+        self.connection.send("Page.addScriptToEvaluateOnNewDocument", {"source": _SENT_WATCH_JS})
+        self.evaluate(_SENT_WATCH_JS)
+        return self
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+
+    def _on_binding(self, params):
+        if params.get("name") == SENT_BINDING:
+            self._sent.set()
+
+    def evaluate(self, expression):
+        result = self.connection.send("Runtime.evaluate", {
+            "expression": expression, "returnByValue": True, "awaitPromise": True,
+        })
+        if "exceptionDetails" in result:
+            raise RuntimeError(result["exceptionDetails"].get("text", "evaluation failed"))
+        return result.get("result", {}).get("value")
+
+    def _focus(self, element, selector):
+        if selector:
+            if self.evaluate(f"(function (el) {{ if (!el) return false; el.focus(); return true; }})"
+                             f"({_RESOLVE_JS % json.dumps(selector)})"):
+                return
+        self.driver.execute_script("arguments[0].focus();", element)
+
+    def type_text(self, element, text, strategy, selector=None):
+        if strategy.name not in self.FAST_STRATEGIES:
+            return super().type_text(element, text, strategy, selector)
+        self._focus(element, selector)
+        if not strategy.key_events:
+            self.connection.send("Input.insertText", {"text": text})
+            return
+        # insertText fires no keydown, so a strategy the page must see keys from (a comma
+        # committing a recipient chip) gets each comma as a real key press in between
+        for i, part in enumerate(text.split(",")):
+            if i:
+                self._press(",", "Comma", 188)
+            if part:
+                self.connection.send("Input.insertText", {"text": part})
+
+    def _press(self, key, code, key_code):
+        for event in ("keyDown", "keyUp"):
+            params = {"type": event, "key": key, "code": code, "windowsVirtualKeyCode": key_code}
+            if event == "keyDown":
+                params["text"] = key
+            self.connection.send("Input.dispatchKeyEvent", params)
+
+    def click(self, element, selector=None):
+        if not selector:
+            return None
+        point = self.evaluate(
+            "(function (el) { if (!el) return null; el.scrollIntoView({block: 'center'});"
+            " const r = el.getBoundingClientRect(); return [r.left + r.width / 2, r.top + r.height / 2]; })"
+            f"({_RESOLVE_JS % json.dumps(selector)})"
+        )
+        if not point:
+            return None
+        x, y = point
+        for event in ("mouseMoved", "mousePressed", "mouseReleased"):
+            params = {"type": event, "x": x, "y": y}
+            if event != "mouseMoved":
+                params.update(button="left", clickCount=1)
+            self.connection.send("Input.dispatchMouseEvent", params)
+        return "cdp_mouse"
+
+    def watch_sent(self):
+        self._sent.clear()
+
+    def wait_sent(self, timeout=15):
+        return self._sent.wait(timeout)
+
+
+DRIVER_BACKENDS = {
+    "webdriver": WebDriverBackend,
+    "cdp": CdpBackend,
+}
+
+
+def get_driver_backend(name, driver, log=None):
+    """Start the backend named by `name` or DRIVER_BACKEND; falls back to WebDriver if CDP can't attach"""
+    if isinstance(name, DriverBackend):
+        return name
+    name = (name or os.getenv("DRIVER_BACKEND") or "webdriver").lower()
+    if name not in DRIVER_BACKENDS:
+        raise ValueError(f"Unknown driver backend '{name}', expected one of {sorted(DRIVER_BACKENDS)}")
+    backend = DRIVER_BACKENDS[name](driver, log)
+    try:
+        return backend.start()
+    except Exception as e:
+        (log or print)(f"[!] {name} backend unavailable ({e}), using WebDriver")
+        backend.close()
+        return WebDriverBackend(driver, log).start()
@@ -1,24 +1,35 @@
 import os
+import threading
 from dotenv import load_dotenv
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
 import json
 
 load_dotenv()
 token = os.getenv("GITHUB_TOKEN")
-endpoint = "https://models.github.ai/inference"
-model = "openai/gpt-4.1"
+endpoint = os.getenv("INFERENCE_ENDPOINT", "https://models.github.ai/inference")
+model = os.getenv("INFERENCE_MODEL", "openai/gpt-4.1")
 
-if token is None:
-    raise ValueError("GITHUB_TOKEN environment variable is not set.")
+_client = None
+_client_lock = threading.Lock()
 
-client = ChatCompletionsClient(
-    endpoint=endpoint,
-    credential=AzureKeyCredential(token),
-)
+def get_client():
+    """Build the ChatCompletionsClient on first use (the Azure SDK is slow to import)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            if token is None:
+                raise ValueError("GITHUB_TOKEN environment variable is not set.")
+            from azure.ai.inference import ChatCompletionsClient
+            from azure.core.credentials import AzureKeyCredential
+
+            _client = ChatCompletionsClient(
+                endpoint=endpoint,
+                credential=AzureKeyCredential(token),
+            )
+        return _client
+
+def build_messages(intent: str) -> list:
+    from azure.ai.inference.models import SystemMessage, UserMessage
 
-def generate_email(intent: str) -> dict:
     prompt = f"""
     You are a helpful assistant that writes professional emails.
 
@@ -32,17 +43,48 @@ def generate_email(intent: str) -> dict:
       "body": "..."
     }}
     """
+    return [
+        SystemMessage("You are a helpful assistant that writes professional emails."),
+        UserMessage(prompt),
+    ]
+
+def request_timeouts(timeout):
+    """azure-core per-request timeouts, so a blocking call gives up on its own"""
+    if timeout is None:
+        return {}
+    return {"connection_timeout": timeout, "read_timeout": timeout, "timeout": timeout}
+
+def request_draft(intent: str, model_name: str = model, timeout: float = None) -> dict:
+    """Call the model once and parse its JSON reply; raises on any failure (or after `timeout` seconds)"""
+    response = get_client().complete(
+        messages=build_messages(intent),
+        temperature=0.7,
+        top_p=1.0,
+        model=model_name,
+        **request_timeouts(timeout)
+    )
+    content = response.choices[0].message.content
+    return json.loads(content)
+
+def stream_draft(intent: str, model_name: str = model, timeout: float = None):
+    """Yield the model's reply as text chunks as they arrive (closing the generator closes the stream)"""
+    response = get_client().complete(
+        stream=True,
+        messages=build_messages(intent),
+        temperature=0.7,
+        top_p=1.0,
+        model=model_name,
+        **request_timeouts(timeout)
+    )
+    try:
+        for update in response:
+            if update.choices and update.choices[0].delta and update.choices[0].delta.content:
+                yield update.choices[0].delta.content
+    finally:
+        response.close()
+
+def generate_email(intent: str) -> dict:
     try:
-        response = client.complete(
-            messages=[
-                SystemMessage("You are a helpful assistant that writes professional emails."),
-                UserMessage(prompt),
-            ],
-            temperature=0.7,
-            top_p=1.0,
-            model=model
-        )
-        content = response.choices[0].message.content
-        return json.loads(content)
+        return request_draft(intent)
     except Exception as e:
         return {"subject": "Error generating subject", "body": f"Error: {str(e)}"} 
\ No newline at end of file
@@ -0,0 +1,171 @@
+# Progress event bus for Socket.IO
+# Job progress is delivered only to the owning client's room. Bursts of status
+# lines are coalesced into one "text_batch" frame per flush interval, and
+# screenshot frames are throttled per client so a slow page doesn't flood the
+# socket; error frames always go through. With threadsafe=True (gevent/eventlet) only
+# the bus's own loop, running on the server's hub, touches the sockets: emits from
+# worker threads wait in an outbox that the loop drains every drain_interval.
+
+import threading
+import time
+from collections import deque
+
+
+class EventBus:
+    def __init__(self, socketio, flush_interval=0.1, max_batch=50, image_interval=0.5, threadsafe=False,
+                 drain_interval=0.01):
+        self.socketio = socketio
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.image_interval = image_interval
+        self.threadsafe = threadsafe
+        self.drain_interval = drain_interval
+        self._outbox = deque()   # (event, data, room) waiting for the loop when threadsafe
+
+        self._lock = threading.Lock()
+        self._texts = {}          # room -> [{"job_id", "text", "ts"}]
+        self._pending_images = {}  # room -> latest throttled frame
+        self._last_image = {}     # room -> monotonic time of the last frame sent
+        self._started = False
+        self._stats = {
+            "text_events": 0,
+            "text_frames": 0,
+            "image_events": 0,
+            "image_frames": 0,
+            "images_dropped": 0,
+            "other_events": 0,
+        }
+
+    def start(self):
+        """Start the flush loop now; with threadsafe=True call it from the server's main thread"""
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._started or not (self.flush_interval or self.threadsafe):
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        interval = self.flush_interval
+        if self.threadsafe:
+            interval = min(self.drain_interval, self.flush_interval or self.drain_interval)
+        last_flush = time.monotonic()
+        while True:
+            self.socketio.sleep(interval)
+            try:
+                if self.flush_interval and time.monotonic() - last_flush >= self.flush_interval:
+                    last_flush = time.monotonic()
+                    self.flush()
+                self._drain()
+            except Exception as e:
+                print(f"[!] Event bus flush failed: {e}")
+
+    def _send(self, event, data, room):
+        if self.threadsafe:
+            self._outbox.append((event, data, room))
+            self._ensure_started()
+        else:
+            self.socketio.emit(event, data, to=room)
+
+    def _drain(self):
+        while self._outbox:
+            event, data, room = self._outbox.popleft()
+            self.socketio.emit(event, data, to=room)
+
+    def text(self, room, text, job_id=None):
+        """Queue a status line for `room`; sent with the next batch"""
+        if not text:
+            return
+        if not self.flush_interval:
+            with self._lock:
+                self._stats["text_events"] += 1
+                self._stats["text_frames"] += 1
+            self._send("text", text, room)
+            return
+        self._ensure_started()
+        with self._lock:
+            self._stats["text_events"] += 1
+            queue = self._texts.setdefault(room, [])
+            queue.append({"job_id": job_id, "text": text, "ts": round(time.time(), 3)})
+            full = len(queue) >= self.max_batch
+        if full:
+            self.flush(room)
+
+    def image(self, room, frame, force=False):
+        """Send a screenshot frame, keeping at most one per `image_interval` per room"""
+        now = time.monotonic()
+        with self._lock:
+            self._stats["image_events"] += 1
+            due = force or now - self._last_image.get(room, 0.0) >= self.image_interval
+            if not due:
+                if room in self._pending_images:
+                    self._stats["images_dropped"] += 1
+                self._pending_images[room] = frame
+            else:
+                if self._pending_images.pop(room, None) is not None:
+                    self._stats["images_dropped"] += 1
+                self._last_image[room] = now
+                self._stats["image_frames"] += 1
+        if due:
+            # Text queued before the frame should be shown before it
+            self.flush(room, images=False)
+            self._send("image_frame", frame, room)
+        else:
+            self._ensure_started()
+
+    def emit(self, event, data, room):
+        """Send any other event right away, after the room's queued text"""
+        self.flush(room, images=False)
+        self.post(event, data, room)
+
+    def post(self, event, data, room=None):
+        """Send an event (to everyone when room is None) without batching; safe from any thread"""
+        with self._lock:
+            self._stats["other_events"] += 1
+        self._send(event, data, room)
+
+    def flush(self, room=None, images=True):
+        now = time.monotonic()
+        with self._lock:
+            rooms = [room] if room is not None else list(set(self._texts) | set(self._pending_images))
+            batches, frames = [], []
+            for r in rooms:
+                queue = self._texts.pop(r, None)
+                if queue:
+                    batches.append((r, queue))
+                    self._stats["text_frames"] += 1
+                if images and r in self._pending_images and now - self._last_image.get(r, 0.0) >= self.image_interval:
+                    frames.append((r, self._pending_images.pop(r)))
+                    self._last_image[r] = now
+                    self._stats["image_frames"] += 1
+        for r, queue in batches:
+            self._send("text_batch", queue, r)
+        for r, frame in frames:
+            self._send("image_frame", frame, r)
+
+    def drop_room(self, room):
+        """Forget a disconnected client's queued events"""
+        with self._lock:
+            self._texts.pop(room, None)
+            self._pending_images.pop(room, None)
+            self._last_image.pop(room, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        frames = stats["text_frames"] + stats["image_frames"] + stats["other_events"]
+        events = stats["text_events"] + stats["image_events"] + stats["other_events"]
+        return {
+            "events_text_total": stats["text_events"],
+            "events_text_frames_total": stats["text_frames"],
+            "events_image_total": stats["image_events"],
+            "events_image_frames_total": stats["image_frames"],
+            "events_images_dropped_total": stats["images_dropped"],
+            "events_other_total": stats["other_events"],
+            "events_frames_total": frames,
+            "events_coalescing_ratio": events / frames if frames else 0.0,
+        }
@@ -0,0 +1,181 @@
+# Offline Gmail-lookalike fixture server
+# Serves fixtures/signin.html and fixtures/mail.html with knobs for latency,
+# flakiness and DOM variants, and counts what the agent actually sent, so the
+# browser flow can be benchmarked without touching Google:
+#
+#   python fixture_server.py --port 8766 --latency 300 --fail-rate 0.05 --variant alt
+#   BrowserAgent(..., login_url="http://127.0.0.1:8766/signin.html", mail_url="http://127.0.0.1:8766/mail.html")
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+from flask import Flask, Response, jsonify, redirect, request
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Markup rewrites per DOM variant; each one moves the agent off its first-choice selectors
+VARIANTS = {
+    "default": {},
+    "alt": {
+        "signin.html": [
+            ('name="Passwd" aria-label="Enter your password"', 'name="password"'),
+        ],
+        "mail.html": [
+            ('class="T-I T-I-KE L3" role="button"', 'class="z0 T-I-KE" role="button"'),
+            ('<textarea name="to" aria-label="To recipients"></textarea>', '<input name="to" aria-label="To" />'),
+            ('aria-label="Message Body" role="textbox"', 'aria-label="Message body" role="textbox"'),
+            ('class="T-I J-J5-Ji aoO T-I-atl" role="button" data-tooltip="Send"',
+             'class="dC T-I-atl" role="button" data-tooltip="Send (Ctrl-Enter)"'),
+        ],
+    },
+}
+
+
+def load_page(name, variant):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        html = f.read()
+    for old, new in VARIANTS[variant].get(name, []):
+        html = html.replace(old, new)
+    return html
+
+
+def create_app(latency=300, page_latency=0.0, fail_rate=0.0, drop_rate=0.0, variant="default",
+               crash_rate=0.0, click_fail_rate=0.0):
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown fixture variant '{variant}', expected one of {sorted(VARIANTS)}")
+    app = Flask(__name__)
+    app.config["FIXTURE"] = {
+        "latency": latency,            # ms, client-side delay of each simulated server round trip
+        "page_latency": page_latency,  # s, server-side delay before each page is returned
+        "fail_rate": fail_rate,        # fraction of page loads answered with HTTP 503
+        "drop_rate": drop_rate,        # fraction of sends that never show "Message sent"
+        "crash_rate": crash_rate,      # fraction of draft autosaves followed by a page reload
+        "click_fail_rate": click_fail_rate,  # fraction of Compose/Send clicks that are ignored
+        "variant": variant,
+    }
+    app.config["STATS"] = {"page_loads": 0, "page_failures": 0, "sent": 0, "dropped": 0, "draft_saves": 0}
+    app.config["SENT"] = []
+    app.config["DRAFTS"] = {}
+    lock = threading.Lock()
+
+    def count(name, amount=1):
+        with lock:
+            app.config["STATS"][name] += amount
+
+    def serve_page(name):
+        config = app.config["FIXTURE"]
+        count("page_loads")
+        if config["page_latency"]:
+            time.sleep(config["page_latency"])
+        if random.random() < config["fail_rate"]:
+            count("page_failures")
+            return Response("Temporarily unavailable", status=503)
+        knobs = {"latency": config["latency"], "dropRate": config["drop_rate"], "crashRate": config["crash_rate"],
+                 "clickFailRate": config["click_fail_rate"], "report": True}
+        html = load_page(name, config["variant"]).replace(
+            "<script>", f"<script>window.FIXTURE = {json.dumps(knobs)};</script>\n  <script>", 1
+        )
+        return Response(html, mimetype="text/html")
+
+    @app.route("/")
+    def index():
+        return redirect("/signin.html")
+
+    @app.route("/signin.html")
+    def signin():
+        return serve_page("signin.html")
+
+    @app.route("/mail.html")
+    def mail():
+        return serve_page("mail.html")
+
+    @app.route("/api/sent", methods=["GET", "POST"])
+    def sent():
+        if request.method == "GET":
+            with lock:
+                return jsonify(list(app.config["SENT"]))
+        count("sent")
+        with lock:
+            app.config["SENT"].append(request.get_json(silent=True) or {})
+        return "", 204
+
+    @app.route("/api/drafts", methods=["GET", "POST"])
+    def drafts():
+        with lock:
+            if request.method == "GET":
+                return jsonify(list(app.config["DRAFTS"].values()))
+            draft = request.get_json(silent=True) or {}
+            if draft.get("id"):
+                app.config["DRAFTS"][draft["id"]] = draft
+        count("draft_saves")
+        return "", 204
+
+    @app.route("/api/drafts/delete", methods=["POST"])
+    def delete_draft():
+        with lock:
+            app.config["DRAFTS"].pop((request.get_json(silent=True) or {}).get("id"), None)
+        return "", 204
+
+    @app.route("/api/dropped", methods=["POST"])
+    def dropped():
+        count("dropped")
+        return "", 204
+
+    @app.route("/api/config", methods=["GET", "POST"])
+    def config():
+        if request.method == "POST":
+            updates = request.get_json(force=True)
+            if updates.get("variant", app.config["FIXTURE"]["variant"]) not in VARIANTS:
+                return jsonify({"error": f"Unknown variant, expected one of {sorted(VARIANTS)}"}), 400
+            app.config["FIXTURE"].update({k: v for k, v in updates.items() if k in app.config["FIXTURE"]})
+        return jsonify(app.config["FIXTURE"])
+
+    @app.route("/stats")
+    def stats():
+        with lock:
+            return jsonify(dict(app.config["STATS"]))
+
+    @app.route("/reset", methods=["POST"])
+    def reset():
+        with lock:
+            for key in app.config["STATS"]:
+                app.config["STATS"][key] = 0
+            app.config["SENT"].clear()
+            app.config["DRAFTS"].clear()
+        return "", 204
+
+    return app
+
+
+def serve_in_thread(app, host="127.0.0.1", port=0):
+    """Start `app` on a background thread; returns (server, base_url)"""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Gmail-lookalike fixture server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=int, default=300, help="Client-side ms per simulated round trip")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="Server-side seconds per page load")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of page loads answered with HTTP 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of sends with no confirmation")
+    parser.add_argument("--crash-rate", type=float, default=0.0, help="Fraction of draft autosaves that reload the page")
+    parser.add_argument("--click-fail-rate", type=float, default=0.0, help="Fraction of Compose/Send clicks ignored")
+    parser.add_argument("--variant", default="default", choices=sorted(VARIANTS))
+    args = parser.parse_args()
+    app = create_app(args.latency, args.page_latency, args.fail_rate, args.drop_rate, args.variant,
+                     args.crash_rate, args.click_fail_rate)
+    app.run(args.host, args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
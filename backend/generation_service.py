@@ -0,0 +1,318 @@
+# Async, cached and coalesced email draft generation
+# Wraps email_generator.request_draft (the ChatCompletionsClient call) in an
+# asyncio loop running on its own thread, so Socket.IO handlers can hand off
+# work without blocking and identical intents share one upstream call. With an
+# IntentIndex, near-duplicates of earlier or curated intents skip the model too.
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from draft_stream import DraftStreamParser
+from metrics import Histogram
+
+ERROR_DRAFT_SUBJECT = "Error generating subject"
+
+
+def error_draft(error):
+    """The draft a client gets in place of one that could not be generated"""
+    return {"subject": ERROR_DRAFT_SUBJECT, "body": f"Error: {str(error)}"}
+
+
+def normalize_intent(intent):
+    """Case-, whitespace- and trailing-punctuation-insensitive cache key"""
+    return re.sub(r"\s+", " ", intent.strip().lower()).strip(" .!?")
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, max_entries=256, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class GenerationService:
+    def __init__(self, request_fn=None, model=None, max_concurrency=4, timeout=30.0,
+                 retries=2, backoff=0.5, cache_size=256, cache_ttl=3600, stream_fn=None,
+                 partial_interval=0.05, intent_index=None):
+        if request_fn is None:
+            from email_generator import model as default_model, request_draft, stream_draft
+            request_fn = request_draft
+            stream_fn = stream_fn or stream_draft
+            model = model or default_model
+        self.request_fn = request_fn
+        self.stream_fn = stream_fn
+        self.partial_interval = partial_interval
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.intent_index = intent_index
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="generation-loop", daemon=True)
+        self._thread.start()
+        self._semaphore = None
+        # Model calls get their own threads: at most max_concurrency, each held until its call returns
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-call")
+        self._inflight = {}
+
+        self.latency = Histogram()
+        self.upstream_latency = Histogram()
+        self.first_content_latency = Histogram()
+        self._stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "index_hits": 0,
+            "coalesced": 0,
+            "upstream_calls": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "errors": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _key(self, intent):
+        return (self.model, normalize_intent(intent))
+
+    async def _call_upstream(self, intent):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count("retries")
+                await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+            async with self._semaphore:
+                self._count("upstream_calls")
+                start = time.perf_counter()
+                # request_fn is given the timeout too, so the blocking call ends by itself
+                call = self._loop.run_in_executor(
+                    self._executor, partial(self.request_fn, intent, self.model, timeout=self.timeout)
+                )
+                try:
+                    return await asyncio.wait_for(asyncio.shield(call), self.timeout)
+                except asyncio.TimeoutError:
+                    self._count("timeouts")
+                    last_error = TimeoutError(f"Model did not answer within {self.timeout}s")
+                    # Keep the concurrency slot until the call has actually returned, and use
+                    # its draft if it got one rather than paying for a retry
+                    try:
+                        return await call
+                    except Exception:
+                        pass
+                except Exception as e:
+                    last_error = e
+                finally:
+                    self.upstream_latency.observe(time.perf_counter() - start)
+        raise last_error
+
+    def _stream_blocking(self, intent, on_partial, started, cancelled):
+        """Run a streaming completion, pushing partial drafts to `on_partial` as they parse.
+
+        Once `cancelled` is set no more partials are pushed and the stream is closed at the next chunk.
+        """
+        parser = DraftStreamParser()
+        last_push = 0.0
+        chunks = self.stream_fn(intent, self.model, timeout=self.timeout)
+        try:
+            for chunk in chunks:
+                if cancelled.is_set():
+                    return None
+                if not parser.feed(chunk):
+                    continue
+                now = time.perf_counter()
+                if not last_push:
+                    self.first_content_latency.observe(now - started)
+                if now - last_push >= self.partial_interval and not cancelled.is_set():
+                    last_push = now
+                    on_partial(parser.snapshot())
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+        try:
+            return json.loads(parser.text)
+        except ValueError:
+            draft = parser.snapshot()
+            if not (draft["subject"] or draft["body"]):
+                raise ValueError(f"Model returned no draft: {parser.text[:200]!r}")
+            return draft
+
+    async def _call_streaming(self, intent, on_partial):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self._count("upstream_calls")
+            start = time.perf_counter()
+            cancelled = threading.Event()
+            call = self._loop.run_in_executor(
+                self._executor, self._stream_blocking, intent, on_partial, start, cancelled
+            )
+            try:
+                return await asyncio.wait_for(asyncio.shield(call), self.timeout)
+            except asyncio.TimeoutError:
+                self._count("timeouts")
+                # Stop the partials and wait for the stream to close before the fallback call starts
+                cancelled.set()
+                await asyncio.gather(call, return_exceptions=True)
+                raise TimeoutError(f"Model did not finish streaming within {self.timeout}s")
+            finally:
+                self.upstream_latency.observe(time.perf_counter() - start)
+
+    async def generate_async(self, intent, on_partial=None):
+        """Return a {"subject", "body"} draft, served from cache or a shared in-flight call.
+
+        With `on_partial`, the draft is streamed and partial {"subject", "body"}
+        snapshots are passed to it while tokens arrive.
+        """
+        start = time.perf_counter()
+        self._count("requests")
+        key = self._key(intent)
+        try:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count("cache_hits")
+                return dict(cached)
+            similar = None
+            if self.intent_index is not None:
+                try:
+                    similar = self.intent_index.lookup(intent)
+                except Exception as e:
+                    print(f"[LLM] Intent index lookup failed, asking the model: {e}")
+            if similar is not None:
+                self._count("index_hits")
+                self.cache.put(key, similar)
+                return dict(similar)
+            future = self._inflight.get(key)
+            if future is not None:
+                self._count("coalesced")
+                return dict(await asyncio.shield(future))
+            future = self._loop.create_future()
+            self._inflight[key] = future
+            try:
+                draft = None
+                if on_partial and self.stream_fn:
+                    try:
+                        draft = await self._call_streaming(intent, on_partial)
+                    except Exception as e:
+                        print(f"[LLM] Streaming failed, retrying without streaming: {e}")
+                if draft is None:
+                    draft = await self._call_upstream(intent)
+                self.cache.put(key, draft)
+                if self.intent_index is not None:
+                    try:
+                        self.intent_index.add(intent, draft)
+                    except Exception as e:
+                        print(f"[LLM] Could not add the draft to the intent index: {e}")
+                future.set_result(draft)
+            except Exception as e:
+                self._count("errors")
+                draft = error_draft(e)
+                future.set_result(draft)
+            finally:
+                self._inflight.pop(key, None)
+            return dict(draft)
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+
+    async def generate_many_async(self, intents):
+        return await asyncio.gather(*(self.generate_async(intent) for intent in intents))
+
+    def submit(self, intent, on_partial=None):
+        """Schedule generation; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self.generate_async(intent, on_partial), self._loop)
+
+    def submit_many(self, intents):
+        return asyncio.run_coroutine_threadsafe(self.generate_many_async(list(intents)), self._loop)
+
+    def generate(self, intent):
+        return self.submit(intent).result()
+
+    def generate_many(self, intents):
+        return self.submit_many(intents).result()
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        requests = stats["requests"]
+        return {
+            "llm_requests_total": requests,
+            "llm_cache_hits_total": stats["cache_hits"],
+            "llm_index_hits_total": stats["index_hits"],
+            "llm_coalesced_total": stats["coalesced"],
+            "llm_cache_hit_ratio": (stats["cache_hits"] + stats["coalesced"]) / requests if requests else 0.0,
+            "llm_upstream_calls_total": stats["upstream_calls"],
+            "llm_retries_total": stats["retries"],
+            "llm_timeouts_total": stats["timeouts"],
+            "llm_errors_total": stats["errors"],
+            "llm_cache_entries": len(self.cache),
+            "llm_latency_seconds": self.latency.snapshot(),
+            "llm_upstream_latency_seconds": self.upstream_latency.snapshot(),
+            "llm_latency_p50_seconds": self.latency.quantile(0.5),
+            "llm_latency_p95_seconds": self.latency.quantile(0.95),
+            "llm_first_content_seconds": self.first_content_latency.snapshot(),
+            "llm_first_content_p50_seconds": self.first_content_latency.quantile(0.5),
+            **(self.intent_index.stats() if self.intent_index is not None else {}),
+        }
+
+
+_default_service = None
+_default_lock = threading.Lock()
+
+
+def default_generation_service(create=True):
+    """Shared service configured from LLM_* env vars; with create=False, None until first used"""
+    global _default_service
+    with _default_lock:
+        if _default_service is None and create:
+            intent_index = None
+            if os.getenv("INTENT_INDEX", "1") != "0":
+                from intent_index import default_intent_index
+                intent_index = default_intent_index()
+            _default_service = GenerationService(
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+                timeout=float(os.getenv("LLM_TIMEOUT", "30")),
+                retries=int(os.getenv("LLM_RETRIES", "2")),
+                cache_size=int(os.getenv("LLM_CACHE_SIZE", "256")),
+                cache_ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+                intent_index=intent_index,
+            )
+        return _default_service
@@ -0,0 +1,341 @@
+# Near-duplicate intent index in front of the model
+# Intents are reduced to a template ("Sick leave tomorrow for John" -> "sick leave
+# {date} {name}"), hashed into a fixed-size TF-IDF vector of word uni/bigrams and
+# character trigrams and compared by cosine similarity against the drafts seen so
+# far and a curated template library. A match above the threshold is served with
+# its date and name placeholders filled from the new intent; anything else goes to
+# the model and its draft is templated and added, provided every date and name of
+# the intent became a placeholder and no other date is left (it would be served
+# stale). Model drafts persist in SQLite and are evicted by age (ttl) and least
+# recent use (max_entries); curated templates (intent_templates.json) are
+# reloaded on start and never evicted.
+
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from accounts import connect
+from generation_service import normalize_intent
+from metrics import Histogram
+
+PLACEHOLDER_KINDS = {"date": 1, "name": 2}   # bit per kind of slot in a template
+LOOKUP_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+STOPWORDS = frozenset(
+    "a an the and or of to for on at in about regarding please pls kindly can could would you me my i his her their "
+    "write draft compose send sending email mail message quick short".split()
+)
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+MONTHS = ("january", "february", "march", "april", "may", "june", "july", "august", "september",
+          "october", "november", "december", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep",
+          "sept", "oct", "nov", "dec")
+
+_MONTH = "(?:" + "|".join(MONTHS) + r")\.?"
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+# Longest forms first so "day after tomorrow" isn't read as "tomorrow"
+_DATE_RE = re.compile(
+    r"\b(?:on\s+)?(?:"
+    r"(?:the\s+)?day\s+after\s+tomorrow|today|tomorrow|tonight|(?:next|this|coming)\s+week"
+    r"|(?:(?:next|this|coming)\s+)?(?:" + "|".join(WEEKDAYS) + r")"
+    r"|\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}(?:/\d{2,4})?"
+    r"|" + _MONTH + r"\s+" + _DAY + r"(?:,?\s+\d{4})?"
+    r"|(?:the\s+)?" + _DAY + r"\s+(?:of\s+)?" + _MONTH + r"(?:,?\s+\d{4})?"
+    r")\b",
+    re.IGNORECASE,
+)
+_CALENDAR_WORD_RE = re.compile(r"\b(?:" + "|".join(WEEKDAYS + MONTHS) + r")\b", re.IGNORECASE)
+# A capitalised name after a word that usually introduces the recipient
+_NAME_RE = re.compile(r"\b(?i:to|for|with|dear|tell|inform|ask|thank|remind|invite|cc)\s+([A-Z][a-z'-]+(?:\s+[A-Z][a-z'-]+)?)")
+_NOT_NAMES = frozenset(WEEKDAYS + MONTHS + ("i", "hr", "it", "the", "my", "our", "your", "team", "manager", "boss",
+                                            "everyone", "all", "sir", "madam"))
+_PLACEHOLDER_RE = re.compile(r"\{(when|When|date|Date|name|Name)\}")
+_TOKEN_RE = re.compile(r"\{\w+\}|[a-z0-9']+")
+_SENTENCE_START_RE = re.compile(r"(?:^|[.!?\n])\s*$")
+
+
+def extract_slots(intent):
+    """{kind: (start, end, bare value, phrase)} for the first date and name in the intent"""
+    slots = {}
+    date = _DATE_RE.search(intent)
+    if date:
+        phrase = date.group(0)
+        phrase = _CALENDAR_WORD_RE.sub(lambda m: _capitalize(m.group(0).lower()), phrase)
+        bare = re.sub(r"^on\s+", "", phrase, flags=re.IGNORECASE)
+        if bare == phrase and not re.match(r"(?:today|tomorrow|tonight|next|this|coming|the day)\b", bare, re.I):
+            phrase = "on " + bare   # "leave Friday" reads "leave on Friday" in a sentence
+        slots["date"] = (date.start(), date.end(), bare, phrase)
+    for match in _NAME_RE.finditer(intent):
+        name = match.group(1)
+        if name.split()[0].lower() in _NOT_NAMES:
+            continue
+        if date and match.start(1) < date.end() and date.start() < match.end(1):
+            continue
+        slots["name"] = (match.start(1), match.end(1), name, name)
+        break
+    return slots
+
+
+def template_intent(intent):
+    """(normalised template text, slot values) with dates and names replaced by {date}/{name}"""
+    slots = extract_slots(intent)
+    text = intent
+    for kind, (start, end, _, _) in sorted(slots.items(), key=lambda item: -item[1][0]):
+        text = text[:start] + "{" + kind + "}" + text[end:]
+    return normalize_intent(text), {kind: (bare, phrase) for kind, (_, _, bare, phrase) in slots.items()}
+
+
+def _capitalize(value):
+    return value[:1].upper() + value[1:]
+
+
+def template_draft(draft, values):
+    """Replace the intent's slot values in a draft with placeholders ({When} etc. at a sentence start)"""
+    def substitute(text):
+        for kind, (bare, phrase) in values.items():
+            tokens = [("when", phrase), (kind, bare)] if kind == "date" and phrase != bare else [(kind, bare)]
+            for token, value in tokens:
+                pattern = re.compile(r"(?<!\w)" + re.escape(value) + r"(?!\w)", re.IGNORECASE)
+                text = pattern.sub(
+                    lambda m: "{" + (_capitalize(token) if _SENTENCE_START_RE.search(m.string[:m.start()])
+                                     else token) + "}",
+                    text,
+                )
+        return text
+
+    return {"subject": substitute(draft.get("subject", "")), "body": substitute(draft.get("body", ""))}
+
+
+def slot_kinds(text):
+    """Bitmask of the slot kinds named by the placeholders in `text` ({when} is a date)"""
+    tokens = {"date" if token.lower() == "when" else token.lower() for token in _PLACEHOLDER_RE.findall(text)}
+    return sum(PLACEHOLDER_KINDS[kind] for kind in tokens)
+
+
+def fill_draft(template, values):
+    """The template with placeholders filled from `values`; None when one has no value"""
+    missing = []
+
+    def replace(match):
+        token = match.group(1)
+        kind = "date" if token.lower() == "when" else token.lower()
+        if kind not in values:
+            missing.append(kind)
+            return match.group(0)
+        bare, phrase = values[kind]
+        value = phrase if token.lower() == "when" else bare
+        return _capitalize(value) if token[:1].isupper() else value
+
+    draft = {field: _PLACEHOLDER_RE.sub(replace, template[field]) for field in ("subject", "body")}
+    return None if missing else draft
+
+
+def features(text):
+    """Word unigrams and bigrams plus character trigrams of a template text, stopwords dropped"""
+    words = [word for word in _TOKEN_RE.findall(text) if word not in STOPWORDS]
+    grams = list(words)
+    grams += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        if not word.startswith("{"):
+            padded = f" {word} "
+            grams += ["#" + padded[i:i + 3] for i in range(len(padded) - 2)]
+    return grams
+
+
+def vectorize(text, dim):
+    """Hashed, sublinear term-frequency vector (IDF is applied at query time)"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for gram in features(text):
+        vector[zlib.crc32(gram.encode("utf-8")) % dim] += 1
+    np.log1p(vector, out=vector)
+    return vector
+
+
+class IntentIndex:
+    def __init__(self, path=None, templates_path=None, threshold=0.8, max_entries=1000, ttl=30 * 86400, dim=2048):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries    # model drafts kept; curated templates don't count
+        self.ttl = ttl
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._entries = []                # {"key", "intent", "template", "kinds", "source", "hits", ...}
+        self._rows = []                   # tf vector per entry
+        self._weighted = None             # (row-normalised TF-IDF matrix, idf, slot kinds each template fills)
+        self.lookup_latency = Histogram(LOOKUP_BUCKETS)
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "unfillable": 0, "added": 0, "unindexed": 0,
+                       "evictions": 0}
+        self._conn = None
+        if path:
+            self._conn = connect(path)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS intent_index (
+                    key TEXT PRIMARY KEY, intent TEXT NOT NULL, subject TEXT NOT NULL, body TEXT NOT NULL,
+                    hits INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL);
+            """)
+            self._conn.execute("DELETE FROM intent_index WHERE created < ?", (time.time() - ttl,))
+            stale = []
+            for key, intent, subject, body, hits, created, last_used in self._conn.execute(
+                    "SELECT * FROM intent_index ORDER BY last_used").fetchall():
+                if not self._append(key, intent, {"subject": subject, "body": body}, "model", hits, created, last_used):
+                    stale.append((key,))
+            self._conn.executemany("DELETE FROM intent_index WHERE key=?", stale)
+        if templates_path and os.path.exists(templates_path):
+            with open(templates_path, encoding="utf-8") as f:
+                for template in json.load(f):
+                    key, _ = template_intent(template["intent"])
+                    self._append(key, template["intent"], {"subject": template["subject"], "body": template["body"]},
+                                 "curated", 0, 0.0, 0.0)
+        with self._lock:
+            self._evict()
+
+    def _append(self, key, intent, template, source, hits, created, last_used):
+        """Index an entry, replacing a model draft with the same key; False if it can't be indexed"""
+        vector = vectorize(key, self.dim)
+        kinds = slot_kinds(template["subject"] + template["body"])
+        # A template that doesn't fill every slot of its intent would serve that slot's old value
+        if not vector.any() or kinds != slot_kinds(key):
+            return False
+        for i, entry in enumerate(self._entries):
+            if entry["key"] == key:
+                if entry["source"] == "curated":
+                    return False
+                del self._entries[i], self._rows[i]
+                break
+        self._entries.append({
+            "key": key, "intent": intent, "template": template, "source": source, "hits": hits,
+            "kinds": kinds,
+            "created": created, "last_used": last_used,
+        })
+        self._rows.append(vector)
+        self._weighted = None
+        return True
+
+    def _matrix(self):
+        if self._weighted is None:
+            rows = np.vstack(self._rows)
+            document_frequency = np.count_nonzero(rows, axis=0)
+            idf = np.log((1 + len(rows)) / (1 + document_frequency)).astype(np.float32) + 1
+            weighted = rows * idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            kinds = np.array([entry["kinds"] for entry in self._entries])
+            self._weighted = (weighted / np.maximum(norms, 1e-9), idf, kinds)
+        return self._weighted
+
+    def lookup(self, intent):
+        """A draft for `intent` from the closest similar entry, or None below the threshold"""
+        start = time.perf_counter()
+        key, values = template_intent(intent)
+        query = vectorize(key, self.dim)
+        kinds = sum(PLACEHOLDER_KINDS[kind] for kind in values)
+        try:
+            with self._lock:
+                self._stats["lookups"] += 1
+                if not self._entries or not query.any():
+                    self._stats["misses"] += 1
+                    return None
+                weighted, idf, entry_kinds = self._matrix()
+                query *= idf
+                scores = weighted @ (query / np.linalg.norm(query))
+                # Only templates with placeholders for exactly these kinds of slot can be filled correctly
+                scores[entry_kinds != kinds] = -1
+                best = int(np.argmax(scores))
+                entry = self._entries[best]
+                if scores[best] < self.threshold:
+                    self._stats["misses"] += 1
+                    return None
+                draft = fill_draft(entry["template"], values)
+                if draft is None:
+                    self._stats["unfillable"] += 1
+                    return None
+                self._stats["hits"] += 1
+                entry["hits"] += 1
+                entry["last_used"] = time.time()
+                if self._conn is not None and entry["source"] == "model":
+                    self._conn.execute("UPDATE intent_index SET hits=?, last_used=? WHERE key=?",
+                                       (entry["hits"], entry["last_used"], entry["key"]))
+                return draft
+        finally:
+            self.lookup_latency.observe(time.perf_counter() - start)
+
+    def add(self, intent, draft):
+        """Template a model draft for `intent` and index it, unless the draft carries a slot value
+        (or another date) that its template couldn't turn into a placeholder"""
+        key, values = template_intent(intent)
+        template = template_draft(draft, values)
+        now = time.time()
+        with self._lock:
+            stale_date = "date" in values and any(_DATE_RE.search(template[field]) for field in ("subject", "body"))
+            if stale_date or not self._append(key, intent, template, "model", 0, now, now):
+                self._stats["unindexed"] += 1
+                return
+            self._stats["added"] += 1
+            if self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO intent_index VALUES (?, ?, ?, ?, 0, ?, ?)",
+                                   (key, intent, template["subject"], template["body"], now, now))
+            self._evict()
+
+    def _evict(self):
+        """Drop model drafts older than ttl, then the least recently used over max_entries"""
+        cutoff = time.time() - self.ttl
+        model = sorted((entry["last_used"], i) for i, entry in enumerate(self._entries) if entry["source"] == "model")
+        doomed = {i for _, i in model if self._entries[i]["created"] < cutoff}
+        live = [i for _, i in model if i not in doomed]
+        doomed.update(live[:max(0, len(live) - self.max_entries)])
+        if not doomed:
+            return
+        if self._conn is not None:
+            self._conn.executemany("DELETE FROM intent_index WHERE key=?",
+                                   [(self._entries[i]["key"],) for i in doomed])
+        self._entries = [entry for i, entry in enumerate(self._entries) if i not in doomed]
+        self._rows = [row for i, row in enumerate(self._rows) if i not in doomed]
+        self._stats["evictions"] += len(doomed)
+        self._weighted = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            curated = sum(entry["source"] == "curated" for entry in self._entries)
+            entries = len(self._entries)
+        return {
+            "intent_index_entries": entries,
+            "intent_index_curated_entries": curated,
+            "intent_index_lookups_total": stats["lookups"],
+            "intent_index_hits_total": stats["hits"],
+            "intent_index_misses_total": stats["misses"],
+            "intent_index_unfillable_total": stats["unfillable"],
+            "intent_index_added_total": stats["added"],
+            "intent_index_unindexed_total": stats["unindexed"],
+            "intent_index_evictions_total": stats["evictions"],
+            "intent_index_hit_ratio": stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0,
+            "intent_index_lookup_seconds": self.lookup_latency.snapshot(),
+            "intent_index_lookup_p50_seconds": self.lookup_latency.quantile(0.5),
+        }
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_intent_index():
+    """Process-wide index configured from INTENT_INDEX_* env vars"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = IntentIndex(
+                os.getenv("INTENT_INDEX_DB", "intent_index.db"),
+                templates_path=os.getenv("INTENT_TEMPLATES",
+                                         os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      "intent_templates.json")),
+                threshold=float(os.getenv("INTENT_INDEX_THRESHOLD", "0.8")),
+                max_entries=int(os.getenv("INTENT_INDEX_SIZE", "1000")),
+                ttl=float(os.getenv("INTENT_INDEX_TTL", str(30 * 86400))),
+                dim=int(os.getenv("INTENT_INDEX_DIM", "2048")),
+            )
+        return _default_index
@@ -0,0 +1,194 @@
+# Bounded job queue + worker pool for browser tasks
+# Socket.IO handlers enqueue work and return immediately; a fixed number of
+# worker threads drain the queue so a burst of clients can't start an
+# unbounded number of Chrome processes.
+
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class QueueFull(Exception):
+    """Raised when a job is rejected because of backpressure"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job was cancelled"""
+
+
+def default_worker_count(mem_per_worker_mb=600):
+    """Size the worker pool to the CPUs and memory available on this host"""
+    cpus = os.cpu_count() or 1
+    try:
+        available = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        by_memory = int(available // (mem_per_worker_mb * 1024 * 1024))
+    except (ValueError, OSError, AttributeError):
+        by_memory = cpus
+    return max(1, min(cpus, by_memory))
+
+
+class Job:
+    def __init__(self, kind, payload, client_id=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.payload = payload
+        self.client_id = client_id
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    def __init__(self, handler, workers=None, max_queue=50, max_per_client=5, on_status=None):
+        self.handler = handler
+        self.workers = workers or default_worker_count()
+        self.max_queue = max_queue
+        self.max_per_client = max_per_client
+        self.on_status = on_status
+
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._jobs = {}
+        self._running = 0
+        self._threads = []
+        self._stopped = False
+
+        self._completed_total = 0
+        self._failed_total = 0
+        self._rejected_total = 0
+        self._cancelled_total = 0
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _set_status(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        if self.on_status:
+            try:
+                self.on_status(job)
+            except Exception as e:
+                print(f"[JOBS] Status callback failed: {e}")
+
+    def submit(self, job):
+        """Queue a job or raise QueueFull when the queue or client limit is hit"""
+        with self._cond:
+            if self._stopped:
+                raise QueueFull("Job queue is shut down")
+            if len(self._pending) >= self.max_queue:
+                self._rejected_total += 1
+                raise QueueFull(f"Server busy: {len(self._pending)} jobs already queued")
+            if job.client_id is not None and self.max_per_client:
+                active = sum(
+                    1 for j in self._jobs.values()
+                    if j.client_id == job.client_id and j.status in ("queued", "running")
+                )
+                if active >= self.max_per_client:
+                    self._rejected_total += 1
+                    raise QueueFull(f"Too many active jobs for this client ({active})")
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            position = len(self._pending)
+            self._cond.notify()
+        self._set_status(job, "queued")
+        return position
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id, client_id=None):
+        """Cancel a queued job, or flag a running one to stop at its next checkpoint"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or (client_id is not None and job.client_id != client_id):
+                return False
+            if job.status not in ("queued", "running"):
+                return False
+            job._cancel_event.set()
+            was_queued = job.status == "queued"
+            if was_queued:
+                self._pending.remove(job)
+                self._cancelled_total += 1
+        if was_queued:
+            job.finished_at = time.time()
+            self._set_status(job, "cancelled")
+        return True
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job = self._pending.popleft()
+                self._running += 1
+            job.started_at = time.time()
+            self._set_status(job, "running")
+            status, error = "done", None
+            try:
+                job.result = self.handler(job)
+            except JobCancelled:
+                status = "cancelled"
+            except Exception as e:
+                status, error = "failed", str(e)
+            job.finished_at = time.time()
+            with self._cond:
+                self._running -= 1
+                if status == "done":
+                    self._completed_total += 1
+                elif status == "cancelled":
+                    self._cancelled_total += 1
+                else:
+                    self._failed_total += 1
+                self._forget_finished()
+            self._set_status(job, status, error)
+
+    def _forget_finished(self, keep=500):
+        finished = [j for j in self._jobs.values() if j.status not in ("queued", "running")]
+        for job in finished[:max(0, len(finished) - keep)]:
+            del self._jobs[job.id]
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "jobs_queue_depth": len(self._pending),
+                "jobs_queue_limit": self.max_queue,
+                "jobs_running": self._running,
+                "jobs_workers": self.workers,
+                "jobs_completed_total": self._completed_total,
+                "jobs_failed_total": self._failed_total,
+                "jobs_rejected_total": self._rejected_total,
+                "jobs_cancelled_total": self._cancelled_total,
+            }
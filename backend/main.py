@@ -1,86 +1,571 @@
+import serving
+# Before any other import: production mode monkey-patches sockets for gevent/eventlet
+SERVER_MODE, ASYNC_MODE = serving.prepare()
+from startup import startup_report  # next, so the report's clock covers every other import
 import os
-import base64
-from flask import Flask, send_from_directory
+import socket
+import time
+import uuid
+from contextlib import nullcontext
+from functools import partial
+from flask import Flask, Response, jsonify, request
 from flask_socketio import SocketIO, emit
 from dotenv import load_dotenv
-from browser_agent import BrowserAgent
+from session_pool import SessionPool, PoolTimeout
+from tab_scheduler import TabScheduler
+from job_queue import Job, JobQueue, JobCancelled, QueueFull
+from selector_cache import default_selector_cache
+from batch import (RECIPIENT_FORMATS, BatchCheckpoint, BatchRunner, MessageSender, new_batch_id, parse_recipients,
+                   valid_batch_id)
 import threading
 import traceback
-from email_generator import generate_email
+from generation_service import default_generation_service, error_draft
+from screenshots import ScreenshotPipeline
+from session_store import default_session_store
+from metrics import render_prometheus
+from tracing import default_tracer
+from accounts import load_accounts
+from event_bus import EventBus
+from sharding import Router, start_workers, supervise
+from recipients import RECIPIENT_FIELDS, default_recipient_cache, normalize_recipients
+from chromedriver import resolve_chromedriver, stats as chromedriver_stats
+from transports import BrowserTransport, TransportRouter
+from send_flow import default_send_checkpoints
+from static_assets import StaticAssets
 
+startup_report.mark("imports")
 load_dotenv()
 
 app = Flask(__name__)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+socketio = SocketIO(app, **serving.socketio_options(ASYNC_MODE))
+startup_report.install(app)
+
+# FAST_STARTUP=1: no debug reloader (which imports everything twice); browsers warm up after the port is bound
+FAST_STARTUP = os.getenv("FAST_STARTUP") == "1"
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
 
 # Load credentials
 GMAIL_USER = os.getenv("GMAIL_USER")
 GMAIL_PASS = os.getenv("GMAIL_PASS")
 
+# Multi-account sharding: with SHARD_WORKERS > 0 (or SHARD_EXTERNAL=1 when sharding.py
+# runs separately) sends are routed over ACCOUNTS_FILE accounts to worker processes
+# that own the browsers, and this process keeps none of its own.
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "0"))
+SHARD_DB = os.getenv("SHARD_DB", "shards.db")
+router = None
+if SHARD_WORKERS > 0 or os.getenv("SHARD_EXTERNAL") == "1":
+    router = Router(load_accounts(), SHARD_DB, worker_timeout=float(os.getenv("SHARD_WORKER_TIMEOUT", "30")))
+
+def deliver_with_browser(message, emit_fn, job=None, screenshots=None):
+    return run_browser_task(message["to"], message["subject"], message["body"], emit_fn, job, screenshots,
+                            message.get("cc"), message.get("bcc"))
+
+# Send transport per account: SEND_TRANSPORT=smtp (or "transport" in ACCOUNTS_FILE) skips the
+# browser and uses pooled SMTP connections; a refused SMTP login falls back to the browser
+transport_router = TransportRouter(BrowserTransport(deliver_with_browser), load_accounts() if router is None else [])
+
+# Warm session pool (set SESSION_POOL_SIZE=0 to launch a fresh browser per email), or with
+# BROWSER_TABS > 1 one browser composing in up to that many tabs, leased the same way
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "2"))
+BROWSER_TABS = int(os.getenv("BROWSER_TABS", "1"))
+session_pool = None
+if BROWSER_TABS > 1 and router is None and transport_router.uses_browser(GMAIL_USER):
+    session_pool = TabScheduler(
+        GMAIL_USER,
+        GMAIL_PASS,
+        max_tabs=BROWSER_TABS,
+        min_tabs=int(os.getenv("BROWSER_TABS_MIN", "1")),
+        lease_timeout=float(os.getenv("SESSION_LEASE_TIMEOUT", "120")),
+    )
+elif SESSION_POOL_SIZE > 0 and router is None and transport_router.uses_browser(GMAIL_USER):
+    session_pool = SessionPool(
+        GMAIL_USER,
+        GMAIL_PASS,
+        size=SESSION_POOL_SIZE,
+        max_uses=int(os.getenv("SESSION_MAX_USES", "25")),
+        max_idle=float(os.getenv("SESSION_MAX_IDLE", "900")),
+        lease_timeout=float(os.getenv("SESSION_LEASE_TIMEOUT", "120")),
+    )
+
+BATCH_DIR = os.getenv("BATCH_DIR", "batches")
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") != "0"
 FRONTEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "frontend"))
+SOCKETIO_CLIENT_PATHS = [
+    os.path.join(FRONTEND_DIR, "socket.io.js"),
+    os.path.join(FRONTEND_DIR, "socket.io.min.js"),
+    os.path.join(FRONTEND_DIR, "..", "node_modules", "socket.io-client", "dist", "socket.io.js"),
+]
 
-def emit_status(text, image_path=None):
-    socketio.emit("text", text)  # frontend listens to "text"
-    if image_path:
-        try:
-            with open(image_path, "rb") as img_file:
-                encoded = base64.b64encode(img_file.read()).decode("utf-8")
-                img_data_url = f"data:image/png;base64,{encoded}"
-                socketio.emit("image", img_data_url)  # frontend listens to "image"
-        except Exception as e:
-            socketio.emit("text", f"⚠️ Failed to send image for screenshot: {os.path.basename(image_path)}")
+# The UI and the Socket.IO client, read and compressed once (re-read on change in dev)
+socketio_client = next((path for path in SOCKETIO_CLIENT_PATHS if os.path.exists(path)), None)
+print(f"[INFO] Serving Socket.IO from {socketio_client}" if socketio_client
+      else "[ERROR] socket.io.js not found in any path!")
+static_assets = StaticAssets(
+    FRONTEND_DIR,
+    aliases={"socket.io.js": socketio_client},
+    page_globals={"SOCKET_OPTIONS": serving.client_options(SERVER_MODE, ASYNC_MODE)},
+    max_age=int(os.getenv("STATIC_MAX_AGE", "3600")) if SERVER_MODE == "production" else 0,
+    watch=SERVER_MODE == "dev",
+)
 
+# Job progress goes only to the submitting client, text coalesced into batches. Under
+# gevent/eventlet only the bus's loop emits; worker threads hand their events to it.
+event_bus = EventBus(
+    socketio,
+    flush_interval=float(os.getenv("EVENT_FLUSH_INTERVAL", "0.1")),
+    image_interval=float(os.getenv("IMAGE_MIN_INTERVAL", "0.5")),
+    threadsafe=ASYNC_MODE != "threading",
+    drain_interval=float(os.getenv("EVENT_DRAIN_INTERVAL", "0.01")),
+)
+
+def emit_status(text, room=None, job_id=None):
+    """Status line for a job's client (screenshots stream separately, see job_screenshots)"""
+    if not text:
+        return
+    if room:
+        event_bus.text(room, text, job_id)
+    else:
+        event_bus.post("text", text, room)  # frontend listens to "text"
+
+
+def job_emitter(job):
+    """Status callback that only reaches the client who submitted the job"""
+    def _emit(text):
+        emit_status(text, room=job.client_id, job_id=job.id)
+    return _emit
+
+
+def job_screenshots(job):
+    """Screenshot pipeline whose processed frames stream to the job's client"""
+    return ScreenshotPipeline(
+        job_id=job.id,
+        sink=lambda frame, force=False: event_bus.image(job.client_id, frame, force),
+    )
+
+
+def report_screenshots(screenshots, emit_fn):
+    screenshots.flush()
+    stats = screenshots.stats()
+    if stats["frames_captured"]:
+        emit_fn(f"📊 Screenshots: {stats['frames_sent']} sent, {stats['frames_skipped']} skipped as duplicates, "
+                f"{stats['bytes_sent'] / 1024:.0f} KB sent ({stats['raw_bytes'] / 1024:.0f} KB raw).")
+
+
+def send_with_agent(agent, to, subject, body, emit_fn=emit_status, job=None, cc=None, bcc=None):
+    if job:
+        job.raise_if_cancelled()
+    # A retried job resumes its checkpointed steps instead of composing (or sending) again
+    idempotency_key = None
+    if job and job.kind == "send_email":
+        idempotency_key = job.payload.get("idempotency_key") or f"job:{job.id}"
+    success = agent.compose_and_send_email(to, subject, body, cc=cc, bcc=bcc, idempotency_key=idempotency_key)
+    if success:
+        emit_fn("✅ Email sent successfully!")
+    else:
+        emit_fn("❌ Failed to send email.")
+    return success
+
+
+def run_browser_task(to, subject, body, emit_fn=emit_status, job=None, screenshots=None, cc=None, bcc=None):
+    if session_pool is not None:
+        return run_pooled_task(to, subject, body, emit_fn, job, screenshots, cc, bcc)
+    from browser_agent import BrowserAgent
 
-def run_browser_task(to, subject, body):
     agent = BrowserAgent(
         GMAIL_USER,
         GMAIL_PASS,
-        emit_callback=emit_status
+        emit_callback=emit_fn,
+        screenshots=screenshots,
     )
     try:
-        emit_status("🧠 Launching browser...")
+        emit_fn("🧠 Launching browser...")
         if agent.login_to_gmail():
-            emit_status("✅ Logged in to Gmail.")
-            success = agent.compose_and_send_email(to, subject, body)
-            if success:
-                emit_status("✅ Email sent successfully!")
-            else:
-                emit_status("❌ Failed to send email.")
-        else:
-            emit_status("❌ Gmail login failed.")
+            emit_fn("✅ Logged in to Gmail.")
+            return send_with_agent(agent, to, subject, body, emit_fn, job, cc, bcc)
+        emit_fn("❌ Gmail login failed.")
+        return False
+    except JobCancelled:
+        raise
     except Exception as e:
         tb = traceback.format_exc()
-        emit_status(f"❌ Unexpected error: {str(e)}\n{tb}")
+        emit_fn(f"❌ Unexpected error: {str(e)}\n{tb}")
         print(tb)
+        return False
     finally:
         agent.quit()
-        emit_status("🛑 Browser closed.")
+        emit_fn("🛑 Browser closed.")
+
+
+def run_pooled_task(to, subject, body, emit_fn=emit_status, job=None, screenshots=None, cc=None, bcc=None):
+    emit_fn("🧠 Leasing a warm browser session...")
+    try:
+        with session_pool.lease(emit_callback=emit_fn, screenshots=screenshots) as agent:
+            emit_fn("✅ Using logged-in Gmail session.")
+            return send_with_agent(agent, to, subject, body, emit_fn, job, cc, bcc)
+    except PoolTimeout as e:
+        emit_fn(f"❌ {e}")
+        return False
+    except JobCancelled:
+        raise
+    except Exception as e:
+        tb = traceback.format_exc()
+        emit_fn(f"❌ Unexpected error: {str(e)}\n{tb}")
+        print(tb)
+        return False
+
+
+def run_sharded_task(job, emit_fn):
+    data = job.payload
+    fields = ("to", "cc", "bcc", "subject", "body", "idempotency_key")
+    account = router.dispatch(job.id, {k: data[k] for k in fields if k in data},
+                              data.get("sender"))
+    emit_fn(f"🔀 Routed to {account}.")
+    return router.wait(job, emit_fn, account)
+
+
+class ShardedRow:
+    """Router.wait's view of one batch row: its own shard job id, cancelled with the batch job"""
+
+    def __init__(self, id, job):
+        self.id = id
+        self.job = job
+
+    @property
+    def cancelled(self):
+        return self.job.cancelled
+
+
+def run_batch_task(job, emit_fn, screenshots=None):
+    data = job.payload
+    checkpoint = BatchCheckpoint(os.path.join(BATCH_DIR, f"{data['batch_id']}.json"))
+
+    def progress(result, summary):
+        event_bus.emit("batch_progress", {"job_id": job.id, "result": result, "summary": summary}, job.client_id)
+
+    runner = BatchRunner(
+        data["rows"], data["subject"], data["body"],
+        checkpoint=checkpoint, progress=progress, should_stop=lambda: job.cancelled, batch_id=data["batch_id"],
+        log=emit_fn,
+    )
+    if router is not None:
+        # This process has no browsers: every row is a shard job, under the accounts' rate limits
+        def send_sharded(message):
+            row_job = ShardedRow(f"{job.id}-{uuid.uuid4().hex[:8]}", job)
+            payload = {k: v for k, v in message.items() if v}
+            account = router.dispatch(row_job.id, payload)
+            return router.wait(row_job, emit_fn, account)
+
+        sessions = max(1, min(data["sessions"], len(data["rows"])))
+        emit_fn(f"📦 Batch {data['batch_id']}: {len(data['rows'])} recipients over {sessions} shard slot(s)...")
+        summary = runner.run([partial(nullcontext, MessageSender(send_sharded, "shard")) for _ in range(sessions)])
+    elif not transport_router.uses_browser(GMAIL_USER):
+        # SMTP account: its pooled connections replace browser sessions
+        def send_routed(message):
+            return transport_router.send({"sender": GMAIL_USER, **message}, emit_fn, job=job, screenshots=screenshots)
+
+        sessions = max(1, min(data["sessions"], len(data["rows"])))
+        emit_fn(f"📦 Batch {data['batch_id']}: {len(data['rows'])} recipients over {sessions} connection(s)...")
+        summary = runner.run([partial(nullcontext, MessageSender(send_routed, "transport")) for _ in range(sessions)])
+    elif session_pool is not None:
+        sessions = max(1, min(data["sessions"], session_pool.size))
+        emit_fn(f"📦 Batch {data['batch_id']}: {len(data['rows'])} recipients over {sessions} session(s)...")
+        summary = runner.run([partial(session_pool.lease, screenshots=screenshots) for _ in range(sessions)])
+    else:
+        from browser_agent import BrowserAgent
+
+        agent = BrowserAgent(GMAIL_USER, GMAIL_PASS, emit_callback=emit_fn, screenshots=screenshots)
+        try:
+            emit_fn(f"📦 Batch {data['batch_id']}: {len(data['rows'])} recipients over 1 session...")
+            if not agent.login_to_gmail():
+                raise RuntimeError("Gmail login failed")
+            summary = runner.run_with_agent(agent)
+        finally:
+            agent.quit()
+    event_bus.emit("batch_done", {"job_id": job.id, "batch_id": data["batch_id"], "summary": summary}, job.client_id)
+    emit_fn(f"📦 Batch finished: {summary['sent']} sent, {summary['failed']} failed, "
+            f"{summary['messages_per_minute']} messages/min.")
+    job.raise_if_cancelled()
+    return summary
+
+
+def run_job(job):
+    job.raise_if_cancelled()
+    emit_fn = job_emitter(job)
+    screenshots = job_screenshots(job)
+    try:
+        if job.kind == "send_email":
+            data = job.payload
+            emit_fn(f"📨 Preparing to send email to {data['to']}...")
+            if router is not None:
+                return run_sharded_task(job, emit_fn)
+            message = {"sender": GMAIL_USER, **{k: data.get(k) for k in ("to", "cc", "bcc", "subject", "body")}}
+            if not transport_router.send(message, emit_fn, job=job, screenshots=screenshots):
+                raise RuntimeError("Email was not sent")
+        elif job.kind == "send_batch":
+            return run_batch_task(job, emit_fn, screenshots)
+        else:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+    finally:
+        report_screenshots(screenshots, emit_fn)
+
+
+def emit_job_status(job):
+    event_bus.emit("job_status", job.to_dict(), job.client_id)
+    if job.status == "cancelled":
+        emit_status(f"🛑 Job {job.id} cancelled.", room=job.client_id, job_id=job.id)
+
+
+job_queue = JobQueue(
+    run_job,
+    workers=int(os.getenv("JOB_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("JOB_QUEUE_LIMIT", "50")),
+    max_per_client=int(os.getenv("JOB_MAX_PER_CLIENT", "5")),
+    on_status=emit_job_status,
+)
+
+
+MAX_RECIPIENTS = int(os.getenv("MAX_RECIPIENTS", "100"))
+
+def validate_send_request(data):
+    if not isinstance(data, dict):
+        return "❌ Invalid request."
+    to, subject, body = data.get("to"), data.get("subject"), data.get("body")
+    if not (to and subject and body):
+        return "❌ Missing required fields: to, subject, or body."
+    if not all(isinstance(v, str) for v in (subject, body)):
+        return "❌ Fields subject and body must be text."
+    for field in RECIPIENT_FIELDS:
+        value = data.get(field)
+        if value is None:
+            continue
+        if not (isinstance(value, str) or (isinstance(value, list) and all(isinstance(v, str) for v in value))):
+            return f"❌ Field {field} must be an address, a comma-separated list or a list of addresses."
+    recipients = normalize_recipients(to, data.get("cc"), data.get("bcc"))
+    invalid = [address for addresses in recipients.values() for address in addresses if "@" not in address]
+    if invalid:
+        return f"❌ Invalid recipient address: {', '.join(invalid)}"
+    if sum(len(addresses) for addresses in recipients.values()) > MAX_RECIPIENTS:
+        return f"❌ At most {MAX_RECIPIENTS} recipients per email."
+    if not isinstance(data.get("idempotency_key", ""), str):
+        return "❌ Field idempotency_key must be text."
+    sender = data.get("from")
+    if sender and (router is None or sender not in router.accounts):
+        return f"❌ Unknown sender account: {sender}"
+    return None
+
 
 @socketio.on("send_email")
 def handle_send_email(data):
-    to = data.get("to")
-    subject = data.get("subject")
-    body = data.get("body")
+    error = validate_send_request(data)
+    if error:
+        emit("text", error)
+        return
+    to, subject, body = data["to"], data["subject"], data["body"]
     print(f"Received email request: to={to}, subject={subject}")
-    if not (to and subject and body):
-        emit("text", "❌ Missing required fields: to, subject, or body.")
+    payload = {"to": to, "subject": subject, "body": body}
+    payload.update({field: data[field] for field in ("cc", "bcc", "idempotency_key") if data.get(field)})
+    if data.get("from"):
+        payload["sender"] = data["from"]
+    job = Job("send_email", payload, client_id=request.sid)
+    try:
+        position = job_queue.submit(job)
+    except QueueFull as e:
+        emit("job_rejected", {"reason": str(e), **job_queue.metrics()})
+        emit("text", f"⏳ {e}. Please retry shortly.")
         return
-    emit("text", f"📨 Preparing to send email to {to}...")
-    run_browser_task(to, subject, body)
+    emit("text", f"📥 Email to {to} queued as job {job.id} (position {position}).")
+    return {"job_id": job.id, "position": position}
+
+@socketio.on("send_batch")
+def handle_send_batch(data):
+    if not isinstance(data, dict):
+        emit("text", "❌ Invalid request.")
+        return
+    recipients, subject, body = data.get("recipients"), data.get("subject"), data.get("body")
+    if not (recipients and subject and body):
+        emit("text", "❌ Missing required fields: recipients, subject, or body.")
+        return
+    if not all(isinstance(v, str) for v in (recipients, subject, body)):
+        emit("text", "❌ Fields recipients, subject and body must be text.")
+        return
+    fmt = data.get("format", "csv")
+    if fmt not in RECIPIENT_FORMATS:
+        emit("text", f"❌ Field format must be one of: {', '.join(RECIPIENT_FORMATS)}.")
+        return
+    try:
+        sessions = int(data.get("sessions", 1))
+    except (TypeError, ValueError):
+        sessions = 0
+    if sessions < 1:
+        emit("text", "❌ Field sessions must be a positive whole number.")
+        return
+    # Only an explicit batch_id resumes an earlier batch; otherwise this is a new one
+    batch_id = data.get("batch_id") or new_batch_id()
+    if not valid_batch_id(batch_id):
+        emit("text", "❌ Field batch_id may only contain letters, digits, '-' and '_'.")
+        return
+    try:
+        rows = parse_recipients(recipients, fmt)
+    except ValueError as e:
+        emit("text", f"❌ Invalid recipients: {e}")
+        return
+    payload = {
+        "batch_id": batch_id,
+        "rows": rows,
+        "subject": subject,
+        "body": body,
+        "sessions": sessions,
+    }
+    job = Job("send_batch", payload, client_id=request.sid)
+    try:
+        position = job_queue.submit(job)
+    except QueueFull as e:
+        emit("job_rejected", {"reason": str(e), **job_queue.metrics()})
+        return
+    emit("text", f"📥 Batch {batch_id} ({len(rows)} recipients) queued as job {job.id}.")
+    return {"job_id": job.id, "batch_id": batch_id, "position": position}
+
+@socketio.on("disconnect")
+def handle_disconnect(*args):
+    event_bus.drop_room(request.sid)
+
+@socketio.on("cancel_job")
+def handle_cancel_job(data):
+    job_id = (data or {}).get("job_id")
+    if not job_queue.cancel(job_id, client_id=request.sid):
+        emit("text", f"⚠️ Job {job_id} can't be cancelled (unknown or already finished).")
+
+def draft_result(future, count=None):
+    """A generation future's drafts, or error drafts if it raised (the client always gets a reply)"""
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"[LLM] Generation failed: {e}")
+        return error_draft(e) if count is None else [error_draft(e)] * count
 
 @socketio.on("generate_email")
 def handle_generate(data):
-    intent = data.get("intent", "")
-    if not intent:
+    intent = data.get("intent") if isinstance(data, dict) else None
+    if not isinstance(intent, str) or not intent.strip():
         emit("text", "❌ Please provide a request like 'send a leave email'.")
         return
     emit("text", f"🧠 Generating email for: '{intent}'...")
-    result = generate_email(intent)
-    emit("generated_email", result)
+    sid = request.sid
+    on_partial = None
+    if LLM_STREAMING:
+        on_partial = lambda draft: event_bus.post("generated_email_partial", draft, sid)
+    future = default_generation_service().submit(intent, on_partial=on_partial)
+    future.add_done_callback(lambda f: event_bus.post("generated_email", draft_result(f), sid))
+
+MAX_BATCH_INTENTS = int(os.getenv("LLM_MAX_BATCH", "50"))
+
+def validate_intents(intents):
+    if not isinstance(intents, list) or not intents:
+        return "Provide a non-empty list of intents."
+    if len(intents) > MAX_BATCH_INTENTS:
+        return f"At most {MAX_BATCH_INTENTS} intents per batch."
+    if not all(isinstance(i, str) and i.strip() for i in intents):
+        return "Every intent must be non-empty text."
+    return None
+
+@socketio.on("generate_emails")
+def handle_generate_many(data):
+    intents = data.get("intents") if isinstance(data, dict) else None
+    error = validate_intents(intents)
+    if error:
+        emit("text", f"❌ {error}")
+        return
+    emit("text", f"🧠 Generating {len(intents)} email drafts...")
+    sid = request.sid
+    future = default_generation_service().submit_many(intents)
+    future.add_done_callback(
+        lambda f: event_bus.post("generated_emails", [
+            {"intent": intent, **draft} for intent, draft in zip(intents, draft_result(f, len(intents)))
+        ], sid)
+    )
 
 @app.route("/")
 def index():
-    return send_from_directory(FRONTEND_DIR, "index.html")
+    return static_assets.response("index.html", request)
+
+@app.route("/metrics")
+def prometheus_metrics():
+    sources = [job_queue.metrics(), event_bus.stats(), startup_report.stats(), chromedriver_stats()]
+    if session_pool is not None:
+        sources.append(session_pool.metrics())
+    generation = default_generation_service(create=False)
+    if generation is not None:
+        sources.append(generation.metrics())
+    store = default_session_store()
+    if store is not None:
+        sources.append(store.stats())
+    sources.append(default_selector_cache().stats())
+    sources.append(default_recipient_cache().stats())
+    sources.append(transport_router.stats())
+    sources.append(default_send_checkpoints().stats())
+    sources.append(static_assets.stats())
+    lines = default_tracer().prometheus() + render_prometheus(*sources)
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+@app.route("/metrics/startup")
+def startup_metrics():
+    return jsonify({**startup_report.stats(), **chromedriver_stats()})
+
+@app.route("/metrics/events")
+def event_metrics():
+    return jsonify(event_bus.stats())
+
+@app.route("/metrics/accounts")
+def account_metrics():
+    if router is None:
+        return jsonify({"sharding": False})
+    return jsonify({"sharding": True, **router.stats()})
+
+@app.route("/metrics/transports")
+def transport_metrics():
+    return jsonify(transport_router.stats())
+
+@app.route("/metrics/traces")
+def recent_traces():
+    return jsonify(default_tracer().events(int(request.args.get("limit", 100))))
+
+@app.route("/metrics/pool")
+def pool_metrics():
+    if session_pool is None:
+        return jsonify({"pool_size": 0})
+    if isinstance(session_pool, TabScheduler):
+        return jsonify({**session_pool.metrics(), "tab_decisions": session_pool.decisions()})
+    return jsonify(session_pool.metrics())
+
+@app.route("/metrics/jobs")
+def job_metrics():
+    return jsonify(job_queue.metrics())
+
+@app.route("/metrics/selectors")
+def selector_metrics():
+    return jsonify(default_selector_cache().stats())
+
+@app.route("/metrics/sessions")
+def session_metrics():
+    store = default_session_store()
+    if store is None:
+        return jsonify({"session_store_enabled": False})
+    return jsonify({"session_store_enabled": True, **store.stats()})
+
+@app.route("/generate/batch", methods=["POST"])
+def generate_batch():
+    intents = (request.get_json(silent=True) or {}).get("intents")
+    error = validate_intents(intents)
+    if error:
+        return jsonify({"error": error}), 400
+    drafts = serving.run_blocking(default_generation_service().generate_many, intents)
+    return jsonify([{"intent": intent, **draft} for intent, draft in zip(intents, drafts)])
+
+@app.route("/metrics/llm")
+def llm_metrics():
+    return jsonify(default_generation_service().metrics())
 
 @app.route("/favicon.ico")
 def favicon():
@@ -89,21 +574,60 @@ def favicon():
 @app.route("/socket.io/socket.io.js")
 @app.route("/socket.io/socket.io.min.js")  # Add this for fallback
 def serve_socketio_js():
-    paths_to_check = [
-        os.path.join(FRONTEND_DIR, "socket.io.js"),
-        os.path.join(FRONTEND_DIR, "socket.io.min.js"),
-        os.path.join(FRONTEND_DIR, "..", "node_modules", "socket.io-client", "dist", "socket.io.js")
-    ]
-    for path in paths_to_check:
-        if os.path.exists(path):
-            print(f"[INFO] Serving Socket.IO from {path}")
-            return send_from_directory(os.path.dirname(path), os.path.basename(path))
-    print("[ERROR] socket.io.js not found in any path!")
-    return "socket.io.js not found", 404
+    return static_assets.response("socket.io.js", request) or ("socket.io.js not found", 404)
 
 @app.route("/<path:path>")
 def serve_static(path):
-    return send_from_directory(FRONTEND_DIR, path)
+    return static_assets.response(path, request) or ("Not found", 404)
+
+def wait_for_port(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def prewarm(port):
+    """Once the server accepts connections, warm the browser stack off the request path"""
+    if wait_for_port(port):
+        startup_report.mark("port_bound")
+    with startup_report.timed("import_browser_agent"):
+        import browser_agent  # noqa: F401
+    # Patch chromedriver once here so pool sessions and shard workers all reuse the cached binary
+    with startup_report.timed("chromedriver"):
+        try:
+            resolve_chromedriver()
+        except Exception as e:
+            print(f"[!] Chromedriver pre-warm failed: {e}")
+    if session_pool is not None:
+        session_pool.start()
+        deadline = time.monotonic() + session_pool.lease_timeout
+        while not session_pool.metrics()["pool_idle"] and time.monotonic() < deadline:
+            time.sleep(0.2)
+        if session_pool.metrics()["pool_idle"]:
+            startup_report.mark("first_session_ready")
+    if SHARD_WORKERS > 0:
+        shard_processes = start_workers(
+            SHARD_WORKERS, SHARD_DB, int(os.getenv("SHARD_SESSIONS_PER_ACCOUNT", "1")), list(router.accounts.values())
+        )
+        threading.Thread(target=supervise, args=(shard_processes, SHARD_DB), name="shard-supervisor",
+                         daemon=True).start()
+    print(startup_report.summary())
+
+
+startup_report.mark("app_ready")
 
 if __name__ == "__main__":
-    socketio.run(app, host="0.0.0.0", port=5000, debug=True)
+    # With debug=True the reloader re-runs this module in a child process;
+    # only start workers in the process that actually serves requests.
+    # Production mode never reloads.
+    if SERVER_MODE == "production" or FAST_STARTUP or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        job_queue.start()
+        event_bus.start()
+        threading.Thread(target=prewarm, args=(PORT,), name="prewarm", daemon=True).start()
+    print(f"[*] Serving on {HOST}:{PORT} ({SERVER_MODE} mode, {ASYNC_MODE})")
+    socketio.run(app, host=HOST, port=PORT, **serving.run_options(SERVER_MODE, ASYNC_MODE))
@@ -0,0 +1,86 @@
+# Lightweight in-process metrics helpers
+
+import bisect
+import threading
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, the same shape Prometheus uses"""
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q):
+        """Approximate quantile: the upper bound of the bucket holding it"""
+        with self._lock:
+            if not self._count:
+                return 0.0
+            target = q * self._count
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+                seen += count
+                if seen >= target:
+                    return bound if bound != float("inf") else self.buckets[-1]
+            return self.buckets[-1]
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets, self._counts):
+                running += count
+                cumulative[str(bound)] = running
+            cumulative["+Inf"] = self._count
+            return {"buckets": cumulative, "sum": self._sum, "count": self._count}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _is_histogram(value):
+    return isinstance(value, dict) and {"buckets", "sum", "count"} <= value.keys()
+
+
+def prometheus_lines(name, value, labels=None):
+    """Exposition-format lines for a number or a Histogram.snapshot(); other values yield nothing"""
+    labels = labels or {}
+    if _is_histogram(value):
+        lines = []
+        for bound, count in value["buckets"].items():
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        return lines
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return [f"{name}{_format_labels(labels)} {value}"]
+    return []
+
+
+def render_prometheus(*sources):
+    """Render flat metric dicts (as returned by the various .metrics() methods) as exposition text"""
+    lines = []
+    for source in sources:
+        for name, value in source.items():
+            samples = prometheus_lines(name, value)
+            if samples:
+                kind = "histogram" if _is_histogram(value) else "counter" if name.endswith("_total") else "gauge"
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(samples)
+    return lines
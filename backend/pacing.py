@@ -0,0 +1,95 @@
+# Pacing policies and readiness conditions for BrowserAgent
+# The agent waits on explicit page conditions (page loaded, element clickable,
+# DOM settled); any human-like jitter on top of that is an opt-in policy.
+
+import os
+import random
+import time
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+class PacingPolicy:
+    """Condition-driven pacing with no artificial delays"""
+    name = "standard"
+    settle_timeout = 1.5
+    # Text entry strategy per field (see text_entry.py)
+    text_entry = {"default": "bulk", "body": "insert_text"}
+
+    def pause(self, kind="step"):
+        pass
+
+    def keystroke_delay(self):
+        return 0
+
+
+class HumanPacing(PacingPolicy):
+    """Adds random human-like delays between actions and keystrokes"""
+    name = "human"
+    delays = {
+        "short": (0.2, 0.5),
+        "step": (0.5, 1.0),
+        "think": (1.0, 2.0),
+        "screenshot": (0.5, 1.0),
+    }
+    keystroke_range = (0.05, 0.15)
+    text_entry = {"default": "keys", "body": "chunked"}
+
+    def pause(self, kind="step"):
+        low, high = self.delays.get(kind, (0, 0))
+        if high:
+            time.sleep(random.uniform(low, high))
+
+    def keystroke_delay(self):
+        return random.uniform(*self.keystroke_range)
+
+
+class FastPacing(PacingPolicy):
+    """Trusted internal runs: direct text insertion and short settle windows"""
+    name = "fast"
+    settle_timeout = 0.5
+    text_entry = {"default": "insert_text", "body": "insert_text"}
+
+
+PACING_PROFILES = {
+    "standard": PacingPolicy,
+    "human": HumanPacing,
+    "fast": FastPacing,
+}
+
+
+def get_pacing(profile=None):
+    """Build a pacing policy from a profile name or the PACING_PROFILE env var"""
+    if isinstance(profile, PacingPolicy):
+        return profile
+    name = (profile or os.getenv("PACING_PROFILE") or "standard").lower()
+    if name not in PACING_PROFILES:
+        raise ValueError(f"Unknown pacing profile '{name}', expected one of {sorted(PACING_PROFILES)}")
+    return PACING_PROFILES[name]()
+
+
+_DOM_SETTLED_JS = """
+const quietMs = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+let timer = null;
+const finish = (settled) => { observer.disconnect(); clearTimeout(timer); clearTimeout(limit); done(settled); };
+const observer = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(() => finish(true), quietMs); });
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+timer = setTimeout(() => finish(true), quietMs);
+const limit = setTimeout(() => finish(false), timeoutMs);
+"""
+
+
+def wait_for_page_ready(driver, timeout=30):
+    """Wait until document.readyState is complete"""
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+
+
+def wait_for_dom_settled(driver, quiet=0.2, timeout=2.0):
+    """Wait until the DOM has had no mutations for `quiet` seconds; returns False on timeout"""
+    try:
+        return bool(driver.execute_async_script(_DOM_SETTLED_JS, int(quiet * 1000), int(timeout * 1000)))
+    except Exception:
+        return False
+
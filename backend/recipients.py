@@ -0,0 +1,174 @@
+# Recipient entry for the compose window
+# Each address is committed as a chip by typing it with a trailing comma,
+# which (unlike Enter) never picks whatever the suggestion dropdown happens to
+# highlight, and one DOM query then confirms every chip at once. Addresses that
+# resolved before are remembered: if one of those is missing the commit is
+# retried, while a new address that didn't resolve fails the send straight away.
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+
+RECIPIENT_FIELDS = ("to", "cc", "bcc")
+
+# Defines composeChips(): the chip addresses (lowercased) in each field of the open compose
+# dialog. A field's chips are looked up in its own row, the outermost ancestor of its input
+# that holds no other recipient field, so inbox senders and a Cc chip never count for To.
+CHIPS_JS = """
+function composeChips() {
+  const chips = {to: new Set(), cc: new Set(), bcc: new Set()};
+  const dialogs = Array.from(document.querySelectorAll('.AD, [role=dialog]')).filter((d) => d.querySelector('[name=to]'));
+  const dialog = dialogs[dialogs.length - 1];
+  if (!dialog) return chips;
+  const fields = Object.keys(chips), inputs = fields.map((field) => dialog.querySelector(`[name=${field}]`));
+  fields.forEach((field, i) => {
+    let row = inputs[i];
+    if (!row) return;
+    const others = inputs.filter((input, j) => input && j !== i);
+    while (row.parentElement && row.parentElement !== dialog && !others.some((input) => row.parentElement.contains(input))) {
+      row = row.parentElement;
+    }
+    for (const el of row.querySelectorAll('[email], [data-hovercard-id*="@"]')) {
+      chips[field].add((el.getAttribute('email') || el.getAttribute('data-hovercard-id')).toLowerCase());
+    }
+  });
+  return chips;
+}
+"""
+
+# Resolves with the expected [field, address] pairs (lowercased) that are chips in their
+# field, waiting on DOM mutations until all of them are or the deadline passes.
+ACCEPTED_JS = CHIPS_JS + """
+const expected = Object.entries(arguments[0]).flatMap(([field, list]) => list.map((a) => [field, a.toLowerCase()]));
+const timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+function accepted() {
+  const chips = composeChips();
+  return expected.filter(([field, address]) => chips[field].has(address));
+}
+const first = accepted();
+if (first.length === expected.length || timeoutMs <= 0) {
+  done(first);
+} else {
+  let finished = false;
+  const finish = () => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(limit);
+    done(accepted());
+  };
+  const observer = new MutationObserver(() => { if (accepted().length === expected.length) finish(); });
+  const limit = setTimeout(finish, timeoutMs);
+  observer.observe(document, {childList: true, subtree: true, attributes: true, attributeFilter: ['email', 'data-hovercard-id']});
+}
+"""
+
+def split_addresses(value):
+    """Addresses from "a@x, b@y" / "a@x; b@y" or a list of them, de-duplicated in order"""
+    if not value:
+        return []
+    parts = value if isinstance(value, (list, tuple)) else re.split(r"[,;\s]+", value)
+    seen, addresses = set(), []
+    for part in parts:
+        address = str(part).strip()
+        if address and address.lower() not in seen:
+            seen.add(address.lower())
+            addresses.append(address)
+    return addresses
+
+
+def normalize_recipients(to=None, cc=None, bcc=None):
+    """{"to": [...], "cc": [...], "bcc": [...]} with empty fields dropped"""
+    fields = {"to": split_addresses(to), "cc": split_addresses(cc), "bcc": split_addresses(bcc)}
+    return {field: addresses for field, addresses in fields.items() if addresses}
+
+
+class RecipientCache:
+    """Addresses that resolved to a chip before, persisted like the selector cache"""
+
+    def __init__(self, path=None, save_interval=5.0):
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self._last_save = 0.0
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+        except (OSError, ValueError) as e:
+            print(f"[!] Ignoring unreadable recipient cache {self.path}: {e}")
+            self._entries = {}
+
+    def save(self, force=True):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._last_save < self.save_interval):
+                return
+            data = json.dumps(self._entries, indent=2)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[!] Failed to save recipient cache: {e}")
+
+    def known(self, address):
+        """True when `address` resolved the last time it was used"""
+        with self._lock:
+            known = bool(self._entries.get(address.lower(), {}).get("last_ok"))
+            if known:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return known
+
+    def record(self, accepted, rejected=()):
+        with self._lock:
+            now = time.time()
+            for address, ok in [(a, True) for a in accepted] + [(a, False) for a in rejected]:
+                entry = self._entries.setdefault(address.lower(), {"resolved": 0, "failed": 0})
+                entry["resolved" if ok else "failed"] += 1
+                entry["last_ok"] = ok
+                entry["last_used"] = now
+            self._dirty = True
+        self.save(force=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "recipient_cache_hits": self.hits,
+                "recipient_cache_misses": self.misses,
+                "recipient_cache_hit_ratio": self.hits / lookups if lookups else 0.0,
+                "recipient_cache_entries": len(self._entries),
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_recipient_cache():
+    """Process-wide cache shared by all agents, persisted to RECIPIENT_CACHE_PATH"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = RecipientCache(path=os.getenv("RECIPIENT_CACHE_PATH", "recipient_cache.json"))
+            atexit.register(_default_cache.save)
+        return _default_cache
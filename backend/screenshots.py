@@ -0,0 +1,138 @@
+# In-memory screenshot pipeline
+# Captures PNG bytes straight from the driver, then on a background thread
+# downsizes, drops frames that look the same as the previous one, re-encodes to
+# WebP/JPEG, stores the file under a per-job folder and hands the bytes to a sink.
+
+import io
+import os
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SCREENSHOT_WORKERS", "2")), thread_name_prefix="screenshot")
+
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+
+def dhash(image, size=8):
+    """64-bit difference hash; near-identical frames differ in only a few bits"""
+    small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+class ScreenshotPipeline:
+    def __init__(self, job_id=None, root="screenshots", sink=None, max_width=None,
+                 fmt=None, quality=None, dedup_distance=None, save=True):
+        self.job_id = job_id or f"session-{uuid.uuid4().hex[:8]}"
+        self.directory = os.path.join(root, self.job_id)
+        self.sink = sink
+        self.max_width = max_width or int(os.getenv("SCREENSHOT_MAX_WIDTH", "960"))
+        self.fmt = (fmt or os.getenv("SCREENSHOT_FORMAT", "WEBP")).upper()
+        self.quality = quality or int(os.getenv("SCREENSHOT_QUALITY", "60"))
+        self.dedup_distance = int(os.getenv("SCREENSHOT_DEDUP_DISTANCE", "3")) if dedup_distance is None else dedup_distance
+        self.save = save
+
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._draining = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._last_hash = None
+
+        self.frames_captured = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.raw_bytes = 0
+        self.bytes_sent = 0
+
+    def capture(self, driver, name, force=False):
+        """Grab the screenshot on the caller's thread; everything else happens in the background.
+
+        `force` sends the frame even if it looks like the previous one (e.g. error shots).
+        """
+        png = driver.get_screenshot_as_png()
+        with self._lock:
+            self.frames_captured += 1
+            self.raw_bytes += len(png)
+            self._queue.append((name, png, force))
+            if self._draining:
+                return
+            self._draining = True
+            self._idle.clear()
+        _executor.submit(self._drain)
+
+    def _drain(self):
+        # Frames of one pipeline are processed in order so dedup compares neighbours
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._draining = False
+                    self._idle.set()
+                    return
+                name, png, force = self._queue.popleft()
+            try:
+                self._process(name, png, force)
+            except Exception as e:
+                print(f"[!] Screenshot processing failed for {name}: {e}")
+
+    def _encode(self, image):
+        out = io.BytesIO()
+        fmt = self.fmt
+        try:
+            if fmt == "JPEG":
+                image = image.convert("RGB")
+            image.save(out, fmt, quality=self.quality)
+        except (OSError, KeyError, ValueError):
+            # Pillow built without WebP support
+            fmt, out = "JPEG", io.BytesIO()
+            image.convert("RGB").save(out, fmt, quality=self.quality)
+        return out.getvalue(), fmt
+
+    def _process(self, name, png, force=False):
+        image = Image.open(io.BytesIO(png))
+        if image.width > self.max_width:
+            image = image.resize((self.max_width, round(image.height * self.max_width / image.width)), Image.LANCZOS)
+        frame_hash = dhash(image)
+        if not force and self._last_hash is not None and bin(frame_hash ^ self._last_hash).count("1") <= self.dedup_distance:
+            with self._lock:
+                self.frames_skipped += 1
+            return
+        self._last_hash = frame_hash
+
+        data, fmt = self._encode(image)
+        path = None
+        if self.save:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{name}.{fmt.lower()}")
+            with open(path, "wb") as f:
+                f.write(data)
+        if self.sink:
+            self.sink({"job_id": self.job_id, "name": name, "mime": MIME_TYPES[fmt], "data": data}, force)
+            with self._lock:
+                self.frames_sent += 1
+                self.bytes_sent += len(data)
+        return path
+
+    def flush(self, timeout=10):
+        """Wait for queued frames to be processed"""
+        return self._idle.wait(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frames_captured": self.frames_captured,
+                "frames_sent": self.frames_sent,
+                "frames_skipped": self.frames_skipped,
+                "raw_bytes": self.raw_bytes,
+                "bytes_sent": self.bytes_sent,
+            }
@@ -0,0 +1,147 @@
+# Persistent selector-resolution cache
+# Remembers which XPath candidate won for each step on each page so the next
+# run tries it first, and drops candidates that keep failing.
+
+import atexit
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class SelectorCache:
+    def __init__(self, path=None, max_failures=3, save_interval=5.0):
+        self.path = path
+        self.max_failures = max_failures
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self._last_save = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self._load()
+
+    @staticmethod
+    def fingerprint(url):
+        """Identify a page by host and path, ignoring query strings and fragments"""
+        parsed = urlparse(url or "")
+        return f"{parsed.netloc}{parsed.path}"
+
+    @staticmethod
+    def _key(step, fingerprint):
+        return f"{step}@{fingerprint}"
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+        except (OSError, ValueError) as e:
+            print(f"[!] Ignoring unreadable selector cache {self.path}: {e}")
+            self._entries = {}
+
+    def save(self, force=True):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._last_save < self.save_interval):
+                return
+            data = json.dumps(self._entries, indent=2)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[!] Failed to save selector cache: {e}")
+
+    def order(self, step, fingerprint, candidates):
+        """Return candidates with previously winning selectors first, best hit count first"""
+        with self._lock:
+            known = self._entries.get(self._key(step, fingerprint), {})
+        winners = sorted(
+            (s for s in candidates if known.get(s, {}).get("hits", 0) > 0),
+            key=lambda s: (-known[s]["hits"], known[s].get("consecutive_failures", 0)),
+        )
+        return winners + [s for s in candidates if s not in winners]
+
+    def record_success(self, step, fingerprint, selector, first_try):
+        """Record a winning selector; a first-try win on a cached step counts as a hit"""
+        with self._lock:
+            entry = self._entries.setdefault(self._key(step, fingerprint), {})
+            cached = any(stats.get("hits", 0) > 0 for stats in entry.values())
+            stats = entry.setdefault(selector, {"hits": 0, "failures": 0, "consecutive_failures": 0})
+            stats["hits"] += 1
+            stats["consecutive_failures"] = 0
+            stats["last_hit"] = time.time()
+            if cached and first_try:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._dirty = True
+        self.save(force=False)
+
+    def record_failure(self, step, fingerprint, selector):
+        """Count a failed candidate, evicting it after repeated failures"""
+        with self._lock:
+            entry = self._entries.get(self._key(step, fingerprint))
+            if not entry or selector not in entry:
+                return
+            stats = entry[selector]
+            stats["failures"] += 1
+            stats["consecutive_failures"] += 1
+            if stats["consecutive_failures"] >= self.max_failures:
+                del entry[selector]
+                self.evictions += 1
+            self._dirty = True
+
+    def record_not_found(self, step):
+        """Count a step where no candidate matched at all"""
+        with self._lock:
+            self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            steps = {}
+            for key, entry in self._entries.items():
+                steps[key] = {
+                    selector: {
+                        "hits": s["hits"],
+                        "failures": s["failures"],
+                        "hit_rate": s["hits"] / (s["hits"] + s["failures"]) if s["hits"] + s["failures"] else 0.0,
+                    }
+                    for selector, s in entry.items()
+                }
+            return {
+                "selector_cache_hits": self.hits,
+                "selector_cache_misses": self.misses,
+                "selector_cache_hit_ratio": self.hits / lookups if lookups else 0.0,
+                "selector_cache_evictions": self.evictions,
+                "selector_cache_entries": sum(len(e) for e in self._entries.values()),
+                "steps": steps,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_selector_cache():
+    """Process-wide cache shared by all agents, persisted to SELECTOR_CACHE_PATH"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SelectorCache(
+                path=os.getenv("SELECTOR_CACHE_PATH", "selector_cache.json"),
+                max_failures=int(os.getenv("SELECTOR_CACHE_MAX_FAILURES", "3")),
+            )
+            atexit.register(_default_cache.save)
+        return _default_cache
@@ -0,0 +1,411 @@
+# Step-level checkpoints and resumable retries for the interactive send flow
+# A send is a chain of steps (inbox, compose, recipients, subject, body, send, confirm).
+# Every finished step is checkpointed (in SQLite, keyed by the send's idempotency key),
+# a failed step is retried on its own with capped, jittered backoff instead of
+# restarting the whole flow, and a compose window lost mid-flow (page reload, crash,
+# another process picking the job up) is reopened from Drafts with whatever Gmail
+# autosaved. Send itself is never repeated blindly: after an unconfirmed click the flow
+# looks for the message in Sent, then in Drafts, and only clicks again while it is
+# still a draft.
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from accounts import connect
+
+try:
+    import psutil
+except ImportError:  # Optional; without it owner liveness uses os.kill where that is safe
+    psutil = None
+
+STEPS = ("open_gmail", "open_compose", "fill_recipient", "fill_subject", "fill_body", "send", "confirm_sent")
+# Steps whose work lives in the compose window, and so in the autosaved draft
+COMPOSE_STEPS = ("fill_recipient", "fill_subject", "fill_body")
+# Checkpoint states: composing -> sending -> sent, or failed when the flow gave up. unknown is a
+# click that may have sent the message while neither Sent nor Drafts shows it: never resent.
+STATES = ("composing", "sending", "sent", "unknown", "failed")
+
+
+def new_owner():
+    """A flow's owner id: the process that runs it, then a unique part"""
+    return f"{os.getpid()}:{uuid.uuid4().hex}"
+
+
+def owner_alive(owner):
+    """False once the process behind `owner` has exited; True when that can't be told"""
+    pid, sep, _ = owner.partition(":")
+    if not sep or not pid.isdigit():
+        return True
+    pid = int(pid)
+    if pid == os.getpid():
+        return True
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == "nt":
+        return True   # os.kill would terminate it there
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+class RetryPolicy:
+    """Attempts per step with capped exponential backoff (half fixed, half jitter)"""
+
+    def __init__(self, attempts=3, base=0.5, cap=5.0):
+        self.attempts = max(1, attempts)
+        self.base = base
+        self.cap = cap
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            attempts=int(os.getenv("SEND_STEP_ATTEMPTS", "3")),
+            base=float(os.getenv("SEND_RETRY_BASE", "0.5")),
+            cap=float(os.getenv("SEND_RETRY_CAP", "5")),
+        )
+
+    def delay(self, attempt):
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        ceiling = min(self.cap, self.base * 2 ** (attempt - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+class SendCheckpoints:
+    """Per-key step checkpoints shared across threads and processes, plus flow counters"""
+
+    def __init__(self, path, ttl=7 * 86400, claim_ttl=300):
+        self.path = path
+        self.claim_ttl = claim_ttl    # seconds before a live owner's unfinished send may be taken over
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self.counts = {
+            "flows": 0, "resumed": 0, "step_executions": 0, "step_retries": 0, "drafts_reopened": 0,
+            "relogins": 0, "duplicates_prevented": 0, "unknown": 0, "failed": 0,
+        }
+        self.wasted_seconds = 0.0
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS send_checkpoints (
+                    key TEXT PRIMARY KEY, owner TEXT NOT NULL, steps TEXT NOT NULL,
+                    state TEXT NOT NULL, updated REAL NOT NULL);
+            """)
+            self._conn.execute("DELETE FROM send_checkpoints WHERE updated < ?", (time.time() - ttl,))
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT owner, steps, state, updated FROM send_checkpoints WHERE key=?",
+                                     (key,)).fetchone()
+        if not row:
+            return None
+        owner, steps, state, updated = row
+        return {"owner": owner, "steps": json.loads(steps), "state": state, "updated": updated}
+
+    def save(self, key, owner, steps, state):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO send_checkpoints VALUES (?, ?, ?, ?, ?)",
+                               (key, owner, json.dumps(list(steps)), state, time.time()))
+
+    def claim(self, key, owner, steps):
+        """Move `key` to sending for `owner`; False while another owner's send is (recently) in flight or done"""
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT owner, state, updated FROM send_checkpoints WHERE key=?",
+                                   (key,)).fetchone()
+                if row and row[0] != owner and (row[1] == "sent" or row[1] == "unknown"
+                                                or (row[1] == "sending" and self.in_flight(row[0], row[2]))):
+                    conn.execute("COMMIT")
+                    return False
+                conn.execute("INSERT OR REPLACE INTO send_checkpoints VALUES (?, ?, ?, 'sending', ?)",
+                             (key, owner, json.dumps(list(steps)), now))
+                conn.execute("COMMIT")
+                return True
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def in_flight(self, owner, updated):
+        """Whether a send `owner` left in the sending state may still be underway: its claim is
+        younger than claim_ttl and its process is still running"""
+        return time.time() - updated < self.claim_ttl and owner_alive(owner)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def add_work(self, executions, wasted_seconds):
+        with self._lock:
+            self.counts["step_executions"] += executions
+            self.wasted_seconds += wasted_seconds
+
+    def stats(self):
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT state, COUNT(*) FROM send_checkpoints GROUP BY state").fetchall())
+            stats = {f"send_flow_{name}": value for name, value in self.counts.items()}
+            stats["send_flow_wasted_seconds"] = round(self.wasted_seconds, 3)
+        for state in STATES:
+            stats[f"send_checkpoints_{state}"] = rows.get(state, 0)
+        return stats
+
+
+_default_checkpoints = None
+_default_lock = threading.Lock()
+
+
+def default_send_checkpoints():
+    """Process-wide checkpoint store at SEND_CHECKPOINT_DB"""
+    global _default_checkpoints
+    with _default_lock:
+        if _default_checkpoints is None:
+            _default_checkpoints = SendCheckpoints(
+                os.getenv("SEND_CHECKPOINT_DB", "send_checkpoints.db"),
+                ttl=float(os.getenv("SEND_CHECKPOINT_TTL", str(7 * 86400))),
+            )
+        return _default_checkpoints
+
+
+class SendFlow:
+    """Drives one message through STEPS on a BrowserAgent, checkpointing as it goes.
+
+    With `resumable` off it behaves like the original flow: any failure discards the compose
+    window and starts over from the inbox, and an unconfirmed send counts as sent.
+    """
+
+    def __init__(self, agent, recipients, subject, body, key=None, checkpoints=None, policy=None,
+                 resumable=None, log=None):
+        self.agent = agent
+        self.recipients = recipients
+        self.subject = subject
+        self.body = body
+        self.key = key
+        self.checkpoints = checkpoints or default_send_checkpoints()
+        self.policy = policy or RetryPolicy.from_env()
+        if resumable is None:
+            resumable = os.getenv("SEND_FLOW_RESUME", "1") != "0"
+        self.resumable = resumable
+        self.log = log or print
+        self.owner = new_owner()
+        self.done = []            # steps the compose window currently reflects
+        self.completed = set()    # steps finished at least once; finishing one again is wasted work
+        self.recoveries = 0
+        self.executions = 0
+        self.wasted_seconds = 0.0
+
+    def already_sent(self):
+        """Whether an earlier attempt under this key already sent the message"""
+        prior = self.checkpoints.get(self.key) if self.key else None
+        if not prior or prior["state"] != "sent":
+            return False
+        self.checkpoints.count("duplicates_prevented")
+        self.log("[ℹ] Message already sent under this idempotency key, not sending again")
+        return True
+
+    def record_sent(self):
+        """Mark the key sent after a send that bypassed the flow (the compose-URL strategy)"""
+        self._checkpoint("sent")
+
+    def run(self):
+        self.checkpoints.count("flows")
+        try:
+            return self._run()
+        except Exception:
+            # Past a successful click nobody knows whether it went out: don't let a retry send it again
+            self._checkpoint("unknown" if "send" in self.completed else "failed")
+            raise
+        finally:
+            self.checkpoints.add_work(self.executions, self.wasted_seconds)
+
+    def _run(self):
+        prior = self.checkpoints.get(self.key) if self.key else None
+        if prior and prior["state"] == "sent":
+            self.checkpoints.count("duplicates_prevented")
+            return True
+        if prior and prior["state"] in ("sending", "unknown"):
+            self.checkpoints.count("resumed")
+            if prior["state"] == "unknown":
+                self.checkpoints.count("duplicates_prevented")
+                self.log("[ℹ] An earlier attempt may have sent this message, not sending again")
+                return True
+            if self.checkpoints.in_flight(prior["owner"], prior["updated"]):
+                self.log("[!] Another worker is sending this message")
+                return False
+            # A worker died (or its claim expired) after clicking Send: find out what became of
+            # the message first
+            if not self._step("open_gmail"):
+                return self._fail("open_gmail")
+            verdict = self._after_send()
+            if verdict is not None:
+                return verdict
+        elif prior and self.resumable and any(step in prior["steps"] for step in COMPOSE_STEPS):
+            self.checkpoints.count("resumed")
+            self.log(f"[🔄] Resuming from checkpoint ({', '.join(prior['steps'])})")
+            if not self._step("open_gmail"):
+                return self._fail("open_gmail")
+            if not self._reopen_draft():
+                self.done = []
+        return self._drive()
+
+    def _drive(self):
+        while True:
+            step = next(step for step in STEPS if step not in self.done)
+            if (step in COMPOSE_STEPS or step == "send") and not self.agent.compose_open():
+                if not self._recover():
+                    return self._fail(step)
+                continue
+            if step == "send":
+                verdict = self._send()
+                if verdict is not None:
+                    return verdict
+                continue
+            if self._step(step):
+                continue
+            if step == "fill_recipient" and self.agent.last_rejected:
+                return self._fail(step)
+            if step in COMPOSE_STEPS and self.resumable and not self.agent.compose_open():
+                continue   # the window went away mid-step: the next pass recovers it
+            if self.resumable or not self._recover():
+                return self._fail(step)
+
+    def _execute(self, step):
+        agent = self.agent
+        if step == "open_gmail":
+            return agent.open_inbox()
+        if step == "open_compose":
+            return agent.open_compose()
+        if step == "fill_recipient":
+            return agent.enter_recipients(self.recipients)
+        if step == "fill_subject":
+            return agent.fill_subject(self.subject)
+        if step == "fill_body":
+            return agent.fill_body(self.body)
+        if step == "send":
+            return agent.click_send()
+        raise ValueError(f"Not a runnable step: {step}")
+
+    def _step(self, step):
+        """Run one step, retrying just that step; True once it completed"""
+        attempts = self.policy.attempts if self.resumable else 1
+        for attempt in range(attempts):
+            if attempt:
+                self.checkpoints.count("step_retries")
+                self.agent.trace.retry()
+                time.sleep(self.policy.delay(attempt))
+                if (step in COMPOSE_STEPS or step == "send") and not self.agent.compose_open():
+                    return False
+                if step == "open_gmail" and self.agent.mail_url not in self.agent.driver.current_url:
+                    self.checkpoints.count("relogins")
+                    self.agent.relogin()
+            start = time.perf_counter()
+            try:
+                ok = self._execute(step)
+            except Exception as e:
+                self.log(f"[!] Step {step} failed: {e}")
+                ok = False
+            elapsed = time.perf_counter() - start
+            self.executions += 1
+            if ok:
+                if step in self.completed:
+                    self.wasted_seconds += elapsed
+                self.completed.add(step)
+                self.done.append(step)
+                self._checkpoint("sending" if step == "send" else "composing")
+                return True
+            self.wasted_seconds += elapsed
+            if step == "fill_recipient" and self.agent.last_rejected:
+                return False   # an address Gmail won't accept doesn't get better with retries
+        return False
+
+    def _send(self):
+        """Click Send and settle what happened; None means the message is back in an open compose window"""
+        if self.key and not self.checkpoints.claim(self.key, self.owner, self.done):
+            self.checkpoints.count("duplicates_prevented")
+            self.log("[!] Another worker is sending this message")
+            return False
+        if not self._step("send"):
+            if self.agent.compose_open():
+                return self._fail("send")
+            return self._after_send()
+        self.executions += 1
+        confirmed = self.agent.confirm_sent()
+        if confirmed:
+            self.done.append("confirm_sent")
+            return self._sent()
+        if not self.resumable:
+            self.log("[✅] Email likely sent (no confirmation toast found)")
+            return self._sent()
+        if confirmed is None:
+            # The compose window never closed, so the click didn't take: sending again can't duplicate
+            self.done.remove("send")
+            self._checkpoint("composing")
+            self.recoveries += 1
+            return None if self.recoveries <= self.policy.attempts else self._fail("send")
+        return self._after_send()
+
+    def _after_send(self):
+        """A click may have sent the message: Sent says yes, a draft says no (resume it), nothing says unknown"""
+        self.log("[🔎] No confirmation, looking for the message in Sent...")
+        if self.agent.find_message("sent", self.recipients, self.subject):
+            self.log("[✅] Email found in Sent")
+            return self._sent()
+        if self.recoveries < self.policy.attempts and self._reopen_draft():
+            self.recoveries += 1
+            return None
+        self.checkpoints.count("unknown")
+        self._checkpoint("unknown")
+        self.log("[✅] Email likely sent (not in Sent or Drafts yet, so not sending it again)")
+        return True
+
+    def _recover(self):
+        """The compose window is gone: reopen the draft and keep what it carries, else compose from scratch"""
+        self.recoveries += 1
+        if self.recoveries > self.policy.attempts:
+            self.log("[❌] Compose window kept disappearing, giving up")
+            return False
+        if self.resumable and self._reopen_draft():
+            return True
+        self.log("[🔄] Starting the message over")
+        self.agent.reset_compose()
+        self.done = []
+        return True
+
+    def _reopen_draft(self):
+        self.log("[🔄] Reopening the message from Drafts...")
+        start = time.perf_counter()
+        try:
+            checks = self.agent.open_draft(self.recipients, self.subject, self.body)
+        except Exception as e:
+            self.log(f"[!] Reopening the draft failed: {e}")
+            checks = None
+        if not checks:
+            self.wasted_seconds += time.perf_counter() - start
+            return False
+        self.checkpoints.count("drafts_reopened")
+        carried = [step for step, field in zip(COMPOSE_STEPS, ("recipients", "subject", "body")) if checks.get(field)]
+        self.done = ["open_gmail", "open_compose", *carried]
+        self._checkpoint("composing")
+        self.log(f"[✓] Draft reopened with {', '.join(carried) or 'nothing filled yet'}")
+        return True
+
+    def _sent(self):
+        self._checkpoint("sent")
+        return True
+
+    def _fail(self, step):
+        self.checkpoints.count("failed")
+        self._checkpoint("failed")
+        self.log(f"[❌] Send flow stopped at {step}")
+        return False
+
+    def _checkpoint(self, state):
+        if self.key:
+            self.checkpoints.save(self.key, self.owner, self.done, state)
@@ -0,0 +1,125 @@
+# Server modes for the Flask-SocketIO app
+# dev keeps the Werkzeug server (debug, reloader, threading async mode). production
+# serves real WebSockets from gevent (with gevent-websocket) or eventlet, whichever
+# is installed (SOCKETIO_ASYNC_MODE picks one), with no debugger or reloader.
+# Only sockets, timers and the like are monkey-patched: threads stay native, so the
+# job workers (Selenium), the generation loop (LLM calls) and the session pools keep
+# doing their blocking work on real OS threads while the hub serves connections.
+# Socket.IO emits from those threads go through the event bus outbox (see EventBus),
+# and anything a request handler has to wait on goes through run_blocking().
+#
+#   SERVER_MODE=production SOCKETIO_ASYNC_MODE=gevent python main.py
+
+import importlib.util
+import os
+
+SERVER_MODES = ("dev", "production")
+ASYNC_MODES = ("gevent", "eventlet", "threading")
+
+_state = {"server_mode": "dev", "async_mode": "threading"}
+
+
+def get_server_mode(name=None):
+    name = (name or os.getenv("SERVER_MODE", "dev")).lower()
+    if name not in SERVER_MODES:
+        raise ValueError(f"Unknown server mode '{name}', expected one of {SERVER_MODES}")
+    return name
+
+
+def resolve_async_mode(server_mode, name=None):
+    """The async mode for `server_mode`: always threading in dev, gevent or eventlet (if installed) in production"""
+    if server_mode == "dev":
+        return "threading"
+    name = (name or os.getenv("SOCKETIO_ASYNC_MODE", "auto")).lower()
+    if name == "auto":
+        return next((mode for mode in ("gevent", "eventlet") if importlib.util.find_spec(mode)), "threading")
+    if name not in ASYNC_MODES:
+        raise ValueError(f"Unknown async mode '{name}', expected auto or one of {ASYNC_MODES}")
+    return name
+
+
+def prepare():
+    """Pick the server and async mode from the environment and monkey-patch for it.
+
+    Call before anything else is imported; returns (server_mode, async_mode).
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    server_mode = get_server_mode()
+    async_mode = resolve_async_mode(server_mode)
+    threads = int(os.getenv("BLOCKING_THREADS", "20"))
+    if async_mode == "gevent":
+        from gevent import get_hub, monkey
+
+        monkey.patch_all(thread=False, select=False)
+        get_hub().threadpool_size = threads
+    elif async_mode == "eventlet":
+        os.environ.setdefault("EVENTLET_THREADPOOL_SIZE", str(threads))
+        import eventlet
+
+        eventlet.monkey_patch(thread=False, select=False)
+    _state.update(server_mode=server_mode, async_mode=async_mode)
+    return server_mode, async_mode
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Call fn on a native thread and yield to the hub until it returns (a plain call in threading mode)"""
+    if _state["async_mode"] == "gevent":
+        from gevent import get_hub
+
+        return get_hub().threadpool.apply(fn, args, kwargs)
+    if _state["async_mode"] == "eventlet":
+        from eventlet import tpool
+
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+def websocket_available(async_mode):
+    """Whether `async_mode` can serve the WebSocket transport (otherwise clients long-poll)"""
+    if async_mode == "gevent":
+        return importlib.util.find_spec("geventwebsocket") is not None
+    if async_mode == "eventlet":
+        return True
+    return importlib.util.find_spec("simple_websocket") is not None
+
+
+def socketio_options(async_mode):
+    """SocketIO() keyword arguments: connection and buffer settings from the environment"""
+    origins = os.getenv("SOCKETIO_CORS_ORIGINS", "*")
+    return {
+        "async_mode": async_mode,
+        "cors_allowed_origins": origins if origins == "*" else [o.strip() for o in origins.split(",") if o.strip()],
+        "ping_interval": float(os.getenv("SOCKETIO_PING_INTERVAL", "25")),
+        "ping_timeout": float(os.getenv("SOCKETIO_PING_TIMEOUT", "20")),
+        "max_http_buffer_size": int(os.getenv("SOCKETIO_MAX_BUFFER", "1000000")),
+        "http_compression": os.getenv("SOCKETIO_HTTP_COMPRESSION", "1") != "0",
+    }
+
+
+def client_options(server_mode, async_mode):
+    """io() options for the browser: WebSocket first in production (socket.js falls back to polling)"""
+    transports = os.getenv("SOCKETIO_CLIENT_TRANSPORTS")
+    if transports:
+        return {"transports": [t.strip() for t in transports.split(",") if t.strip()]}
+    if server_mode == "production" and websocket_available(async_mode):
+        return {"transports": ["websocket", "polling"]}
+    return {}
+
+
+def run_options(server_mode, async_mode):
+    """socketio.run() keyword arguments for the mode"""
+    if server_mode == "dev":
+        # FAST_STARTUP=1: no debug reloader (which imports everything twice)
+        fast = os.getenv("FAST_STARTUP") == "1"
+        return {"debug": not fast, "use_reloader": not fast, "allow_unsafe_werkzeug": fast}
+    log_output = os.getenv("SERVER_ACCESS_LOG") == "1"
+    max_connections = int(os.getenv("SERVER_MAX_CONNECTIONS", "1000"))
+    if async_mode == "gevent":
+        return {"log_output": log_output, "spawn": max_connections,
+                "backlog": int(os.getenv("SERVER_BACKLOG", "1024"))}
+    if async_mode == "eventlet":
+        return {"log_output": log_output, "max_size": max_connections}
+    print("[!] SERVER_MODE=production without gevent or eventlet installed; serving with Werkzeug threads")
+    return {"log_output": log_output, "allow_unsafe_werkzeug": True}
@@ -0,0 +1,223 @@
+# Warm pool of pre-launched, logged-in BrowserAgent sessions
+# Each lease hands out a driver that is already sitting on the Gmail inbox,
+# so a send only pays for composing instead of a cold Chrome start + login.
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no session became available within the lease timeout"""
+
+
+class PooledSession:
+    def __init__(self, agent):
+        self.agent = agent
+        self.uses = 0
+        self.created_at = time.monotonic()
+        self.last_used = time.monotonic()
+
+
+class SessionPool:
+    def __init__(self, email, password, size=2, max_uses=25, max_idle=900,
+                 lease_timeout=120, maintenance_interval=30, agent_factory=None):
+        self.email = email
+        self.password = password
+        self.size = size
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self.lease_timeout = lease_timeout
+        self.maintenance_interval = maintenance_interval
+        self.agent_factory = agent_factory or self._default_agent
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._leased = set()
+        self._starting = 0
+        self._waiting = 0
+        self._closed = False
+        self._maintenance_thread = None
+
+        # Metrics
+        self._lease_waits = deque(maxlen=200)
+        self._leases_total = 0
+        self._lease_timeouts = 0
+        self._recycled_total = 0
+        self._reauth_total = 0
+        self._spawn_failures = 0
+
+    def _default_agent(self):
+        from browser_agent import BrowserAgent
+
+        return BrowserAgent(self.email, self.password)
+
+    def start(self):
+        """Fill the pool in the background and start the maintenance loop"""
+        self._fill()
+        self._maintenance_thread = threading.Thread(
+            target=self._maintenance_loop, name="session-pool-maintenance", daemon=True
+        )
+        self._maintenance_thread.start()
+
+    def _log(self, text):
+        print(f"[POOL] {text}")
+
+    def _fill(self):
+        with self._cond:
+            missing = self.size - (len(self._idle) + len(self._leased) + self._starting)
+            if self._closed or missing <= 0:
+                return
+            self._starting += missing
+        for _ in range(missing):
+            threading.Thread(target=self._spawn, name="session-pool-spawn", daemon=True).start()
+
+    def _spawn(self):
+        agent = None
+        try:
+            agent = self.agent_factory()
+            ok = agent.login_to_gmail()
+        except Exception as e:
+            self._log(f"Failed to launch session: {e}")
+            ok = False
+        with self._cond:
+            self._starting -= 1
+            if ok and not self._closed:
+                self._idle.append(PooledSession(agent))
+                self._cond.notify()
+                self._log("Session launched and logged in")
+                return
+            if not ok:
+                self._spawn_failures += 1
+        if agent:
+            agent.quit()
+
+    def _reauth(self, session):
+        """Log an unhealthy session back in; replace it if that fails"""
+        with self._cond:
+            self._starting += 1
+            self._reauth_total += 1
+        try:
+            ok = session.agent.login_to_gmail(restore=False) and session.agent.is_healthy()
+        except Exception:
+            ok = False
+        with self._cond:
+            self._starting -= 1
+            if ok and not self._closed:
+                session.last_used = time.monotonic()
+                self._idle.append(session)
+                self._cond.notify()
+                self._log("Session re-authenticated")
+                return
+        self._log("Re-authentication failed, replacing session")
+        session.agent.quit()
+        self._fill()
+
+    def _retire(self, session):
+        with self._cond:
+            self._recycled_total += 1
+        threading.Thread(target=session.agent.quit, name="session-pool-quit", daemon=True).start()
+
+    def acquire(self, timeout=None):
+        """Take an idle session, waiting up to `timeout` seconds for one"""
+        timeout = self.lease_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._lease_timeouts += 1
+                        raise PoolTimeout(f"No browser session available after {timeout}s")
+                    self._cond.wait(remaining)
+                if self._closed:
+                    raise PoolTimeout("Session pool is closed")
+                session = self._idle.popleft()
+                self._leased.add(session)
+            finally:
+                self._waiting -= 1
+            self._leases_total += 1
+            self._lease_waits.append(time.monotonic() - started)
+        return session
+
+    def release(self, session):
+        """Return a session, health-checking and recycling it as needed"""
+        session.uses += 1
+        session.last_used = time.monotonic()
+        session.agent.attach()
+        healthy = session.agent.is_healthy()
+        with self._cond:
+            self._leased.discard(session)
+            closed = self._closed
+            if healthy and session.uses < self.max_uses and not closed:
+                self._idle.append(session)
+                self._cond.notify()
+                return
+        if closed:
+            session.agent.quit()
+        elif not healthy:
+            self._log("Session failed health check, re-authenticating in background")
+            threading.Thread(target=self._reauth, args=(session,), name="session-pool-reauth", daemon=True).start()
+        else:
+            self._log(f"Session reached {session.uses} uses, recycling")
+            self._retire(session)
+            self._fill()
+
+    @contextmanager
+    def lease(self, emit_callback=None, timeout=None, screenshots=None):
+        session = self.acquire(timeout)
+        session.agent.attach(emit_callback, screenshots)
+        try:
+            yield session.agent
+        finally:
+            self.release(session)
+
+    def _maintenance_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self.maintenance_interval)
+                if self._closed:
+                    return
+                now = time.monotonic()
+                stale = [s for s in self._idle if now - s.last_used > self.max_idle]
+                for session in stale:
+                    self._idle.remove(session)
+            for session in stale:
+                self._log("Session idle too long, recycling")
+                self._retire(session)
+            self._fill()
+
+    def metrics(self):
+        with self._cond:
+            waits = sorted(self._lease_waits)
+            agents = [s.agent for s in list(self._idle) + list(self._leased)]
+        rss = [mb for mb in (agent.memory_usage() for agent in agents) if mb is not None]
+        with self._cond:
+            return {
+                "pool_size": self.size,
+                "pool_idle": len(self._idle),
+                "pool_leased": len(self._leased),
+                "pool_starting": self._starting,
+                "pool_waiting_leases": self._waiting,
+                "pool_leases_total": self._leases_total,
+                "pool_lease_timeouts_total": self._lease_timeouts,
+                "pool_recycled_total": self._recycled_total,
+                "pool_reauth_total": self._reauth_total,
+                "pool_spawn_failures_total": self._spawn_failures,
+                "pool_lease_wait_seconds_avg": sum(waits) / len(waits) if waits else 0.0,
+                "pool_lease_wait_seconds_max": waits[-1] if waits else 0.0,
+                "pool_session_rss_mb_total": round(sum(rss), 1),
+                "pool_session_rss_mb_avg": round(sum(rss) / len(rss), 1) if rss else 0.0,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            sessions = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for session in sessions:
+            session.agent.quit()
@@ -0,0 +1,133 @@
+# Encrypted-at-rest store for logged-in browser state
+# After a successful login the agent saves its cookies and localStorage here,
+# one Fernet-encrypted file per account, so new drivers can restore the
+# session instead of walking through the multi-screen sign-in again.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from metrics import Histogram
+
+
+class SessionStore:
+    def __init__(self, directory, key, max_age=7 * 24 * 3600):
+        self.directory = directory
+        self.max_age = max_age
+        from cryptography.fernet import Fernet  # only imported once a key is configured
+
+        self._fernet = Fernet(key)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self.restore_latency = Histogram()
+        self.login_latency = Histogram()
+        self._stats = {
+            "restore_attempts": 0,
+            "restore_success": 0,
+            "restore_expired": 0,
+            "full_logins": 0,
+            "full_login_failures": 0,
+            "saves": 0,
+        }
+
+    def _path(self, account):
+        digest = hashlib.sha256(account.strip().lower().encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"{digest}.session")
+
+    def save(self, account, cookies, local_storage=None):
+        """Encrypt and store `cookies` (CDP cookie dicts) and {origin: {key: value}} localStorage"""
+        state = {"saved_at": time.time(), "cookies": cookies, "local_storage": local_storage or {}}
+        token = self._fernet.encrypt(json.dumps(state).encode("utf-8"))
+        path = self._path(account)
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(token)
+            os.replace(tmp_path, path)
+            self._stats["saves"] += 1
+
+    def load(self, account):
+        """Return the saved state for `account`, or None if missing, stale or undecryptable"""
+        path = self._path(account)
+        try:
+            with open(path, "rb") as f:
+                token = f.read()
+        except FileNotFoundError:
+            return None
+        from cryptography.fernet import InvalidToken
+
+        try:
+            state = json.loads(self._fernet.decrypt(token))
+        except (InvalidToken, ValueError):
+            print(f"[!] Discarding unreadable session state {path}")
+            self.delete(account)
+            return None
+        if time.time() - state.get("saved_at", 0) > self.max_age:
+            self.delete(account)
+            return None
+        now = time.time()
+        # Drop cookies that have already expired; session cookies (no expiry) are kept
+        state["cookies"] = [c for c in state.get("cookies", []) if c.get("expires", -1) <= 0 or c["expires"] > now]
+        return state
+
+    def delete(self, account):
+        try:
+            os.remove(self._path(account))
+        except FileNotFoundError:
+            pass
+
+    def record_restore(self, ok, seconds):
+        with self._lock:
+            self._stats["restore_attempts"] += 1
+            self._stats["restore_success" if ok else "restore_expired"] += 1
+        self.restore_latency.observe(seconds)
+
+    def record_login(self, ok, seconds):
+        with self._lock:
+            self._stats["full_logins"] += 1
+            if not ok:
+                self._stats["full_login_failures"] += 1
+        if ok:
+            self.login_latency.observe(seconds)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        attempts = stats["restore_attempts"]
+        return {
+            "session_restore_attempts_total": attempts,
+            "session_restore_success_total": stats["restore_success"],
+            "session_restore_expired_total": stats["restore_expired"],
+            "session_restore_success_ratio": stats["restore_success"] / attempts if attempts else 0.0,
+            "session_full_logins_total": stats["full_logins"],
+            "session_full_login_failures_total": stats["full_login_failures"],
+            "session_saves_total": stats["saves"],
+            "session_restore_seconds": self.restore_latency.snapshot(),
+            "session_restore_p50_seconds": self.restore_latency.quantile(0.5),
+            "session_full_login_seconds": self.login_latency.snapshot(),
+            "session_full_login_p50_seconds": self.login_latency.quantile(0.5),
+        }
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_session_store():
+    """Shared store configured from SESSION_STORE_KEY; None (disabled) when no key is set"""
+    global _default_store
+    key = os.getenv("SESSION_STORE_KEY")
+    if not key:
+        return None
+    with _default_lock:
+        if _default_store is None:
+            _default_store = SessionStore(
+                os.getenv("SESSION_STORE_DIR", "sessions"),
+                key,
+                max_age=float(os.getenv("SESSION_STORE_MAX_AGE", str(7 * 24 * 3600))),
+            )
+        return _default_store
@@ -0,0 +1,396 @@
+# Multi-account, multi-process sending
+# The web process routes each send to an account and drops it into a SQLite
+# queue; worker processes, each owning the browser sessions for a subset of the
+# accounts, claim jobs for their accounts, respect the shared per-account rate
+# limits and write progress back for the web process to relay.
+#
+#   python sharding.py --workers 2          # run workers next to main.py (SHARD_WORKERS=0 there)
+#   SHARD_WORKERS=2 python main.py          # or let main.py launch them
+
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from accounts import AccountLimiter, connect, load_accounts
+from job_queue import JobCancelled
+from transports import BrowserTransport, TransportRouter
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+class ShardQueue:
+    """Jobs, progress events and worker heartbeats shared through one SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS shard_jobs (
+                    id TEXT PRIMARY KEY, account TEXT NOT NULL, payload TEXT NOT NULL,
+                    status TEXT NOT NULL, worker TEXT, error TEXT, not_before REAL NOT NULL DEFAULT 0,
+                    created REAL NOT NULL, updated REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS shard_jobs_claim ON shard_jobs (status, account, not_before);
+                CREATE TABLE IF NOT EXISTS shard_events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, text TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS shard_workers (
+                    worker TEXT PRIMARY KEY, pid INTEGER, accounts TEXT, heartbeat REAL);
+            """)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def enqueue(self, job_id, account, payload):
+        now = time.time()
+        self._execute("INSERT INTO shard_jobs (id, account, payload, status, created, updated) VALUES (?, ?, ?, 'queued', ?, ?)",
+                      (job_id, account, json.dumps(payload), now, now))
+
+    def claim(self, worker, accounts):
+        """Atomically take the oldest runnable job for one of `accounts`"""
+        if not accounts:
+            return None
+        marks = ",".join("?" * len(accounts))
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT id, account, payload FROM shard_jobs WHERE status='queued' AND account IN ({marks}) "
+                    "AND not_before <= ? ORDER BY created LIMIT 1", (*accounts, now)).fetchone()
+                if row:
+                    conn.execute("UPDATE shard_jobs SET status='running', worker=?, updated=? WHERE id=?",
+                                 (worker, now, row[0]))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        return {"id": row[0], "account": row[1], "payload": json.loads(row[2])}
+
+    def defer(self, job_id, seconds):
+        """Put a claimed job back until the account has send budget again"""
+        self._execute("UPDATE shard_jobs SET status='queued', worker=NULL, not_before=?, updated=? WHERE id=?",
+                      (time.time() + seconds, time.time(), job_id))
+
+    def finish(self, job_id, status, error=None):
+        self._execute("UPDATE shard_jobs SET status=?, error=?, updated=? WHERE id=? AND status != 'cancelled'",
+                      (status, error, time.time(), job_id))
+
+    def cancel(self, job_id):
+        """Cancel a job that no worker has started; returns True if it was still queued"""
+        with self._lock:
+            cursor = self._conn.execute("UPDATE shard_jobs SET status='cancelled', updated=? WHERE id=? AND status='queued'",
+                                        (time.time(), job_id))
+            return cursor.rowcount > 0
+
+    def abandon(self, job_id, error):
+        """Fail a job whose worker is gone; returns True if it was still running"""
+        with self._lock:
+            cursor = self._conn.execute("UPDATE shard_jobs SET status='failed', error=?, updated=? "
+                                        "WHERE id=? AND status='running'", (error, time.time(), job_id))
+            return cursor.rowcount > 0
+
+    def status(self, job_id):
+        rows = self._execute("SELECT status, error FROM shard_jobs WHERE id=?", (job_id,))
+        return rows[0] if rows else (None, None)
+
+    def add_event(self, job_id, text):
+        self._execute("INSERT INTO shard_events (job_id, text) VALUES (?, ?)", (job_id, text))
+
+    def events_since(self, job_id, seq):
+        return self._execute("SELECT seq, text FROM shard_events WHERE job_id=? AND seq > ? ORDER BY seq", (job_id, seq))
+
+    def requeue_running(self, worker):
+        """Return jobs a crashed worker had claimed to the queue"""
+        self._execute("UPDATE shard_jobs SET status='queued', worker=NULL, updated=? WHERE worker=? AND status='running'",
+                      (time.time(), worker))
+
+    def heartbeat(self, worker, accounts):
+        self._execute("INSERT OR REPLACE INTO shard_workers VALUES (?, ?, ?, ?)",
+                      (worker, os.getpid(), json.dumps(accounts), time.time()))
+
+    def load(self):
+        """Queued/running job counts per account, plus live workers"""
+        counts = {}
+        for account, status, count in self._execute(
+                "SELECT account, status, COUNT(*) FROM shard_jobs WHERE status IN ('queued', 'running') "
+                "GROUP BY account, status"):
+            counts.setdefault(account, {"queued": 0, "running": 0})[status] = count
+        workers = {
+            worker: {"pid": pid, "accounts": json.loads(accounts), "heartbeat_age": round(time.time() - heartbeat, 1)}
+            for worker, pid, accounts, heartbeat in self._execute("SELECT * FROM shard_workers")
+        }
+        return counts, workers
+
+    def prune(self, older_than=3600):
+        cutoff = time.time() - older_than
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute(
+                "SELECT id FROM shard_jobs WHERE status IN ('done', 'failed', 'cancelled') AND updated < ?", (cutoff,))]
+            for job_id in ids:
+                self._conn.execute("DELETE FROM shard_events WHERE job_id=?", (job_id,))
+                self._conn.execute("DELETE FROM shard_jobs WHERE id=?", (job_id,))
+
+
+class Router:
+    """Picks an account per send and relays the job through the shard queue"""
+
+    def __init__(self, accounts, db_path, poll_interval=0.25, worker_timeout=30.0):
+        if not accounts:
+            raise ValueError("Sharding needs at least one account (set ACCOUNTS_FILE or GMAIL_USER/GMAIL_PASS)")
+        self.accounts = {account.email: account for account in accounts}
+        self.queue = ShardQueue(db_path)
+        self.limiter = AccountLimiter(db_path, accounts)
+        self.poll_interval = poll_interval
+        self.worker_timeout = worker_timeout   # seconds a job may wait without a live worker for its account
+
+    def choose(self, sender=None):
+        """Sticky to `sender` when given, else the account with the most headroom"""
+        if sender:
+            if sender not in self.accounts:
+                raise ValueError(f"Unknown sender account: {sender}")
+            return sender
+        counts, _ = self.queue.load()
+        usage = self.limiter.usage()
+
+        def score(email):
+            backlog = sum(counts.get(email, {}).values())
+            remaining = usage[email]["quota_remaining"]
+            # Fewest outstanding jobs relative to the account's send rate; exhausted accounts last
+            return (remaining <= backlog, backlog / self.accounts[email].rate_per_minute, -remaining)
+
+        return min(self.accounts, key=score)
+
+    def dispatch(self, job_id, payload, sender=None):
+        account = self.choose(sender)
+        self.queue.enqueue(job_id, account, payload)
+        return account
+
+    def _has_live_worker(self, account):
+        _, workers = self.queue.load()
+        return any(account in worker["accounts"] and worker["heartbeat_age"] < self.worker_timeout
+                   for worker in workers.values())
+
+    def wait(self, job, emit_fn, account):
+        """Relay a dispatched job's progress until it finishes; returns True if it was sent.
+
+        Fails the job once no worker serving `account` has sent a heartbeat for worker_timeout seconds.
+        """
+        seq = 0
+        orphaned_since = None
+        next_check = 0.0
+        while True:
+            for seq, text in self.queue.events_since(job.id, seq):
+                emit_fn(text)
+            status, error = self.queue.status(job.id)
+            if status in FINISHED:
+                for seq, text in self.queue.events_since(job.id, seq):
+                    emit_fn(text)
+                if status == "cancelled":
+                    raise JobCancelled(f"Job {job.id} was cancelled")
+                if status == "failed":
+                    raise RuntimeError(error or "Email was not sent")
+                return True
+            if job.cancelled and self.queue.cancel(job.id):
+                raise JobCancelled(f"Job {job.id} was cancelled")
+            now = time.monotonic()
+            if now >= next_check:
+                next_check = now + 1.0
+                if self._has_live_worker(account):
+                    orphaned_since = None
+                elif orphaned_since is None:
+                    orphaned_since = now
+                elif now - orphaned_since >= self.worker_timeout:
+                    if self.queue.cancel(job.id):
+                        raise RuntimeError(f"No shard worker is serving {account}; the email was not sent")
+                    if self.queue.abandon(job.id, "Shard worker stopped responding"):
+                        raise RuntimeError(f"The shard worker for {account} stopped responding; "
+                                           "the email may or may not have been sent")
+                    continue   # it finished in the meantime
+            time.sleep(self.poll_interval)
+
+    def stats(self):
+        counts, workers = self.queue.load()
+        usage = self.limiter.usage()
+        for email, report in usage.items():
+            report.update(counts.get(email, {"queued": 0, "running": 0}))
+        return {"accounts": usage, "workers": workers}
+
+
+class ShardWorker:
+    """One process: a transport per owned account (a session pool for browser ones) and a thread per session"""
+
+    def __init__(self, worker_id, accounts, db_path, sessions_per_account=1, heartbeat_interval=5.0):
+        self.worker_id = worker_id
+        self.accounts = {account.email: account for account in accounts}
+        self.db_path = db_path
+        self.sessions_per_account = sessions_per_account
+        self.heartbeat_interval = heartbeat_interval
+        self.queue = ShardQueue(db_path)
+        self.limiter = AccountLimiter(db_path, accounts)
+        self.pools = {}
+        self._pools_lock = threading.Lock()
+        self.transports = TransportRouter(BrowserTransport(self._send_with_pool), accounts)
+        self._stop = threading.Event()
+
+    def _log(self, text):
+        print(f"[SHARD {self.worker_id}] {text}")
+
+    def _pool(self, email):
+        """The account's session pool, started on first use for accounts that normally send over SMTP"""
+        from session_pool import SessionPool
+
+        with self._pools_lock:
+            pool = self.pools.get(email)
+            if pool is None:
+                account = self.accounts[email]
+                pool = self.pools[email] = SessionPool(account.email, account.password, size=self.sessions_per_account)
+                pool.start()
+            return pool
+
+    def _send_with_pool(self, message, emit_fn, **context):
+        with self._pool(message["sender"]).lease(emit_callback=emit_fn) as agent:
+            ok = agent.compose_and_send_email(message["to"], message["subject"], message["body"],
+                                              cc=message.get("cc"), bcc=message.get("bcc"),
+                                              idempotency_key=message.get("idempotency_key"))
+        emit_fn("✅ Email sent successfully!" if ok else "❌ Failed to send email.")
+        return ok
+
+    def _run_one(self, claimed):
+        job_id, email = claimed["id"], claimed["account"]
+        wait = self.limiter.try_acquire(email)
+        if wait:
+            self.queue.defer(job_id, wait)
+            self.queue.add_event(job_id, f"⏳ {email} is at its send rate, retrying in {wait:.0f}s...")
+            return
+        emit = lambda text, image_path=None: text and self.queue.add_event(job_id, text)
+        payload = claimed["payload"]
+        ok = False
+        try:
+            emit(f"🧠 Sending from {email} (worker {self.worker_id})...")
+            # Requeued after a worker died, the job resumes that worker's checkpoint instead of resending
+            message = {"sender": email, "idempotency_key": f"shard:{job_id}", **payload}
+            ok = self.transports.send(message, emit)
+            self.queue.finish(job_id, "done" if ok else "failed", None if ok else "Email was not sent")
+        except Exception as e:
+            self.queue.finish(job_id, "failed", str(e))
+            emit(f"❌ {e}")
+        finally:
+            self.limiter.record_result(email, ok)
+
+    def _session_loop(self, accounts):
+        while not self._stop.is_set():
+            claimed = self.queue.claim(self.worker_id, accounts)
+            if claimed is None:
+                self._stop.wait(0.5)
+                continue
+            self._run_one(claimed)
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self.queue.heartbeat(self.worker_id, list(self.accounts))
+
+    def run(self):
+        self.queue.requeue_running(self.worker_id)
+        self.queue.heartbeat(self.worker_id, list(self.accounts))
+        threads = [threading.Thread(target=self._heartbeat_loop, name="shard-heartbeat", daemon=True)]
+        for email in self.accounts:
+            if self.transports.uses_browser(email):
+                self._pool(email)
+            for i in range(self.sessions_per_account):
+                # Each thread only claims jobs for the account whose pool it leases from
+                threads.append(threading.Thread(target=self._session_loop, args=([email],),
+                                                name=f"shard-{email}-{i}", daemon=True))
+        for thread in threads:
+            thread.start()
+        self._log(f"Serving {', '.join(self.accounts)} with {self.sessions_per_account} session(s) each")
+        try:
+            while not self._stop.wait(60):
+                self.queue.prune()
+        finally:
+            self.transports.close()
+            for pool in self.pools.values():
+                pool.close()
+
+    def stop(self):
+        self._stop.set()
+
+
+def assign_accounts(accounts, workers):
+    """Round-robin accounts over worker processes; never more workers than accounts"""
+    workers = max(1, min(workers, len(accounts)))
+    return [accounts[i::workers] for i in range(workers)]
+
+
+def _worker_main(worker_id, emails, db_path, sessions_per_account):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    accounts = [account for account in load_accounts() if account.email in emails]
+    ShardWorker(worker_id, accounts, db_path, sessions_per_account).run()
+
+
+def start_workers(workers, db_path, sessions_per_account=1, accounts=None):
+    """Launch worker processes; returns {worker_id: Process}"""
+    accounts = accounts if accounts is not None else load_accounts()
+    processes = {}
+    for i, shard in enumerate(assign_accounts(accounts, workers)):
+        worker_id = f"w{i}"
+        processes[worker_id] = _spawn_worker(worker_id, [a.email for a in shard], db_path, sessions_per_account)
+    return processes
+
+
+def _spawn_worker(worker_id, emails, db_path, sessions_per_account):
+    # spawn, not fork: each worker starts clean instead of inheriting the parent's threads and sockets
+    args = (worker_id, emails, db_path, sessions_per_account)
+    process = multiprocessing.get_context("spawn").Process(
+        target=_worker_main, args=args, name=f"shard-{worker_id}", daemon=True,
+    )
+    process.shard_args = args
+    process.start()
+    return process
+
+
+def supervise(processes, db_path, interval=5.0, stop=None):
+    """Restart crashed workers with the same accounts, handing their claimed jobs back to the queue"""
+    queue = ShardQueue(db_path)
+    stop = stop or threading.Event()
+    while not stop.wait(interval):
+        for worker_id, process in list(processes.items()):
+            if process.is_alive():
+                continue
+            print(f"[SHARD] Worker {worker_id} exited ({process.exitcode}), restarting")
+            queue.requeue_running(worker_id)
+            processes[worker_id] = _spawn_worker(*process.shard_args)
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run sharded send workers for every configured account")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sessions", type=int, default=int(os.getenv("SHARD_SESSIONS_PER_ACCOUNT", "1")))
+    parser.add_argument("--db", default=os.getenv("SHARD_DB", "shards.db"))
+    args = parser.parse_args()
+    accounts = load_accounts()
+    if not accounts:
+        parser.error("No accounts configured (set ACCOUNTS_FILE or GMAIL_USER/GMAIL_PASS)")
+    processes = start_workers(args.workers, args.db, args.sessions, accounts)
+    print(f"[SHARD] {len(processes)} worker(s) for {len(accounts)} account(s), queue in {args.db}")
+    try:
+        supervise(processes, args.db)
+    except KeyboardInterrupt:
+        for process in processes.values():
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
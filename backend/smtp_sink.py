@@ -0,0 +1,194 @@
+# Local SMTP sink for exercising SmtpTransport without a real mail server
+# Speaks enough ESMTP for smtplib (EHLO with PIPELINING and AUTH PLAIN/LOGIN,
+# MAIL/RCPT/DATA, RSET, NOOP, QUIT), keeps every accepted message in memory and
+# can refuse logins, add a simulated network round trip to every read that had
+# to wait for the client (so pipelined commands pay it once), hang up after N
+# messages to exercise the reconnect path, or hang up with a message taken but
+# not yet acknowledged (which a client must not resend):
+#
+#   python smtp_sink.py --port 8025 --latency 0.01
+#   SEND_TRANSPORT=smtp SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_SECURITY=none python main.py
+
+import argparse
+import base64
+import socketserver
+import threading
+import time
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, password=None, latency=0.0, drop_after=0, rcpt_limit=0, drop_in_data=False):
+        super().__init__(address, _SinkHandler)
+        self.password = password        # None accepts any login
+        self.latency = latency          # seconds per round trip, paid when a read waits on the network
+        self.drop_after = drop_after    # hang up after this many messages on one connection (0: never)
+        self.rcpt_limit = rcpt_limit    # refuse recipients beyond this many per message (0: no limit)
+        self.drop_in_data = drop_in_data  # keep each message but hang up before replying 250
+        self.messages = []
+        self.lock = threading.Lock()
+        self.counts = {"connections": 0, "messages": 0, "auth_failures": 0, "commands": 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"smtp://{host}:{port}"
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+class _SinkHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.buffer = b""
+        self.pending = []
+
+    def readline(self):
+        while b"\n" not in self.buffer:
+            # Replies to pipelined commands go out together, like a real server's, once the batch is read
+            self.flush()
+            chunk = self.request.recv(65536)
+            if not chunk:
+                line, self.buffer = self.buffer, b""
+                return line
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            self.buffer += chunk
+        line, _, self.buffer = self.buffer.partition(b"\n")
+        return line + b"\n"
+
+    def reply(self, line):
+        self.pending.append(f"{line}\r\n".encode())
+
+    def flush(self):
+        if self.pending:
+            self.request.sendall(b"".join(self.pending))
+            self.pending = []
+
+    def finish(self):
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+    def handle(self):
+        self.server.count("connections")
+        self.reply("220 sink ESMTP ready")
+        sender, recipients, delivered = None, [], 0
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            self.server.count("commands")
+            command, _, argument = line.decode(errors="replace").rstrip("\r\n").partition(" ")
+            command = command.upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250-sink\r\n250-PIPELINING\r\n250-8BITMIME\r\n250 AUTH PLAIN LOGIN")
+            elif command == "AUTH":
+                self.authenticate(argument)
+            elif command == "MAIL":
+                sender, recipients = argument.partition(":")[2].strip(" <>"), []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                if sender is None:
+                    self.reply("503 MAIL first")
+                elif self.server.rcpt_limit and len(recipients) >= self.server.rcpt_limit:
+                    self.reply("452 Too many recipients")
+                else:
+                    recipients.append(argument.partition(":")[2].strip(" <>"))
+                    self.reply("250 OK")
+            elif command == "DATA":
+                if not recipients:
+                    self.reply("554 No valid recipients")
+                    continue
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self.read_data()
+                if data is None:
+                    return
+                with self.server.lock:
+                    self.server.messages.append({"sender": sender, "recipients": recipients, "data": data})
+                self.server.count("messages")
+                if self.server.drop_in_data:
+                    self.pending = []
+                    return
+                delivered += 1
+                sender, recipients = None, []
+                self.reply("250 OK queued")
+                if self.server.drop_after and delivered >= self.server.drop_after:
+                    return
+            elif command == "RSET":
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif command == "NOOP":
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def authenticate(self, argument):
+        mechanism, _, initial = argument.partition(" ")
+        if mechanism.upper() == "PLAIN":
+            if not initial:
+                self.reply("334 ")
+                initial = self.readline().decode().strip()
+            _, username, password = base64.b64decode(initial).decode().split("\0")
+        elif mechanism.upper() == "LOGIN":
+            self.reply("334 VXNlcm5hbWU6")
+            username = base64.b64decode(self.readline().strip()).decode()
+            self.reply("334 UGFzc3dvcmQ6")
+            password = base64.b64decode(self.readline().strip()).decode()
+        else:
+            self.reply("504 Unrecognized authentication type")
+            return
+        if self.server.password is not None and password != self.server.password:
+            self.server.count("auth_failures")
+            self.reply(f"535 Authentication failed for {username}")
+            return
+        self.reply("235 Authentication successful")
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.readline()
+            if not line:
+                return None
+            if line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+
+def serve_in_thread(host="127.0.0.1", port=0, **options):
+    """Start a sink on a background thread; returns it (server_address holds the bound port)"""
+    sink = SmtpSink((host, port), **options)
+    threading.Thread(target=sink.serve_forever, name="smtp-sink", daemon=True).start()
+    return sink
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--password", default=None, help="Only accept this password (default: any)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per network round trip")
+    parser.add_argument("--drop-after", type=int, default=0, help="Hang up after N messages per connection")
+    args = parser.parse_args()
+    sink = SmtpSink((args.host, args.port), password=args.password, latency=args.latency,
+                    drop_after=args.drop_after)
+    print(f"[SMTP SINK] Listening on {sink.url}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        print(f"[SMTP SINK] {sink.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Startup timing report
+# Marks how long the server takes to import, to bind its port and to have a
+# warm browser, plus how slow the first requests are, so startup regressions
+# show up in /metrics/startup (and the startup_* keys of /metrics).
+
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # Optional; without it the interpreter's own start-up isn't counted
+    psutil = None
+
+
+class StartupReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._marks = {}       # milestone -> seconds since the report was created
+        self._durations = {}   # background step -> seconds it took
+        self._first_request = None
+        self.interpreter_seconds = None
+        if psutil is not None:
+            try:
+                self.interpreter_seconds = max(0.0, time.time() - psutil.Process().create_time())
+            except psutil.Error:
+                pass
+
+    def mark(self, milestone):
+        """Record that `milestone` was reached now (first time only)"""
+        with self._lock:
+            self._marks.setdefault(milestone, time.perf_counter() - self.started)
+
+    @contextmanager
+    def timed(self, step):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._durations[step] = time.perf_counter() - start
+
+    def install(self, app):
+        """Time the first request the Flask app serves"""
+        @app.before_request
+        def _start_timer():
+            from flask import g
+
+            g.startup_request_started = time.perf_counter()
+
+        @app.after_request
+        def _record_first(response):
+            from flask import g, request
+
+            started = getattr(g, "startup_request_started", None)
+            if started is not None and self._first_request is None:
+                with self._lock:
+                    if self._first_request is None:
+                        self._first_request = (request.path, time.perf_counter() - started)
+                        self._marks.setdefault("first_request", time.perf_counter() - self.started)
+            return response
+
+    def stats(self):
+        with self._lock:
+            marks = dict(self._marks)
+            durations = dict(self._durations)
+            first_request = self._first_request
+        stats = {f"startup_{name}_seconds": round(seconds, 3) for name, seconds in marks.items()}
+        stats.update({f"startup_{name}_duration_seconds": round(seconds, 3) for name, seconds in durations.items()})
+        if self.interpreter_seconds is not None:
+            stats["startup_interpreter_seconds"] = round(self.interpreter_seconds, 3)
+        if first_request:
+            stats["startup_first_request_latency_seconds"] = round(first_request[1], 3)
+        return stats
+
+    def summary(self):
+        stats = self.stats()
+        parts = [f"{key[len('startup_'):-len('_seconds')]} {value:.2f}s" for key, value in stats.items()]
+        return "[STARTUP] " + ", ".join(parts)
+
+
+startup_report = StartupReport()
@@ -0,0 +1,162 @@
+# Precomputed static assets for the web UI
+# Every file under frontend/ (plus the Socket.IO client, wherever it is installed)
+# is read once at startup and kept with its ETag and gzip/brotli encodings, so a
+# request is a dict lookup: 304 when the ETag matches, otherwise the smallest
+# encoding the client accepts. The page references the other assets with
+# ?v=<version> so those can be cached for a year; the page itself is always
+# revalidated. With watch=True (dev) a changed file is picked up on its next request.
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # Optional; without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 512
+LONG_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Local src/href references in the page (no scheme, query or fragment)
+_REFERENCE_RE = re.compile(r'\b(src|href)="([^":?#]+)"')
+
+
+class Asset:
+    def __init__(self, name, path, data, mtime):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        digest = hashlib.sha256(data).hexdigest()
+        self.version = digest[:12]
+        self.etag = f'"{digest[:20]}"'
+        self.encodings = {"identity": data}
+        if len(data) >= MIN_COMPRESS_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            self.encodings["gzip"] = gzip.compress(data, 9, mtime=0)
+            if brotli is not None:
+                self.encodings["br"] = brotli.compress(data, quality=11)
+
+    def pick(self, accept_encoding):
+        """(encoding, body) for the smallest encoding the Accept-Encoding header allows"""
+        accepted = {}
+        for part in (accept_encoding or "").split(","):
+            coding, _, params = part.strip().partition(";")
+            quality = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    pass
+            accepted[coding.strip().lower()] = quality
+        options = [(len(body), coding) for coding, body in self.encodings.items()
+                   if coding == "identity" or accepted.get(coding, accepted.get("*", 0)) > 0]
+        _, coding = min(options)
+        return coding, self.encodings[coding]
+
+
+class StaticAssets:
+    def __init__(self, root, aliases=None, page="index.html", page_globals=None, max_age=3600, watch=False):
+        self.root = root
+        self.aliases = aliases or {}          # url name -> file outside root (e.g. the Socket.IO client)
+        self.page = page
+        self.page_globals = page_globals or {}  # window.<NAME> values injected into the page
+        self.max_age = max_age                # seconds for unversioned assets (0: always revalidate)
+        self.watch = watch
+        self._lock = threading.Lock()
+        self._assets = {}
+        self._stats = {"requests": 0, "not_modified": 0, "not_found": 0, "bytes_sent": 0}
+        self.load()
+
+    def _files(self):
+        for directory, _, names in os.walk(self.root):
+            for filename in names:
+                path = os.path.join(directory, filename)
+                yield os.path.relpath(path, self.root).replace(os.sep, "/"), path
+        for name, path in self.aliases.items():
+            if path:
+                yield name, path
+
+    def load(self):
+        """(Re)read every asset and render the page against their versions"""
+        assets = {}
+        for name, path in self._files():
+            with open(path, "rb") as f:
+                assets[name] = Asset(name, path, f.read(), os.path.getmtime(path))
+        page = assets.get(self.page)
+        if page:
+            assets[self.page] = Asset(self.page, page.path, self._render(page.encodings["identity"], assets), page.mtime)
+        with self._lock:
+            self._assets = assets
+
+    def _render(self, html, assets):
+        html = html.decode("utf-8")
+        html = _REFERENCE_RE.sub(
+            lambda m: f'{m.group(1)}="{m.group(2)}?v={assets[m.group(2)].version}"' if m.group(2) in assets
+            else m.group(0),
+            html,
+        )
+        if self.page_globals:
+            script = "".join(f"window.{name} = {json.dumps(value)};" for name, value in self.page_globals.items())
+            html = html.replace("<script", f"<script>{script}</script>\n  <script", 1)
+        return html.encode("utf-8")
+
+    def get(self, name):
+        with self._lock:
+            asset = self._assets.get(name)
+        if asset and self.watch:
+            try:
+                changed = os.path.getmtime(asset.path) != asset.mtime
+            except OSError:
+                changed = True
+            if changed:
+                self.load()
+                with self._lock:
+                    asset = self._assets.get(name)
+        return asset
+
+    def response(self, name, request):
+        """Flask response for asset `name` (None when there is no such asset)"""
+        asset = self.get(name)
+        with self._lock:
+            self._stats["requests"] += 1
+            if asset is None:
+                self._stats["not_found"] += 1
+        if asset is None:
+            return None
+        if name == self.page or not self.max_age:
+            cache_control = REVALIDATE
+        elif request.args.get("v") == asset.version:
+            cache_control = LONG_CACHE
+        else:
+            cache_control = f"public, max-age={self.max_age}"
+        headers = {"ETag": asset.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if asset.etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+            with self._lock:
+                self._stats["not_modified"] += 1
+            return Response(status=304, headers=headers)
+        coding, body = asset.pick(request.headers.get("Accept-Encoding"))
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        with self._lock:
+            self._stats["bytes_sent"] += len(body)
+        return Response(body, status=200, headers=headers, content_type=asset.content_type)
+
+    def stats(self):
+        with self._lock:
+            assets = list(self._assets.values())
+            stats = {f"static_{name}": value for name, value in self._stats.items()}
+        stats["static_assets"] = len(assets)
+        for coding in ("identity", "gzip", "br"):
+            stats[f"static_{coding}_bytes"] = sum(len(a.encodings[coding]) for a in assets if coding in a.encodings)
+        return stats
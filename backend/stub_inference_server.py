@@ -0,0 +1,104 @@
+# Local stub of the chat-completions inference endpoint
+# Lets the generation service be exercised without a GITHUB_TOKEN or network.
+# Requests with "stream": true are answered as server-sent chat.completion.chunk
+# events, a few characters per token, like the real streaming API:
+#
+#   python stub_inference_server.py --port 8765 --latency 0.8
+#   INFERENCE_ENDPOINT=http://127.0.0.1:8765 GITHUB_TOKEN=stub python main.py
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+
+def draft_for(prompt):
+    """Deterministic fake draft derived from the quoted intent in the prompt"""
+    intent = prompt.split('"')[1] if prompt.count('"') >= 2 else prompt.strip()
+    return {
+        "subject": f"Re: {intent[:60]}",
+        "body": f"Hello,\n\nThis is a generated draft for: {intent}.\n\nBest regards,\nStub",
+    }
+
+
+def stream_chunks(content, model, token_latency, token_chars=4):
+    """Server-sent events for a streamed completion of `content`"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+    def event(delta, finish_reason=None):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    yield event({"role": "assistant", "content": ""})
+    for i in range(0, len(content), token_chars):
+        time.sleep(token_latency)
+        yield event({"content": content[i:i + token_chars]})
+    yield event({}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+def create_app(latency=0.5, jitter=0.1, fail_rate=0.0, token_latency=0.02):
+    app = Flask(__name__)
+    app.config["STATS"] = {"requests": 0}
+    lock = threading.Lock()
+
+    @app.route("/chat/completions", methods=["POST"])
+    def chat_completions():
+        with lock:
+            app.config["STATS"]["requests"] += 1
+        payload = request.get_json(force=True)
+        time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+        if random.random() < fail_rate:
+            return jsonify({"error": {"code": "InternalServerError", "message": "stub failure"}}), 500
+        prompt = payload["messages"][-1]["content"]
+        content = json.dumps(draft_for(prompt))
+        if payload.get("stream"):
+            return Response(
+                stream_chunks(content, payload.get("model", "stub"), token_latency),
+                mimetype="text/event-stream",
+            )
+        return jsonify({
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(content.split()),
+                      "total_tokens": len(prompt.split()) + len(content.split())},
+        })
+
+    @app.route("/stats")
+    def stats():
+        return jsonify(app.config["STATS"])
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per completion (time to first token when streaming)")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Seconds between streamed tokens")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    args = parser.parse_args()
+    create_app(args.latency, args.jitter, args.fail_rate, args.token_latency).run(args.host, args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+# Several compose tabs in one logged-in Chrome
+# A TabScheduler leases out Gmail tabs of a single browser the way SessionPool
+# leases out whole browsers. WebDriver has one command channel per browser, so
+# the driver is shared through a fair lock: each command first switches to the
+# window of the tab its thread leased (skipped when it already is current), and
+# in-page waits are cut into short slices so tabs take turns instead of holding
+# the channel. With DRIVER_BACKEND=cdp every tab also gets its own DevTools
+# session for typing and the event-driven sent watch. How many tabs are in use
+# adapts to the throughput, latency and error rate of recent sends.
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from session_pool import PoolTimeout
+
+_WINDOW_COMMANDS = ("switchToWindow", "newWindow", "close", "quit", "getWindowHandles", "newSession")
+
+
+class WindowChannel:
+    """Serializes a driver between threads and keeps each thread on its own window"""
+
+    def __init__(self, driver):
+        self._execute = driver.execute
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._owner = None
+        self._depth = 0
+        self._bound = threading.local()
+        self.current = driver.current_window_handle
+        self.switches = 0
+        self.commands = 0
+        # Every command (WebElements included) goes through driver.execute
+        driver.execute = self.execute
+
+    def _acquire(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                return
+            # First come, first served, so a tab looping over short waits can't starve the others
+            self._queue.append(me)
+            while self._owner is not None or self._queue[0] != me:
+                self._cond.wait()
+            self._queue.popleft()
+            self._owner, self._depth = me, 1
+
+    def _release(self):
+        with self._cond:
+            self._depth -= 1
+            if not self._depth:
+                self._owner = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def hold(self):
+        """Keep the driver to this thread across several commands (e.g. open a window and learn its handle)"""
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def bind(self, handle):
+        """Run this thread's driver commands against window `handle` (None: whatever is current)"""
+        self._bound.handle = handle
+
+    def execute(self, command, params=None):
+        self._acquire()
+        try:
+            handle = getattr(self._bound, "handle", None)
+            if handle and handle != self.current and command not in _WINDOW_COMMANDS:
+                self._execute("switchToWindow", {"handle": handle})
+                self.current = handle
+                self.switches += 1
+            result = self._execute(command, params)
+            self.commands += 1
+            if command == "switchToWindow":
+                self.current = (params or {}).get("handle", self.current)
+            elif command == "close":
+                self.current = None
+            return result
+        finally:
+            self._release()
+
+
+class Tab:
+    def __init__(self, handle, agent):
+        self.handle = handle
+        self.agent = agent
+        self.uses = 0
+        self.opened_at = time.monotonic()
+
+
+class TabScheduler:
+    """A pool of Gmail tabs in one browser, sized between min_tabs and max_tabs by what it observes"""
+
+    def __init__(self, email, password, max_tabs=4, min_tabs=1, initial_tabs=1, lease_timeout=120,
+                 max_error_rate=0.2, min_gain=0.05, latency_factor=3.0, wait_slice=0.25, agent_factory=None):
+        self.email = email
+        self.password = password
+        self.size = max(1, max_tabs)
+        self.max_tabs = self.size
+        self.min_tabs = max(1, min(min_tabs, self.max_tabs))
+        self.target = max(self.min_tabs, min(initial_tabs, self.max_tabs))
+        self.lease_timeout = lease_timeout
+        self.max_error_rate = max_error_rate
+        self.min_gain = min_gain
+        self.latency_factor = latency_factor
+        self.wait_slice = wait_slice
+        self.agent_factory = agent_factory or self._default_agent
+
+        self.agent = None
+        self.channel = None
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._leased = set()
+        self._opening = 0
+        self._closed = False
+        self._ready = threading.Event()
+
+        # Adaptation state: sends since the last decision, and what the previous window achieved
+        self._window = []
+        self._window_started = None
+        self._last_rate = None
+        self._grew_last = False
+        self._hold = 0
+        self._best_latency = None
+        self._decisions = deque(maxlen=50)
+
+        # Metrics
+        self._recent = deque(maxlen=500)  # (finished at, ok, seconds)
+        self._leases_total = 0
+        self._lease_timeouts = 0
+        self._sent = 0
+        self._failed = 0
+        self._tabs_opened = 0
+        self._tabs_closed = 0
+        self._rss_mb = None
+
+    def _default_agent(self):
+        from browser_agent import BrowserAgent
+
+        return BrowserAgent(self.email, self.password)
+
+    def _log(self, text):
+        print(f"[TABS] {text}")
+
+    def start(self):
+        """Launch and log in the browser in the background; its first window becomes tab 0"""
+        threading.Thread(target=self._launch, name="tab-scheduler-launch", daemon=True).start()
+
+    def _launch(self):
+        try:
+            agent = self.agent_factory()
+            if not agent.login_to_gmail():
+                agent.quit()
+                raise RuntimeError("Gmail login failed")
+        except Exception as e:
+            self._log(f"Failed to launch browser: {e}")
+            self._ready.set()
+            return
+        self.agent = agent
+        self.channel = WindowChannel(agent.driver)
+        handle = self.channel.current
+        self.channel.bind(handle)
+        tab = Tab(handle, agent.window_view(self.wait_slice))
+        self.channel.bind(None)
+        with self._cond:
+            self._tabs_opened += 1
+            self._idle.append(tab)
+            self._cond.notify()
+        self._ready.set()
+        self._log("Browser launched and logged in")
+
+    def _open_tab(self):
+        """Open and load another Gmail tab, driven from the calling thread"""
+        agent, view = self.agent, None
+        try:
+            # Opening a window switches the driver: no other tab's command may land in between
+            with self.channel.hold():
+                agent.driver.switch_to.new_window("tab")
+                handle = self.channel.current
+            self.channel.bind(handle)
+            agent.profile.apply(agent.driver)
+            view = agent.window_view(self.wait_slice)
+            agent.driver.get(agent.mail_url)
+            inbox, _ = view.probe(["//div[@role='main']"], timeout=30, interactable=False)
+            if not inbox and not view.login_to_gmail():
+                raise RuntimeError("tab did not reach the inbox")
+            with self._cond:
+                self._tabs_opened += 1
+            self._log(f"Opened tab {handle[-6:]}")
+            return Tab(handle, view)
+        except Exception as e:
+            self._log(f"Failed to open a tab: {e}")
+            if view is not None:
+                self._close_tab(Tab(handle, view), opened=False)
+            return None
+        finally:
+            self.channel.bind(None)
+
+    def _close_tab(self, tab, opened=True):
+        self.channel.bind(tab.handle)
+        try:
+            if tab.agent.backend:
+                tab.agent.backend.close()
+            with self.channel.hold():
+                tab.agent.driver.switch_to.window(tab.handle)
+                tab.agent.driver.close()
+        except Exception as e:
+            self._log(f"Failed to close tab: {e}")
+        finally:
+            self.channel.bind(None)
+        if opened:
+            with self._cond:
+                self._tabs_closed += 1
+            self._log(f"Closed tab {tab.handle[-6:]}")
+
+    def acquire(self, timeout=None):
+        """Take an idle tab, opening one if fewer than the target are open"""
+        timeout = self.lease_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        if not self._ready.wait(timeout):
+            raise PoolTimeout(f"Browser not ready after {timeout}s")
+        while True:
+            with self._cond:
+                if self._closed or self.agent is None:
+                    raise PoolTimeout("Tab scheduler is closed" if self._closed else "Browser failed to launch")
+                open_tabs = len(self._idle) + len(self._leased) + self._opening
+                if self._idle and len(self._leased) < self.target:
+                    tab = self._idle.popleft()
+                    self._leased.add(tab)
+                    self._leases_total += 1
+                    return tab
+                open_new = not self._idle and open_tabs < self.target
+                if open_new:
+                    self._opening += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._lease_timeouts += 1
+                        raise PoolTimeout(f"No tab available after {timeout}s")
+                    self._cond.wait(remaining)
+                    continue
+            tab = self._open_tab()
+            with self._cond:
+                self._opening -= 1
+                if tab:
+                    self._idle.append(tab)
+                self._cond.notify_all()
+
+    def release(self, tab):
+        """Return a tab; recover it if it left the inbox, close it if there are more tabs than the target"""
+        tab.uses += 1
+        tab.agent.attach()
+        self.channel.bind(tab.handle)
+        try:
+            healthy = tab.agent.is_healthy()
+            if not healthy:
+                self._log("Tab left the inbox, reloading")
+                tab.agent.driver.get(tab.agent.mail_url)
+                healthy = tab.agent.is_healthy()
+        except Exception:
+            healthy = False
+        finally:
+            self.channel.bind(None)
+        with self._cond:
+            self._leased.discard(tab)
+            open_tabs = len(self._idle) + len(self._leased) + 1
+            # Never close the last window: that would end the WebDriver session
+            keep = not self._closed and (open_tabs == 1 or (healthy and open_tabs <= self.target))
+            if keep:
+                self._idle.append(tab)
+            self._cond.notify_all()
+        if not keep and not self._closed:
+            self._close_tab(tab)
+
+    @contextmanager
+    def lease(self, emit_callback=None, timeout=None, screenshots=None):
+        tab = self.acquire(timeout)
+        tab.agent.attach(emit_callback, screenshots)
+        tab.agent.on_compose = self._record
+        self.channel.bind(tab.handle)
+        try:
+            yield tab.agent
+        finally:
+            tab.agent.on_compose = None
+            self.channel.bind(None)
+            self.release(tab)
+
+    def _record(self, compose):
+        """Feed one send's outcome to the metrics and, every few sends, re-decide the tab count"""
+        now = time.monotonic()
+        with self._cond:
+            self._recent.append((now, compose["ok"], compose["seconds"]))
+            if compose["ok"]:
+                self._sent += 1
+            else:
+                self._failed += 1
+            if self._window_started is None:
+                self._window_started = now - compose["seconds"]
+            self._window.append((compose["ok"], compose["seconds"]))
+            if len(self._window) >= max(4, 2 * self.target):
+                self._adapt(now)
+
+    def _adapt(self, now):
+        window, elapsed = self._window, max(now - self._window_started, 1e-6)
+        self._window, self._window_started = [], now
+        latencies = sorted(seconds for ok, seconds in window if ok)
+        errors = 1 - len(latencies) / len(window)
+        latency = latencies[len(latencies) // 2] if latencies else None
+        rate = len(latencies) / elapsed
+        if latency is not None and self.target == 1:
+            self._best_latency = latency if self._best_latency is None else min(self._best_latency, latency)
+        target, reason = self.target, "hold"
+        if errors > self.max_error_rate:
+            target, reason = self.target - 1, f"error rate {errors:.0%}"
+        elif latency and self._best_latency and latency > self._best_latency * self.latency_factor:
+            target, reason = self.target - 1, f"latency {latency:.1f}s"
+        elif self._grew_last and self._last_rate and rate < self._last_rate * (1 + self.min_gain):
+            # The extra tab didn't pay for itself: step back and stay there for a while
+            target, reason, self._hold = self.target - 1, "no throughput gain", 3
+        elif self._hold:
+            self._hold -= 1
+        elif self.target < self.max_tabs:
+            target, reason = self.target + 1, "throughput rising"
+        target = max(self.min_tabs, min(self.max_tabs, target))
+        self._grew_last = target > self.target
+        self._last_rate = rate
+        if target != self.target:
+            self._decisions.append({"at": round(now, 1), "from": self.target, "to": target, "reason": reason,
+                                    "emails_per_minute": round(rate * 60, 1)})
+            self._log(f"{self.target} -> {target} tabs ({reason}, {rate * 60:.1f} emails/min)")
+            self.target = target
+            self._cond.notify_all()
+
+    def decisions(self):
+        with self._cond:
+            return list(self._decisions)
+
+    def metrics(self):
+        if self.agent is not None:
+            rss = self.agent.memory_usage()
+            self._rss_mb = rss if rss is not None else self._rss_mb
+        with self._cond:
+            now = time.monotonic()
+            recent = [(at, ok, seconds) for at, ok, seconds in self._recent if now - at <= 60]
+            span = max(now - min(at - seconds for at, _, seconds in recent), 1e-6) if recent else 0.0
+            per_minute = sum(1 for _, ok, _ in recent if ok) * 60 / span if recent else 0.0
+            latencies = sorted(seconds for _, ok, seconds in recent if ok)
+            return {
+                "pool_size": self.max_tabs,
+                "pool_idle": len(self._idle),
+                "pool_leased": len(self._leased),
+                "pool_starting": self._opening + (0 if self._ready.is_set() else 1),
+                "pool_leases_total": self._leases_total,
+                "pool_lease_timeouts_total": self._lease_timeouts,
+                "tabs_target": self.target,
+                "tabs_open": len(self._idle) + len(self._leased),
+                "tabs_opened_total": self._tabs_opened,
+                "tabs_closed_total": self._tabs_closed,
+                "tabs_sent_total": self._sent,
+                "tabs_failed_total": self._failed,
+                "tabs_window_switches_total": self.channel.switches if self.channel else 0,
+                "tabs_driver_commands_total": self.channel.commands if self.channel else 0,
+                "tabs_send_seconds_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+                "tabs_emails_per_minute": round(per_minute, 2),
+                "tabs_browser_rss_mb": self._rss_mb or 0.0,
+                "tabs_emails_per_minute_per_gb": round(per_minute / (self._rss_mb / 1024), 2) if self._rss_mb else 0.0,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._idle.clear()
+            self._cond.notify_all()
+        if self.agent is not None:
+            self.agent.quit()
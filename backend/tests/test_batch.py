@@ -0,0 +1,78 @@
+# Batch templates and how BatchRunner copes with sessions that fail.
+
+from contextlib import contextmanager, nullcontext
+
+import pytest
+
+from batch import BatchRunner, MessageSender, render
+
+
+@pytest.mark.parametrize("template, expected", [
+    ("Hello {name}", "Hello Ada"),
+    ("Hello {name}, re {unknown}", "Hello Ada, re {unknown}"),
+    ("{} and {0}", "{} and {0}"),
+    ("<style>p {color: red}</style>", "<style>p {color: red}</style>"),
+    ("Total {amount:.2f} for {name}", "Total {amount:.2f} for Ada"),
+    ("{name.upper} {name!r}", "{name.upper} {name!r}"),
+    ("{count} items", "3 items"),
+])
+def test_render_only_fills_plain_placeholders(template, expected):
+    assert render(template, {"name": "Ada", "amount": 2.5, "count": 3}) == expected
+
+
+class FakeAgent:
+    last_compose = None
+
+    def __init__(self):
+        self.sent = []
+
+    def reset_compose(self):
+        pass
+
+    def compose_and_send_email(self, to, subject, body, cc=None, bcc=None, idempotency_key=None):
+        self.sent.append((to, subject, body))
+        return True
+
+
+@contextmanager
+def failing_session():
+    raise TimeoutError("No warm session free within 120s")
+    yield
+
+
+ROWS = [{"to": f"user{i}@example.com", "name": f"User {i}"} for i in range(4)]
+
+
+def test_batch_fails_when_no_session_starts():
+    logs = []
+    runner = BatchRunner(ROWS, "Hi {name}", "Body", log=logs.append)
+
+    with pytest.raises(RuntimeError, match="No batch session could start: No warm session free"):
+        runner.run([failing_session, failing_session])
+
+    assert len(logs) == 2 and all("could not start" in line for line in logs)
+
+
+def test_working_sessions_drain_the_batch_when_one_fails_to_start():
+    agent, logs = FakeAgent(), []
+    runner = BatchRunner(ROWS, "Hi {name}", "Body", log=logs.append)
+
+    summary = runner.run([failing_session, lambda: nullcontext(agent)])
+
+    assert summary["sent"] == 4 and summary["failed"] == 0
+    assert sorted(subject for _, subject, _ in agent.sent) == [f"Hi User {i}" for i in range(4)]
+    assert logs == ["❌ Batch session could not start: No warm session free within 120s"]
+
+
+def test_message_sender_hands_every_row_over_with_its_idempotency_key():
+    sent = []
+    sender = MessageSender(lambda message: sent.append(message) or message["to"] != "user2@example.com", "shard")
+    runner = BatchRunner(ROWS, "Hi {name}", "Body", batch_id="b1", log=lambda text: None)
+
+    summary = runner.run([lambda: nullcontext(sender)])
+
+    assert summary["sent"] == 3 and summary["failed"] == 1
+    assert [m["idempotency_key"] for m in sent] == [f"batch:b1:{i}" for i in range(4)]
+    assert sent[0] == {"to": "user0@example.com", "cc": None, "bcc": None, "subject": "Hi User 0", "body": "Body",
+                       "idempotency_key": "batch:b1:0"}
+    assert runner.checkpoint.results[2]["compose"] == "shard"
@@ -0,0 +1,74 @@
+# Recipient chips on the CDP driver backend: the comma that commits a chip has to
+# reach the page as a key press, which Input.insertText alone never produces.
+# The fixture test needs Chrome; the rest runs wherever selenium imports.
+
+import tempfile
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from driver_backends import CdpBackend  # noqa: E402
+from text_entry import get_text_entry  # noqa: E402
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, method, params=None, timeout=None):
+        self.sent.append((method, params))
+        if method == "Runtime.evaluate":
+            return {"result": {"value": True}}
+        return {}
+
+
+def typed_with(strategy, text):
+    backend = CdpBackend(driver=None)
+    backend.connection = RecordingConnection()
+    backend.type_text(None, text, get_text_entry(strategy), selector="//textarea[@name='to']")
+    return [(method, params) for method, params in backend.connection.sent if method != "Runtime.evaluate"]
+
+
+def test_key_event_strategy_presses_each_comma():
+    sent = typed_with("bulk", "a@example.com,b@example.com,")
+
+    assert [method for method, _ in sent] == ["Input.insertText", "Input.dispatchKeyEvent", "Input.dispatchKeyEvent",
+                                              "Input.insertText", "Input.dispatchKeyEvent", "Input.dispatchKeyEvent"]
+    assert sent[0][1] == {"text": "a@example.com"} and sent[3][1] == {"text": "b@example.com"}
+    assert sent[1][1]["type"] == "keyDown" and sent[1][1]["key"] == "," and sent[2][1]["type"] == "keyUp"
+
+
+def test_insert_text_strategy_stays_one_call():
+    assert typed_with("insert_text", "a,b") == [("Input.insertText", {"text": "a,b"})]
+
+
+def test_fixture_commits_chips_over_cdp():
+    pytest.importorskip("flask")
+    pytest.importorskip("undetected_chromedriver")
+    from browser_agent import BrowserAgent
+    from fixture_server import create_app, serve_in_thread
+    from recipients import RecipientCache
+
+    app = create_app(latency=20)
+    server, base_url = serve_in_thread(app)
+    try:
+        try:
+            agent = BrowserAgent("test@example.com", "fixture-password", screenshot_dir=tempfile.mkdtemp(),
+                                 emit_callback=lambda text: None, pacing="fast", backend="cdp",
+                                 login_url=f"{base_url}/signin.html", mail_url=f"{base_url}/mail.html",
+                                 text_entry="bulk", recipient_cache=RecipientCache())
+        except Exception as e:
+            pytest.skip(f"Chrome unavailable: {e}")
+        try:
+            assert agent.backend.name == "cdp"
+            assert agent.login_to_gmail(restore=False)
+            assert agent.compose_and_send_email(["new1@example.com", "new2@example.com"], "CDP chips", "Hi",
+                                                cc="new3@example.com")
+        finally:
+            agent.quit()
+    finally:
+        server.shutdown()
+
+    sent = app.config["SENT"]
+    assert [(m["to"], m["cc"]) for m in sent] == [(["new1@example.com", "new2@example.com"], ["new3@example.com"])]
@@ -0,0 +1,83 @@
+# build_compose_url: what goes into a prefilled compose URL and when the message
+# has to take the interactive flow instead.
+
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from compose_url import build_compose_url, compose_base
+
+
+def query_of(url):
+    return {key: values[0] for key, values in parse_qs(urlparse(url).query, keep_blank_values=True).items()}
+
+
+def test_gmail_url_points_at_mail_and_round_trips_every_field():
+    url, reason = build_compose_url("https://mail.google.com", "a@example.com, b@example.com",
+                                    "Leave & travel: 50% off?", "Hi +all,\n\nSee you #1 / ünïcode",
+                                    cc="c@example.com", bcc="d@example.com")
+
+    assert reason is None
+    assert url.startswith("https://mail.google.com/mail/?")
+    assert query_of(url) == {
+        "view": "cm",
+        "to": "a@example.com,b@example.com",
+        "cc": "c@example.com",
+        "bcc": "d@example.com",
+        "su": "Leave & travel: 50% off?",
+        "body": "Hi +all,\n\nSee you #1 / ünïcode",
+    }
+
+
+def test_reserved_characters_are_percent_encoded():
+    url, _ = build_compose_url("https://mail.google.com", "a@example.com", "a&b=c", "1 + 1 # two")
+
+    query = urlparse(url).query
+    assert "su=a%26b%3Dc" in query
+    assert "body=1%20%2B%201%20%23%20two" in query
+    assert "+" not in query and " " not in query
+
+
+def test_fixture_page_keeps_its_own_path():
+    assert compose_base("http://127.0.0.1:5000/mail.html?latency=50") == "http://127.0.0.1:5000/mail.html"
+    url, _ = build_compose_url("http://127.0.0.1:5000/mail.html", "a@example.com", "Hi", "Body")
+    assert url.startswith("http://127.0.0.1:5000/mail.html?view=cm&")
+
+
+def test_crlf_line_breaks_become_plain_newlines():
+    url, _ = build_compose_url("https://mail.google.com", "a@example.com", "Hi", "one\r\ntwo\r\n\r\nthree")
+
+    assert "%0D" not in url
+    assert query_of(url)["body"] == "one\ntwo\n\nthree"
+
+
+def test_empty_fields_are_left_out_and_no_recipient_falls_back():
+    url, _ = build_compose_url("https://mail.google.com", "a@example.com", None, None, cc="", bcc=None)
+    assert query_of(url) == {"view": "cm", "to": "a@example.com", "su": "", "body": ""}
+
+    assert build_compose_url("https://mail.google.com", "", "Hi", "Body") == (None, "no_recipient")
+
+
+def test_too_long_falls_back_at_the_limit():
+    url, reason = build_compose_url("https://mail.google.com", "a@example.com", "Hi", "Body")
+    assert build_compose_url("https://mail.google.com", "a@example.com", "Hi", "Body", max_length=len(url)) == (url, None)
+    assert build_compose_url("https://mail.google.com", "a@example.com", "Hi", "Body", max_length=len(url) - 1) \
+        == (None, "too_long")
+    # Encoding counts: three bytes of UTF-8 each take nine characters in the URL
+    assert build_compose_url("https://mail.google.com", "a@example.com", "Hi", "€" * 250) == (None, "too_long")
+
+
+def test_too_long_default_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv("COMPOSE_URL_MAX_LENGTH", "80")
+    assert build_compose_url("https://mail.google.com", "a@example.com", "Hi", "x" * 40) == (None, "too_long")
+
+
+@pytest.mark.parametrize("body", ["<b>Bold</b> text", "Line<br>break", "<p class='x'>Para</p>", "</div>"])
+def test_html_bodies_need_the_interactive_editor(body):
+    assert build_compose_url("https://mail.google.com", "a@example.com", "Hi", body) == (None, "rich_text")
+
+
+@pytest.mark.parametrize("body", ["1 < 2 and 3 > 2", "x<3", "a -> b"])
+def test_angle_brackets_in_plain_text_are_not_rich_text(body):
+    url, reason = build_compose_url("https://mail.google.com", "a@example.com", "Hi", body)
+    assert reason is None and query_of(url)["body"] == body
@@ -0,0 +1,39 @@
+# GenerationService keeps answering when the intent index misbehaves.
+
+from generation_service import ERROR_DRAFT_SUBJECT, GenerationService
+
+
+class BrokenIndex:
+    def lookup(self, intent):
+        raise RuntimeError("database is locked")
+
+    def add(self, intent, draft):
+        raise RuntimeError("database is locked")
+
+    def stats(self):
+        return {}
+
+
+def test_index_errors_fall_back_to_the_model():
+    calls = []
+
+    def request_fn(intent, model, timeout=None):
+        calls.append(intent)
+        return {"subject": "Leave", "body": f"Draft for {intent}"}
+
+    service = GenerationService(request_fn=request_fn, model="fake", intent_index=BrokenIndex())
+
+    assert service.generate("sick leave tomorrow") == {"subject": "Leave", "body": "Draft for sick leave tomorrow"}
+    assert calls == ["sick leave tomorrow"]
+    assert service.metrics()["llm_errors_total"] == 0
+
+
+def test_model_errors_become_an_error_draft():
+    def request_fn(intent, model, timeout=None):
+        raise ConnectionError("model unreachable")
+
+    service = GenerationService(request_fn=request_fn, model="fake", retries=0)
+
+    draft = service.generate("sick leave tomorrow")
+
+    assert draft["subject"] == ERROR_DRAFT_SUBJECT and "model unreachable" in draft["body"]
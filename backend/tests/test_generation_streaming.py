@@ -0,0 +1,132 @@
+# GenerationService streaming against a local fake chat-completions server that
+# streams the draft as server-sent events, a few characters per token.
+
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from generation_service import GenerationService
+
+
+def draft_for(intent):
+    return {"subject": f"Re: {intent}", "body": f"Hello,\n\nThis is a streamed draft for: {intent}.\n\nBest regards"}
+
+
+class FakeModelHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        content = json.dumps(draft_for(payload["intent"]))
+        if not payload.get("stream"):
+            server.completed_at.append(time.monotonic())
+            body = json.dumps({"choices": [{"message": {"content": content}}]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for i in range(0, len(content), 4):
+                time.sleep(server.token_latency)
+                chunk = {"choices": [{"delta": {"content": content[i:i + 4]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def fake_model():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeModelHandler)
+    server.daemon_threads = True
+    server.token_latency = 0.005
+    server.completed_at = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def model_client(server):
+    """request_fn and stream_fn speaking to the fake server, plus when each stream was closed"""
+    url = f"http://127.0.0.1:{server.server_port}/chat/completions"
+    closed_at = []
+
+    def post(intent, stream, timeout):
+        data = json.dumps({"intent": intent, "stream": stream}).encode("utf-8")
+        request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+        return urllib.request.urlopen(request, timeout=timeout)
+
+    def request_fn(intent, model, timeout=None):
+        with post(intent, False, timeout) as response:
+            return json.loads(json.load(response)["choices"][0]["message"]["content"])
+
+    def stream_fn(intent, model, timeout=None):
+        response = post(intent, True, timeout)
+        try:
+            for line in response:
+                line = line.decode("utf-8").strip()
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                delta = json.loads(line[6:])["choices"][0]["delta"]
+                if delta.get("content"):
+                    yield delta["content"]
+        finally:
+            response.close()
+            closed_at.append(time.monotonic())
+
+    return request_fn, stream_fn, closed_at
+
+
+def test_partials_arrive_in_order_and_end_with_the_final_draft(fake_model):
+    request_fn, stream_fn, _ = model_client(fake_model)
+    service = GenerationService(request_fn=request_fn, stream_fn=stream_fn, model="fake", partial_interval=0)
+    partials = []
+
+    draft = service.submit("send a leave email", on_partial=partials.append).result(10)
+
+    assert draft == draft_for("send a leave email")
+    assert len(partials) > 5
+    for before, after in zip(partials, partials[1:]):
+        assert after["subject"].startswith(before["subject"])
+        assert after["body"].startswith(before["body"])
+    for partial in partials:
+        assert draft["subject"].startswith(partial["subject"])
+        assert draft["body"].startswith(partial["body"])
+    metrics = service.metrics()
+    assert metrics["llm_upstream_calls_total"] == 1
+    assert fake_model.completed_at == []
+
+
+def test_stream_timeout_stops_partials_and_falls_back_to_one_plain_call(fake_model):
+    fake_model.token_latency = 0.05   # ~25 tokens: well past the timeout
+    request_fn, stream_fn, closed_at = model_client(fake_model)
+    service = GenerationService(request_fn=request_fn, stream_fn=stream_fn, model="fake", timeout=0.4,
+                                retries=0, max_concurrency=1, partial_interval=0)
+    partials = []
+
+    draft = service.submit("request leave on Friday", on_partial=partials.append).result(10)
+
+    assert draft == draft_for("request leave on Friday")
+    seen = len(partials)
+    assert seen > 0
+    time.sleep(0.3)
+    assert len(partials) == seen, "partials kept arriving after the stream timed out"
+    # The stream was closed before the fallback call went out
+    assert len(closed_at) == 1 and len(fake_model.completed_at) == 1
+    assert closed_at[0] <= fake_model.completed_at[0]
+    metrics = service.metrics()
+    assert metrics["llm_timeouts_total"] == 1
+    assert metrics["llm_upstream_calls_total"] == 2
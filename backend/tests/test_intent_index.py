@@ -0,0 +1,72 @@
+# IntentIndex: which model drafts get indexed and which templates may answer an intent.
+
+import os
+
+import pytest
+
+from intent_index import IntentIndex
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "intent_templates.json")
+
+
+@pytest.fixture
+def index(tmp_path):
+    return IntentIndex(str(tmp_path / "intent_index.db"))
+
+
+def test_draft_with_an_unreplaced_date_is_not_indexed(index):
+    index.add("sick leave tomorrow for Alice",
+              {"subject": "Sick leave on 19 October", "body": "Dear Alice,\n\nI am unwell on 19 October.\n"})
+
+    assert index.lookup("sick leave Friday for Bob") is None
+    stats = index.stats()
+    assert stats["intent_index_entries"] == 0
+    assert stats["intent_index_unindexed_total"] == 1
+
+
+def test_draft_that_leaves_a_slot_out_is_not_indexed(index):
+    # The date became a placeholder but the name never appears: fine for Alice, not for Bob
+    index.add("sick leave tomorrow for Alice", {"subject": "Sick leave tomorrow", "body": "Dear Manager,\n\nUnwell.\n"})
+
+    assert index.lookup("sick leave on Friday for Bob") is None
+    assert index.stats()["intent_index_unindexed_total"] == 1
+
+
+def test_draft_with_a_leftover_date_next_to_the_slot_is_not_indexed(index):
+    index.add("sick leave tomorrow", {"subject": "Sick leave tomorrow",
+                                      "body": "I will be out tomorrow and back on Monday.\n"})
+
+    assert len(index) == 0
+
+
+def test_templated_draft_is_filled_with_the_new_slot_values(index):
+    index.add("sick leave tomorrow for Alice",
+              {"subject": "Sick leave tomorrow", "body": "Dear Alice,\n\nTomorrow I will be out sick.\n"})
+
+    draft = index.lookup("sick leave on Friday for Bob")
+
+    assert draft == {"subject": "Sick leave Friday", "body": "Dear Bob,\n\nFriday I will be out sick.\n"}
+    assert index.stats()["intent_index_hits_total"] == 1
+
+
+def test_templates_only_answer_intents_with_the_same_slots(tmp_path):
+    index = IntentIndex(str(tmp_path / "intent_index.db"), templates_path=TEMPLATES)
+
+    named = index.lookup("sick leave tomorrow to Sarah")
+    assert named["subject"] == "Sick Leave for tomorrow"
+    assert named["body"].startswith("Dear Sarah,")
+    assert "Manager" in index.lookup("sick leave tomorrow")["body"]
+    # "work from home {date}" has no {name} to put Sarah in, so this one goes to the model
+    assert index.lookup("work from home with Sarah next week") is None
+
+
+def test_stale_rows_from_an_older_index_are_dropped_on_load(tmp_path):
+    path = str(tmp_path / "intent_index.db")
+    index = IntentIndex(path)
+    index._conn.execute("INSERT INTO intent_index VALUES (?, ?, ?, ?, 0, ?, ?)",
+                        ("sick leave {date}", "sick leave tomorrow", "Sick leave on 19 October", "Out.", 1e12, 1e12))
+
+    reloaded = IntentIndex(path)
+
+    assert len(reloaded) == 0
+    assert reloaded._conn.execute("SELECT COUNT(*) FROM intent_index").fetchone()[0] == 0
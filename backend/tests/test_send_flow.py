@@ -0,0 +1,130 @@
+# SendFlow picking up a send whose previous owner died mid-flight, on a fake agent
+# that keeps Gmail's Sent and Drafts in memory.
+
+import pytest
+
+from send_flow import RetryPolicy, SendCheckpoints, SendFlow, new_owner, owner_alive
+
+KEY = "shard:job-1"
+RECIPIENTS = {"to": ["to@example.com"]}
+DEAD_OWNER = "999999999:previous-worker"
+
+
+class FakeTrace:
+    def retry(self):
+        pass
+
+
+class FakeDriver:
+    current_url = "https://mail.google.com/mail/u/0/"
+
+
+class FakeAgent:
+    mail_url = "https://mail.google.com"
+
+    def __init__(self, sent=False, draft=False):
+        self.sent = sent            # already in Sent
+        self.draft = draft          # waiting in Drafts
+        self.compose = False
+        self.clicks = 0
+        self.last_rejected = []
+        self.trace = FakeTrace()
+        self.driver = FakeDriver()
+
+    def open_inbox(self):
+        return True
+
+    def open_compose(self):
+        self.compose = True
+        return True
+
+    def compose_open(self):
+        return self.compose
+
+    def enter_recipients(self, recipients):
+        return True
+
+    def fill_subject(self, subject):
+        return True
+
+    def fill_body(self, body):
+        return True
+
+    def click_send(self):
+        self.clicks += 1
+        self.compose, self.draft, self.sent = False, False, True
+        return True
+
+    def confirm_sent(self):
+        return True
+
+    def find_message(self, folder, recipients, subject, timeout=5):
+        return self.sent if folder == "sent" else self.draft
+
+    def open_draft(self, recipients, subject, body, timeout=5):
+        if not self.draft:
+            return None
+        self.compose = True
+        return {"recipients": True, "subject": True, "body": True}
+
+    def reset_compose(self):
+        self.compose = False
+
+    def relogin(self):
+        return True
+
+
+@pytest.fixture
+def checkpoints(tmp_path):
+    return SendCheckpoints(str(tmp_path / "send_checkpoints.db"))
+
+
+def flow_for(agent, checkpoints):
+    return SendFlow(agent, RECIPIENTS, "Subject", "Body", key=KEY, checkpoints=checkpoints,
+                    policy=RetryPolicy(attempts=2, base=0, cap=0), resumable=True, log=lambda text: None)
+
+
+def test_owner_ids_name_a_running_process():
+    assert owner_alive(new_owner())
+    assert not owner_alive(DEAD_OWNER)
+    assert owner_alive("legacy-owner-without-pid")
+
+
+def test_dead_owners_send_found_in_sent_is_not_resent(checkpoints):
+    checkpoints.save(KEY, DEAD_OWNER, ["open_gmail", "open_compose", "fill_recipient", "fill_subject",
+                                       "fill_body", "send"], "sending")
+    agent = FakeAgent(sent=True)
+
+    assert flow_for(agent, checkpoints).run() is True
+
+    assert agent.clicks == 0
+    assert checkpoints.get(KEY)["state"] == "sent"
+
+
+def test_dead_owners_unsent_draft_is_resumed_and_sent_once(checkpoints):
+    checkpoints.save(KEY, DEAD_OWNER, ["open_gmail", "open_compose", "fill_recipient"], "sending")
+    agent = FakeAgent(draft=True)
+
+    assert flow_for(agent, checkpoints).run() is True
+
+    assert agent.clicks == 1
+    assert checkpoints.get(KEY)["state"] == "sent"
+    assert checkpoints.stats()["send_flow_drafts_reopened"] == 1
+
+
+def test_live_owners_recent_claim_is_left_alone(checkpoints):
+    checkpoints.save(KEY, new_owner(), ["open_gmail", "open_compose", "send"], "sending")
+    agent = FakeAgent(draft=True)
+
+    assert flow_for(agent, checkpoints).run() is False
+
+    assert agent.clicks == 0
+    assert checkpoints.get(KEY)["state"] == "sending"
+
+
+def test_claim_is_free_once_its_owner_is_gone(checkpoints):
+    checkpoints.save(KEY, DEAD_OWNER, [], "sending")
+    assert checkpoints.claim(KEY, new_owner(), [])
+
+    checkpoints.save(KEY, new_owner(), [], "sending")
+    assert not checkpoints.claim(KEY, new_owner(), [])
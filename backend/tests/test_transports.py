@@ -0,0 +1,157 @@
+# SmtpTransport and TransportRouter against the local SMTP sink (smtp_sink.py).
+
+import pytest
+
+import smtp_sink
+from accounts import Account
+from transports import BrowserTransport, SmtpTransport, TransportError, TransportRouter
+
+SENDER = "sender@example.com"
+
+
+@pytest.fixture
+def serve_sink():
+    sinks = []
+
+    def serve(**options):
+        sink = smtp_sink.serve_in_thread(**options)
+        sinks.append(sink)
+        return sink
+
+    yield serve
+    for sink in sinks:
+        sink.shutdown()
+        sink.server_close()
+
+
+def transport_for(sink, **options):
+    options.setdefault("pool_size", 1)
+    return SmtpTransport(SENDER, "secret", host="127.0.0.1", port=sink.server_address[1], security="none", **options)
+
+
+def message(i, **fields):
+    return {"sender": SENDER, "to": [f"to{i}@example.com"], "subject": f"Message {i}",
+            "body": f"Hello,\n.leading dot\nbody {i}\n", **fields}
+
+
+@pytest.mark.parametrize("pipelining, pipelined", [("auto", 5), ("1", 5), ("0", 0)])
+def test_pipelined_and_one_by_one_deliver_the_same_messages(serve_sink, pipelining, pipelined):
+    sink = serve_sink()
+    transport = transport_for(sink, pipelining=pipelining)
+    try:
+        results = transport.send_many([message(i, cc=f"cc{i}@example.com", bcc=f"bcc{i}@example.com")
+                                       for i in range(5)])
+    finally:
+        transport.close()
+
+    assert all(result["ok"] for result in results)
+    assert transport.stats()["smtp_pipelined_total"] == pipelined
+    assert sink.stats()["connections"] == 1
+    by_subject = {m["data"].split(b"Subject: ")[1].split(b"\r\n")[0].decode(): m for m in sink.messages}
+    for i in range(5):
+        delivered = by_subject[f"Message {i}"]
+        assert delivered["recipients"] == [f"to{i}@example.com", f"cc{i}@example.com", f"bcc{i}@example.com"]
+        assert b"Bcc" not in delivered["data"]
+        assert b"\r\n.leading dot\r\n" in delivered["data"]
+
+
+@pytest.mark.parametrize("pipelining", ["1", "0"])
+def test_reconnects_once_the_server_hangs_up(serve_sink, pipelining):
+    sink = serve_sink(drop_after=2)
+    transport = transport_for(sink, pipelining=pipelining)
+    try:
+        for i in range(5):
+            assert transport.send_message(SENDER, f"to{i}@example.com", f"Message {i}", "Hi") == {}
+    finally:
+        transport.close()
+
+    stats = transport.stats()
+    assert stats["smtp_sent_total"] == 5
+    assert stats["smtp_reconnects_total"] == 2
+    assert stats["smtp_connections_opened_total"] == 3
+    assert len(sink.messages) == 5
+
+
+@pytest.mark.parametrize("pipelining", ["1", "0"])
+def test_connection_lost_after_data_is_not_retried(serve_sink, pipelining):
+    sink = serve_sink(drop_in_data=True)
+    transport = transport_for(sink, pipelining=pipelining)
+    try:
+        with pytest.raises(TransportError, match="handed over"):
+            transport.send_message(SENDER, "to@example.com", "Once", "Hi")
+    finally:
+        transport.close()
+
+    assert len(sink.messages) == 1
+    assert sink.stats()["connections"] == 1
+    assert transport.stats()["smtp_reconnects_total"] == 0
+
+
+def test_refused_recipients_are_reported(serve_sink):
+    sink = serve_sink(rcpt_limit=1)
+    transport = transport_for(sink, pipelining="0")
+    try:
+        refused = transport.send_message(SENDER, ["a@example.com", "b@example.com"], "Hi", "Hi")
+    finally:
+        transport.close()
+
+    assert list(refused) == ["b@example.com"]
+    assert sink.messages[0]["recipients"] == ["a@example.com"]
+
+
+@pytest.fixture
+def smtp_env(monkeypatch):
+    def point_at(sink):
+        monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+        monkeypatch.setenv("SMTP_PORT", str(sink.server_address[1]))
+        monkeypatch.setenv("SMTP_SECURITY", "none")
+    return point_at
+
+
+def browser_recorder():
+    sent = []
+
+    def deliver(message, emit_fn, **context):
+        sent.append(message)
+        return True
+
+    return BrowserTransport(deliver), sent
+
+
+def test_refused_login_falls_back_to_the_browser(serve_sink, smtp_env):
+    sink = serve_sink(password="app-password")
+    smtp_env(sink)
+    browser, browser_sent = browser_recorder()
+    router = TransportRouter(browser, [Account(SENDER, "wrong", transport="smtp")], auth_cooldown=60)
+    events = []
+    try:
+        assert router.send(message(1), events.append)
+        # Within the cooldown the account goes straight to the browser
+        assert router.route(SENDER) is browser
+        assert router.send(message(2), events.append)
+    finally:
+        router.close()
+
+    assert [m["subject"] for m in browser_sent] == ["Message 1", "Message 2"]
+    # One refused login (smtplib tries each AUTH mechanism on it), not one per message
+    assert sink.messages == [] and sink.stats()["connections"] == 1 and sink.stats()["auth_failures"] > 0
+    assert any("browser instead" in event for event in events)
+    stats = router.stats()
+    assert stats["transport_auth_fallbacks_total"] == 1
+    assert stats["transport_browser_sent_total"] == 2
+    assert stats["transport_smtp_auth_blocked"] == 1
+
+
+def test_account_password_comes_before_the_global_one(serve_sink, smtp_env, monkeypatch):
+    sink = serve_sink(password="account-password")
+    smtp_env(sink)
+    monkeypatch.setenv("SMTP_PASSWORD", "global-password")
+    browser, browser_sent = browser_recorder()
+    router = TransportRouter(browser, [Account(SENDER, "account-password", transport="smtp")])
+    try:
+        assert router.send(message(1), lambda text: None)
+    finally:
+        router.close()
+
+    assert browser_sent == [] and len(sink.messages) == 1
+    assert router.stats()["transport_smtp_sent_total"] == 1
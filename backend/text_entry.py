@@ -0,0 +1,133 @@
+# Text entry strategies for BrowserAgent
+# Per-character typing costs one WebDriver round-trip (plus a delay) per
+# character; these strategies trade realism for speed per field.
+
+import os
+import random
+import time
+
+
+class TextEntryStrategy:
+    name = "base"
+    key_events = False  # True when the page sees real keydowns (needed for chip-committing keys like ",")
+
+    def enter(self, driver, element, text):
+        raise NotImplementedError
+
+
+class PerCharacterTyping(TextEntryStrategy):
+    """One send_keys per character with the pacing policy's keystroke delay"""
+    name = "keys"
+    key_events = True
+
+    def __init__(self, pacing=None):
+        self.pacing = pacing
+
+    def enter(self, driver, element, text):
+        for char in text:
+            element.send_keys(char)
+            delay = self.pacing.keystroke_delay() if self.pacing else 0
+            if delay:
+                time.sleep(delay)
+
+
+class BulkSendKeys(TextEntryStrategy):
+    """The whole string in a single send_keys call"""
+    name = "bulk"
+    key_events = True
+
+    def enter(self, driver, element, text):
+        element.send_keys(text)
+
+
+class ChunkedTyping(TextEntryStrategy):
+    """send_keys in small chunks with a configurable cadence between them"""
+    name = "chunked"
+    key_events = True
+
+    def __init__(self, chunk_size=12, cadence=(0.05, 0.2)):
+        self.chunk_size = chunk_size
+        self.cadence = cadence
+
+    def enter(self, driver, element, text):
+        for i in range(0, len(text), self.chunk_size):
+            element.send_keys(text[i:i + self.chunk_size])
+            if i + self.chunk_size < len(text):
+                time.sleep(random.uniform(*self.cadence))
+
+
+class InsertText(TextEntryStrategy):
+    """CDP Input.insertText into the focused element, like an IME commit or paste"""
+    name = "insert_text"
+
+    def enter(self, driver, element, text):
+        driver.execute_script("arguments[0].focus();", element)
+        try:
+            driver.execute_cdp_cmd("Input.insertText", {"text": text})
+        except Exception:
+            # Not a Chromium driver: fall back to a single send_keys
+            element.send_keys(text)
+
+
+_FILL_JS = """
+const el = arguments[0], text = arguments[1];
+el.focus();
+if (el.isContentEditable) {
+  el.innerText = text;
+} else {
+  const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+  Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, text);
+}
+el.dispatchEvent(new InputEvent('input', {bubbles: true, inputType: 'insertText', data: text}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+
+class DirectFill(TextEntryStrategy):
+    """Set value/innerText directly and dispatch input + change events"""
+    name = "fill"
+
+    def enter(self, driver, element, text):
+        driver.execute_script(_FILL_JS, element, text)
+
+
+TEXT_ENTRY_STRATEGIES = {
+    PerCharacterTyping.name: PerCharacterTyping,
+    BulkSendKeys.name: BulkSendKeys,
+    ChunkedTyping.name: ChunkedTyping,
+    InsertText.name: InsertText,
+    DirectFill.name: DirectFill,
+}
+
+
+def get_text_entry(name, pacing=None):
+    if isinstance(name, TextEntryStrategy):
+        return name
+    if name not in TEXT_ENTRY_STRATEGIES:
+        raise ValueError(f"Unknown text entry strategy '{name}', expected one of {sorted(TEXT_ENTRY_STRATEGIES)}")
+    if name == PerCharacterTyping.name:
+        return PerCharacterTyping(pacing)
+    return TEXT_ENTRY_STRATEGIES[name]()
+
+
+def parse_text_entry(spec):
+    """Parse "insert_text" or "default=bulk,body=insert_text" into a field -> name map"""
+    if not spec:
+        return {}
+    if isinstance(spec, dict):
+        return dict(spec)
+    if "=" not in spec:
+        return {"default": spec.strip()}
+    mapping = {}
+    for part in spec.split(","):
+        field, _, name = part.partition("=")
+        mapping[field.strip()] = name.strip()
+    return mapping
+
+
+def build_text_entry(spec=None, pacing=None):
+    """Resolve per-field strategies: pacing defaults, then TEXT_ENTRY env, then `spec`"""
+    mapping = dict(getattr(pacing, "text_entry", None) or {"default": "bulk"})
+    mapping.update(parse_text_entry(os.getenv("TEXT_ENTRY")))
+    mapping.update(parse_text_entry(spec))
+    return {field: get_text_entry(name, pacing) for field, name in mapping.items()}
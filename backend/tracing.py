@@ -0,0 +1,157 @@
+# Per-step tracing for the browser flows
+# Every logical step of login and send becomes a span (duration, selector used,
+# retries, outcome). Spans are aggregated into per-step histograms for the
+# /metrics endpoint and optionally written as JSON lines to TRACE_LOG.
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from metrics import Histogram, prometheus_lines
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "operation", "duration", "outcome", "retries", "attrs", "timestamp")
+
+    def __init__(self, name, trace_id, operation, duration, outcome="ok", retries=0, attrs=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.operation = operation
+        self.duration = duration
+        self.outcome = outcome
+        self.retries = retries
+        self.attrs = attrs or {}
+        self.timestamp = time.time()
+
+    def to_dict(self):
+        return {
+            "ts": round(self.timestamp, 3),
+            "trace_id": self.trace_id,
+            "operation": self.operation,
+            "span": self.name,
+            "duration_ms": round(self.duration * 1000, 1),
+            "outcome": self.outcome,
+            "retries": self.retries,
+            **self.attrs,
+        }
+
+
+class Trace:
+    """One run of an operation (login, send_email); steps are recorded as they complete"""
+
+    def __init__(self, tracer, operation, **attrs):
+        self.tracer = tracer
+        self.operation = operation
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attrs = attrs
+        self.steps = []
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._pending = {}
+        self._retries = 0
+
+    def note(self, **attrs):
+        """Attach attributes (e.g. selector) to the step currently in progress"""
+        self._pending.update(attrs)
+
+    def retry(self, count=1):
+        self._retries += count
+
+    def step(self, name, outcome="ok"):
+        """Close the step in progress under `name`; returns its duration"""
+        now = time.perf_counter()
+        duration = now - self._last
+        self._last = now
+        self.tracer.record(Span(name, self.trace_id, self.operation, duration, outcome, self._retries, self._pending))
+        self.steps.append(name)
+        self._pending, self._retries = {}, 0
+        return duration
+
+    def finish(self, ok, expected_steps=(), **attrs):
+        """Record the whole operation; on failure the first missing step is recorded as failed"""
+        if not ok:
+            missing = [step for step in expected_steps if step not in self.steps]
+            if missing:
+                self.step(missing[0], outcome="failed")
+        duration = time.perf_counter() - self.started
+        self.tracer.record(Span(self.operation, self.trace_id, self.operation, duration,
+                                "ok" if ok else "failed", 0, {**self.attrs, **attrs}), operation=True)
+        return duration
+
+
+class Tracer:
+    def __init__(self, log_path=None, keep=500):
+        self.log_path = log_path
+        self.recent = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._steps = {}        # (operation, step) -> Histogram
+        self._operations = {}   # operation -> Histogram
+        self._outcomes = {}     # (operation, step, outcome) -> count
+        self._retries = {}      # (operation, step) -> count
+        self._log = open(log_path, "a", buffering=1) if log_path else None
+
+    def start(self, operation, **attrs):
+        return Trace(self, operation, **attrs)
+
+    def record(self, span, operation=False):
+        event = span.to_dict()
+        with self._lock:
+            histograms = self._operations if operation else self._steps
+            key = span.operation if operation else (span.operation, span.name)
+            if key not in histograms:
+                histograms[key] = Histogram()
+            histogram = histograms[key]
+            outcome_key = (span.operation, "" if operation else span.name, span.outcome)
+            self._outcomes[outcome_key] = self._outcomes.get(outcome_key, 0) + 1
+            if span.retries:
+                self._retries[(span.operation, span.name)] = self._retries.get((span.operation, span.name), 0) + span.retries
+            self.recent.append(event)
+            if self._log:
+                self._log.write(json.dumps(event) + "\n")
+        histogram.observe(span.duration)
+
+    def events(self, limit=100):
+        with self._lock:
+            return list(self.recent)[-limit:]
+
+    def prometheus(self):
+        with self._lock:
+            steps = dict(self._steps)
+            operations = dict(self._operations)
+            outcomes = dict(self._outcomes)
+            retries = dict(self._retries)
+        lines = []
+        if operations:
+            lines.append("# TYPE agent_operation_duration_seconds histogram")
+            for operation, histogram in sorted(operations.items()):
+                lines += prometheus_lines("agent_operation_duration_seconds", histogram.snapshot(), {"operation": operation})
+        if steps:
+            lines.append("# TYPE agent_step_duration_seconds histogram")
+            for (operation, step), histogram in sorted(steps.items()):
+                lines += prometheus_lines("agent_step_duration_seconds", histogram.snapshot(),
+                                          {"operation": operation, "step": step})
+        if outcomes:
+            lines.append("# TYPE agent_step_outcomes_total counter")
+            for (operation, step, outcome), count in sorted(outcomes.items()):
+                lines += prometheus_lines("agent_step_outcomes_total", count,
+                                          {"operation": operation, "step": step, "outcome": outcome})
+        if retries:
+            lines.append("# TYPE agent_step_retries_total counter")
+            for (operation, step), count in sorted(retries.items()):
+                lines += prometheus_lines("agent_step_retries_total", count, {"operation": operation, "step": step})
+        return lines
+
+
+_default_tracer = None
+_default_lock = threading.Lock()
+
+
+def default_tracer():
+    global _default_tracer
+    with _default_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer(log_path=os.getenv("TRACE_LOG") or None)
+        return _default_tracer
@@ -0,0 +1,440 @@
+# Send transports
+# "browser" drives the Gmail web UI through BrowserAgent (seconds and a Chrome
+# per send); "smtp" hands the message to the account's SMTP server over a small
+# pool of persistent, logged-in connections, pipelining MAIL/RCPT/DATA when the
+# server allows it. TransportRouter picks one per account (SEND_TRANSPORT, or a
+# "transport" entry in ACCOUNTS_FILE) and falls back to the browser for an
+# account whose SMTP login is refused.
+
+import os
+import re
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+from recipients import normalize_recipients
+
+SEND_TRANSPORTS = ("browser", "smtp")
+SMTP_SECURITY = ("starttls", "ssl", "none")
+
+_LEADING_DOT_RE = re.compile(rb"^\.", re.MULTILINE)
+_BARE_EOL_RE = re.compile(rb"\r\n|\r|\n")
+
+
+class TransportError(Exception):
+    """The transport could not deliver the message"""
+
+
+class TransportAuthError(TransportError):
+    """The server refused the account's credentials"""
+
+
+def get_send_transport(name=None):
+    """Resolve `name` or the SEND_TRANSPORT env var (default "browser")"""
+    name = (name or os.getenv("SEND_TRANSPORT") or "browser").lower()
+    if name not in SEND_TRANSPORTS:
+        raise ValueError(f"Unknown send transport '{name}', expected one of {list(SEND_TRANSPORTS)}")
+    return name
+
+
+def build_message(sender, to, subject, body, cc=None, bcc=None):
+    """(EmailMessage, envelope recipients); Bcc only ever goes in the envelope"""
+    recipients = normalize_recipients(to, cc, bcc)
+    if not recipients.get("to"):
+        raise TransportError("No recipient")
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = ", ".join(recipients["to"])
+    if recipients.get("cc"):
+        message["Cc"] = ", ".join(recipients["cc"])
+    message["Subject"] = subject or ""
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid(domain=sender.rpartition("@")[2] or None)
+    message.set_content(body or "")
+    envelope = [address for addresses in recipients.values() for address in addresses]
+    return message, envelope
+
+
+def smtp_data(message):
+    """DATA payload: CRLF line endings, leading dots doubled, terminated by <CRLF>.<CRLF>"""
+    data = _BARE_EOL_RE.sub(b"\r\n", message.as_bytes())
+    data = _LEADING_DOT_RE.sub(b"..", data)
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data + b".\r\n"
+
+
+class Transport:
+    name = "base"
+
+    def send(self, message, emit_fn=print, **context):
+        """Deliver `message` ({"sender", "to", "cc", "bcc", "subject", "body"}); True when it was sent"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class BrowserTransport(Transport):
+    """The Gmail web UI; `deliver(message, emit_fn, **context)` is the caller's BrowserAgent path"""
+
+    name = "browser"
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def send(self, message, emit_fn=print, **context):
+        return self.deliver(message, emit_fn, **context)
+
+
+class SmtpTransport(Transport):
+    """Pooled, persistent SMTP connections for one account"""
+
+    name = "smtp"
+
+    def __init__(self, username, password, host=None, port=None, security=None, pool_size=None,
+                 pipelining=None, timeout=30.0, probe_after=10.0, max_messages=100, lease_timeout=60.0):
+        self.username = username
+        self.password = password
+        self.host = host or os.getenv("SMTP_HOST", "smtp.gmail.com")
+        self.security = (security or os.getenv("SMTP_SECURITY", "starttls")).lower()
+        if self.security not in SMTP_SECURITY:
+            raise ValueError(f"Unknown SMTP security '{self.security}', expected one of {list(SMTP_SECURITY)}")
+        self.port = int(port or os.getenv("SMTP_PORT") or (465 if self.security == "ssl" else 587))
+        self.pool_size = max(1, int(pool_size or os.getenv("SMTP_POOL_SIZE", "2")))
+        # "auto" pipelines only when the server advertises PIPELINING; "1" forces it, "0" disables it
+        self.pipelining = (pipelining or os.getenv("SMTP_PIPELINING", "auto")).lower()
+        self.timeout = timeout
+        self.probe_after = probe_after
+        self.max_messages = max_messages
+        self.lease_timeout = lease_timeout
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._idle = deque()  # (connection, messages sent on it, last used)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.connections_opened = 0
+        self.reconnects = 0
+        self.sent = 0
+        self.failed = 0
+        self.pipelined = 0
+        self.send_seconds = 0.0
+
+    def _connect(self):
+        context = ssl.create_default_context()
+        if self.security == "ssl":
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.ehlo()
+            if self.security == "starttls":
+                conn.starttls(context=context)
+                conn.ehlo()
+            if self.password and conn.has_extn("auth"):
+                conn.login(self.username, self.password)
+        except smtplib.SMTPAuthenticationError as e:
+            conn.close()
+            raise TransportAuthError(f"SMTP login refused for {self.username}: {e.smtp_code} "
+                                     f"{e.smtp_error.decode(errors='replace')}") from e
+        except BaseException:
+            conn.close()
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+
+    @staticmethod
+    def _drop(conn):
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.lease_timeout):
+            raise TransportError(f"No SMTP connection free within {self.lease_timeout:.0f}s")
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.popleft() if self._idle else None
+                if entry is None:
+                    return self._connect(), 0
+                conn, count, last_used = entry
+                if time.monotonic() - last_used < self.probe_after:
+                    return conn, count
+                try:
+                    # Servers drop idle sessions; check before trusting one that sat for a while
+                    if conn.noop()[0] == 250:
+                        return conn, count
+                except (smtplib.SMTPException, OSError):
+                    pass
+                conn.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, conn, count, broken=False):
+        try:
+            if broken:
+                conn.close()
+            elif self._closed or count >= self.max_messages:
+                self._drop(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, count, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def _use_pipelining(self, conn):
+        if self.pipelining in ("1", "true", "yes"):
+            return True
+        if self.pipelining in ("0", "false", "no"):
+            return False
+        return conn.has_extn("pipelining")
+
+    def _pipelined(self, conn, sender, envelope, data):
+        """MAIL, every RCPT and DATA in one write, then the content: two round trips per message"""
+        commands = [f"MAIL FROM:<{sender}>"] + [f"RCPT TO:<{address}>" for address in envelope] + ["DATA"]
+        conn.send(("\r\n".join(commands) + "\r\n").encode())
+        mail_code, mail_reply = conn.getreply()
+        refused = {}
+        for address in envelope:
+            code, reply = conn.getreply()
+            if code not in (250, 251):
+                refused[address] = (code, reply)
+        data_code, data_reply = conn.getreply()
+        if data_code != 354:
+            conn.rset()
+            if mail_code != 250:
+                raise smtplib.SMTPSenderRefused(mail_code, mail_reply, sender)
+            if len(refused) == len(envelope):
+                raise smtplib.SMTPRecipientsRefused(refused)
+            raise smtplib.SMTPDataError(data_code, data_reply)
+        self._hand_over(conn, data)
+        return refused
+
+    def _one_by_one(self, conn, sender, envelope, data):
+        """MAIL, each RCPT and DATA a round trip apiece, for servers without PIPELINING"""
+        code, reply = conn.mail(sender)
+        if code != 250:
+            conn.rset()
+            raise smtplib.SMTPSenderRefused(code, reply, sender)
+        refused = {}
+        for address in envelope:
+            code, reply = conn.rcpt(address)
+            if code not in (250, 251):
+                refused[address] = (code, reply)
+        if len(refused) == len(envelope):
+            conn.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        conn.putcmd("data")
+        code, reply = conn.getreply()
+        if code != 354:
+            conn.rset()
+            raise smtplib.SMTPDataError(code, reply)
+        self._hand_over(conn, data)
+        return refused
+
+    @staticmethod
+    def _hand_over(conn, data):
+        """Send the content after a 354 and read the server's verdict"""
+        try:
+            conn.send(data)
+            code, reply = conn.getreply()
+        except (smtplib.SMTPServerDisconnected, OSError) as e:
+            # The server may already have queued it; resending could deliver it twice
+            raise TransportError(f"Connection lost after the message was handed over: {e}") from e
+        if code != 250:
+            raise smtplib.SMTPDataError(code, reply)
+
+    def _deliver(self, conn, sender, envelope, message):
+        if self._use_pipelining(conn):
+            refused = self._pipelined(conn, sender, envelope, smtp_data(message))
+            with self._lock:
+                self.pipelined += 1
+            return refused
+        return self._one_by_one(conn, sender, envelope, smtp_data(message))
+
+    def send_message(self, sender, to, subject, body, cc=None, bcc=None):
+        """Deliver one message; returns the recipients the server refused (if only some were)"""
+        message, envelope = build_message(sender, to, subject, body, cc, bcc)
+        start = time.perf_counter()
+        for attempt in range(2):
+            try:
+                conn, count = self._acquire()
+            except (smtplib.SMTPException, OSError) as e:
+                with self._lock:
+                    self.failed += 1
+                raise TransportError(f"Could not connect to {self.host}:{self.port}: {e}") from e
+            broken = False
+            try:
+                refused = self._deliver(conn, sender, envelope, message)
+                count += 1
+                with self._lock:
+                    self.sent += 1
+                    self.send_seconds += time.perf_counter() - start
+                return refused
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+                # A stale pooled connection, lost before the message was handed over (see
+                # _hand_over); retry once on a fresh one
+                broken = True
+                if attempt:
+                    with self._lock:
+                        self.failed += 1
+                    raise TransportError(f"SMTP connection to {self.host}:{self.port} failed: {e}") from e
+                with self._lock:
+                    self.reconnects += 1
+            except smtplib.SMTPResponseException as e:
+                with self._lock:
+                    self.failed += 1
+                raise TransportError(f"SMTP server refused the message: {e.smtp_code} "
+                                     f"{e.smtp_error.decode(errors='replace')}") from e
+            except smtplib.SMTPRecipientsRefused as e:
+                with self._lock:
+                    self.failed += 1
+                raise TransportError(f"SMTP server refused every recipient: {', '.join(e.recipients)}") from e
+            except (smtplib.SMTPException, TransportError):
+                broken = True
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                self._release(conn, count, broken)
+
+    def send(self, message, emit_fn=print, **context):
+        emit_fn(f"📮 Sending over SMTP ({self.host})...")
+        refused = self.send_message(message["sender"], message["to"], message["subject"], message["body"],
+                                    message.get("cc"), message.get("bcc"))
+        if refused:
+            emit_fn(f"⚠️ Server refused {', '.join(refused)}; sent to the other recipients.")
+        emit_fn("✅ Email sent successfully!")
+        return True
+
+    def send_many(self, messages):
+        """Bulk send over every pooled connection at once; one {"ok", "error"} per message, in order"""
+        def send_one(message):
+            try:
+                refused = self.send_message(message["sender"], message["to"], message["subject"], message["body"],
+                                            message.get("cc"), message.get("bcc"))
+                return {"ok": True, "error": None, "refused": sorted(refused)}
+            except TransportError as e:
+                return {"ok": False, "error": str(e), "refused": []}
+
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="smtp-send") as executor:
+            return list(executor.map(send_one, messages))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "smtp_connections_opened_total": self.connections_opened,
+                "smtp_connections_idle": len(self._idle),
+                "smtp_reconnects_total": self.reconnects,
+                "smtp_sent_total": self.sent,
+                "smtp_failed_total": self.failed,
+                "smtp_pipelined_total": self.pipelined,
+                "smtp_send_seconds_avg": round(self.send_seconds / self.sent, 4) if self.sent else 0.0,
+            }
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _, _ in idle:
+            self._drop(conn)
+
+
+class TransportRouter:
+    """Per-account transport choice, with the browser as the fallback for refused SMTP logins"""
+
+    def __init__(self, browser, accounts=(), default=None, auth_cooldown=None):
+        self.browser = browser
+        self.accounts = {account.email: account for account in accounts}
+        self.default = get_send_transport(default)
+        self.auth_cooldown = float(auth_cooldown if auth_cooldown is not None
+                                   else os.getenv("SMTP_AUTH_COOLDOWN", "3600"))
+        self._smtp = {}
+        self._auth_failed = {}  # account -> when SMTP may be tried again
+        self._lock = threading.Lock()
+        self.counts = {"browser": 0, "smtp": 0, "failed": 0, "fallbacks": 0}
+
+    def rule(self, email):
+        """The configured transport name for `email`"""
+        account = self.accounts.get(email)
+        return get_send_transport(getattr(account, "transport", None) or self.default)
+
+    def route(self, email):
+        """The transport to use for `email` right now"""
+        if self.rule(email) != "smtp":
+            return self.browser
+        with self._lock:
+            if self._auth_failed.get(email, 0) > time.time():
+                return self.browser
+            transport = self._smtp.get(email)
+            if transport is None:
+                account = self.accounts.get(email)
+                password = (getattr(account, "smtp_password", None) or getattr(account, "password", None)
+                            or os.getenv("SMTP_PASSWORD"))
+                transport = self._smtp[email] = SmtpTransport(email, password)
+            return transport
+
+    def uses_browser(self, email):
+        """False for accounts that only need a browser if their SMTP login is refused"""
+        return self.route(email) is self.browser
+
+    def send(self, message, emit_fn=print, **context):
+        sender = message["sender"]
+        transport = self.route(sender)
+        if transport is not self.browser:
+            try:
+                ok = transport.send(message, emit_fn, **context)
+                self._count("smtp" if ok else "failed")
+                return ok
+            except TransportAuthError as e:
+                with self._lock:
+                    self._auth_failed[sender] = time.time() + self.auth_cooldown
+                    self.counts["fallbacks"] += 1
+                emit_fn(f"⚠️ {e}; sending through the browser instead.")
+            except TransportError as e:
+                self._count("failed")
+                emit_fn(f"❌ {e}")
+                return False
+        ok = self.browser.send(message, emit_fn, **context)
+        self._count("browser" if ok else "failed")
+        return ok
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "transport_browser_sent_total": self.counts["browser"],
+                "transport_smtp_sent_total": self.counts["smtp"],
+                "transport_failed_total": self.counts["failed"],
+                "transport_auth_fallbacks_total": self.counts["fallbacks"],
+                "transport_smtp_accounts": len(self._smtp),
+                "transport_smtp_auth_blocked": sum(1 for until in self._auth_failed.values() if until > time.time()),
+            }
+            smtp = list(self._smtp.values())
+        for transport in smtp:
+            for key, value in transport.stats().items():
+                stats[key] = stats.get(key, 0) + value
+        if smtp and stats.get("smtp_sent_total"):
+            stats["smtp_send_seconds_avg"] = round(
+                sum(t.send_seconds for t in smtp) / stats["smtp_sent_total"], 4)
+        return stats
+
+    def close(self):
+        with self._lock:
+            smtp, self._smtp = list(self._smtp.values()), {}
+        for transport in smtp:
+            transport.close()
@@ -1,6 +1,14 @@
 // frontend/socket.js
 window.addEventListener('load', () => {
-    const socket = io();
+    // Production serves WebSocket first (SOCKET_OPTIONS is injected by the server);
+    // if that can't connect (e.g. a proxy without upgrade support), fall back to long-polling
+    const socket = io(window.SOCKET_OPTIONS || {});
+    socket.on("connect_error", () => {
+        const transports = socket.io.opts.transports;
+        if (transports && transports[0] === "websocket") {
+            socket.io.opts.transports = ["polling", "websocket"];
+        }
+    });
 
     const chatBox = document.getElementById("chat-box");
     const form = document.getElementById("email-form");
@@ -28,10 +36,54 @@ window.addEventListener('load', () => {
         addMessage(data);
     });
 
+    // Job progress arrives coalesced: [{job_id, text, ts}, ...]
+    socket.on("text_batch", (items) => {
+        items.forEach((item) => addMessage(item.text));
+    });
+
     socket.on("image", (imgDataUrl) => {
         addImage(imgDataUrl);
     });
 
+    // Screenshot frames arrive as binary attachments (WebP/JPEG bytes)
+    socket.on("image_frame", (frame) => {
+        const blob = new Blob([frame.data], { type: frame.mime });
+        const url = URL.createObjectURL(blob);
+        addImage(url);
+    });
+
+    let lastJobId = null;
+
+    socket.on("job_status", (job) => {
+        if (job.status === "running") {
+            addMessage(`⚙️ Job ${job.job_id} started.`);
+        } else if (job.status === "failed") {
+            addMessage(`❌ Job ${job.job_id} failed: ${job.error}`);
+        } else if (job.status === "done") {
+            addMessage(`🏁 Job ${job.job_id} finished.`);
+        }
+    });
+
+    socket.on("job_rejected", (data) => {
+        addMessage(`⏳ Request rejected: ${data.reason}`);
+    });
+
+    socket.on("batch_progress", (data) => {
+        const r = data.result, s = data.summary;
+        const status = r.ok ? "✅" : `❌ ${r.error}`;
+        addMessage(`📦 [${s.sent + s.failed}/${s.total}] ${r.to} ${status}`);
+    });
+
+    socket.on("batch_done", (data) => {
+        const s = data.summary;
+        addMessage(`📦 Batch ${data.batch_id} done: ${s.sent} sent, ${s.failed} failed (${s.messages_per_minute}/min)`);
+    });
+
+    socket.on("generated_email_partial", (data) => {
+        subjectInput.value = data.subject;
+        bodyInput.value = data.body;
+    });
+
     socket.on("generated_email", (data) => {
         subjectInput.value = data.subject;
         bodyInput.value = data.body;
@@ -45,11 +97,21 @@ window.addEventListener('load', () => {
         const subject = subjectInput.value;
         const body = bodyInput.value;
 
-        socket.emit("send_email", { to, subject, body });
+        socket.emit("send_email", { to, subject, body }, (ack) => {
+            if (ack && ack.job_id) {
+                lastJobId = ack.job_id;
+            }
+        });
 
         addMessage(`🧠 Sending email to ${to}...`);
     });
 
+    window.cancelLastJob = function() {
+        if (lastJobId) {
+            socket.emit("cancel_job", { job_id: lastJobId });
+        }
+    };
+
     window.requestEmailDraft = function() {
         const intent = document.getElementById("intent").value;
         socket.emit("generate_email", { intent });